@@ -1,4 +1,5 @@
 import os
+import gzip
 import yaml
 import boto3
 from botocore.exceptions import ClientError
@@ -20,6 +21,13 @@ def load_s3_config():
         print(f"Error parsing config.yaml: {e}")
         return None
 
+def _read_body(response):
+    """Reads an S3 get_object body as UTF-8, undoing gzip content-encoding if set."""
+    body = response['Body'].read()
+    if response.get('ContentEncoding') == 'gzip':
+        body = gzip.decompress(body)
+    return body.decode('utf-8')
+
 def fetch_document_from_s3(config, jurisdiction_code, source_id, file_key):
     """
     Fetches a specific document type from S3 based on a file key.
@@ -46,7 +54,7 @@ def fetch_document_from_s3(config, jurisdiction_code, source_id, file_key):
         print(f"Attempting to fetch primary file: s3://{bucket_name}/{primary_s3_key}")
         try:
             response = s3_client.get_object(Bucket=bucket_name, Key=primary_s3_key)
-            html_content = response['Body'].read().decode('utf-8')
+            html_content = _read_body(response)
         except ClientError as e:
             if e.response['Error']['Code'] == 'NoSuchKey':
                 print(f"Primary file '{primary_filename}' not found. Proceeding to fallback.")
@@ -69,7 +77,7 @@ def fetch_document_from_s3(config, jurisdiction_code, source_id, file_key):
 
         try:
             response = s3_client.get_object(Bucket=bucket_name, Key=s3_key)
-            html_content = response['Body'].read().decode('utf-8')
+            html_content = _read_body(response)
         except ClientError as e:
             if e.response['Error']['Code'] == 'NoSuchKey':
                 return f"<div style='padding: 20px; text-align: center;'><h3>File Not Found</h3><p>Neither the primary nor fallback file could be found.</p></div>"
@@ -1,7 +1,7 @@
 import os
 import time
 import json
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 from utils.database_connector import DatabaseConnector
 from utils.gemini_client import GeminiClient
 from utils.s3_manager import S3Manager
@@ -18,6 +18,7 @@ class AiProcessor:
         self.gemini_client = GeminiClient(model_name=config['models']['gemini']['model'])
         self.dest_db = DatabaseConnector(db_config=config['database']['destination'])
         self.prompt = self._load_prompt(prompt_path)
+        self._prompt_head = self.prompt + "\n\n--- CASE LAW TEXT ---\n\n"
 
     def _load_prompt(self, prompt_file: str) -> str:
         try:
@@ -50,6 +51,14 @@ class AiProcessor:
 
         for index, row in cases_df.iterrows():
             source_id = str(row['source_id'])
+            json_status = getattr(row, column_config['json_valid_status'])
+            html_status = getattr(row, column_config['html_status'])
+
+            # Fully processed cases need neither the S3 read nor the JSON parse below.
+            if json_status == 'pass' and html_status == 'pass':
+                print(f"Case {source_id} already has JSON and HTML. Skipping.")
+                continue
+
             print(f"\n--- Processing AI/HTML for case: {source_id} ---")
             
             s3_bucket = self.config['aws']['s3']['bucket_name']
@@ -62,7 +71,7 @@ class AiProcessor:
             tree_html_file_key = os.path.join(case_folder, filenames['jurismap_html'])
 
             json_summary_content = None
-            if getattr(row, column_config['json_valid_status']) != 'pass':
+            if json_status != 'pass':
                 print(f"JSON status is not 'pass'. Running process.")
                 text_content = self.s3_manager.get_file_content(s3_bucket, txt_file_key)
                 if text_content:
@@ -88,7 +97,7 @@ class AiProcessor:
                 print(f"Skipping HTML generation for {source_id} due to missing JSON summary content.")
                 continue
 
-            if getattr(row, column_config['html_status']) != 'pass':
+            if html_status != 'pass':
                 print(f"HTML status is not 'pass'. Running process.")
                 self._generate_and_save_html_tree(json_summary_content, s3_bucket, tree_html_file_key, dest_table, source_id, column_config)
             else:
@@ -102,32 +111,33 @@ class AiProcessor:
         The json_valid_status is only passed if all steps are successful.
         """
         start_time_dt = datetime.now(timezone.utc)
+        start_counter = time.perf_counter()
         input_tokens, output_tokens = 0, 0
         input_price, output_price = 0.0, 0.0
 
         try:
             # Step 1: Get response from Gemini and calculate cost
-            gemini_response_str, input_tokens, output_tokens = self.gemini_client.generate_json_from_text(self.prompt, text_content)
+            gemini_response_str, input_tokens, output_tokens = self.gemini_client.generate_json_from_text(self._prompt_head, text_content)
             pricing_config = self.config['models']['gemini']['pricing']
             input_price = (pricing_config['input_per_million'] / 1000000) * input_tokens
             output_price = (pricing_config['output_per_million'] / 1000000) * output_tokens
             print(f"Gemini Token Usage - Input: {input_tokens} (${input_price:.6f}), Output: {output_tokens} (${output_price:.6f})")
 
             # Step 2: Validate and parse the JSON response
-            if not self.gemini_client.is_valid_json(gemini_response_str):
+            summary_data = self.gemini_client.parse_json(gemini_response_str)
+            if summary_data is None:
                 raise ValueError("Gemini response was not valid JSON.")
-            summary_data = json.loads(gemini_response_str)
 
             # Step 3: Basic validation of the parsed data
             if not summary_data.get("cards") or not summary_data.get("caseTitle"):
                 raise ValueError("Parsed JSON is missing required 'cards' or 'caseTitle' key.")
 
             # Step 4: Save the summary JSON file to S3
-            self.s3_manager.save_json_file(bucket, summary_json_key, json.dumps(summary_data, indent=2))
+            self.s3_manager.save_json_file(bucket, summary_json_key, json.dumps(summary_data, indent=2, ensure_ascii=False))
 
             # Step 5: On success, update status and metrics in the main status table
-            end_time_dt = datetime.now(timezone.utc)
-            duration = (end_time_dt - start_time_dt).total_seconds()
+            duration = time.perf_counter() - start_counter
+            end_time_dt = start_time_dt + timedelta(seconds=duration)
             self.dest_db.update_step_result(
                 status_table, source_id, 'json_valid', 'pass', duration, column_config,
                 token_input=input_tokens, token_output=output_tokens,
@@ -140,8 +150,8 @@ class AiProcessor:
 
         except Exception as e:
             # On any failure, log the 'failed' status and all available metrics
-            end_time_dt = datetime.now(timezone.utc)
-            duration = (end_time_dt - start_time_dt).total_seconds()
+            duration = time.perf_counter() - start_counter
+            end_time_dt = start_time_dt + timedelta(seconds=duration)
             print(f"JSON generation and saving process failed for {source_id}. Error: {e}")
             self.dest_db.update_step_result(
                 status_table, source_id, 'json_valid', 'failed', duration, column_config,
@@ -155,7 +165,7 @@ class AiProcessor:
         start_time = time.time()
         try:
             html_content = self.html_generator.generate_html_tree(json_data)
-            self.s3_manager.save_text_file(bucket, html_key, html_content)
+            self.s3_manager.save_text_file(bucket, html_key, html_content, content_type='text/html; charset=utf-8')
             duration = time.time() - start_time
             self.dest_db.update_step_result(status_table, source_id, 'jurismap_html', 'pass', duration, column_config)
         except Exception as e:
@@ -1,7 +1,7 @@
 import os
-import json
+import orjson
 import google.generativeai as genai
-from typing import Tuple
+from typing import Any, Optional, Tuple
 
 class GeminiClient:
     """
@@ -22,12 +22,15 @@ class GeminiClient:
         genai.configure(api_key=self.api_key)
         print("GeminiClient initialized successfully.")
 
-    def generate_json_from_text(self, prompt: str, text_content: str) -> Tuple[str, int, int]:
+    def generate_json_from_text(self, prompt_head: str, text_content: str) -> Tuple[str, int, int]:
         """
         Sends text content to the Gemini API and requests a JSON response.
 
+        The prompt and the case text are sent as separate content parts so the
+        (potentially large) case text is never copied into a combined string.
+
         Args:
-            prompt (str): The instructional prompt for the model.
+            prompt_head (str): The instructional prompt, already terminated with the case text separator.
             text_content (str): The case law text to be analyzed.
 
         Returns:
@@ -40,17 +43,19 @@ class GeminiClient:
             print(f"Generating content with model: {self.model_name}")
             model = genai.GenerativeModel(self.model_name)
             
-            full_prompt = f"{prompt}\n\n--- CASE LAW TEXT ---\n\n{text_content}"
+            contents = [prompt_head, text_content]
             
             # Count input tokens before sending
-            input_token_count = model.count_tokens(full_prompt).total_tokens
+            input_token_count = model.count_tokens(contents).total_tokens
             
-            response = model.generate_content(full_prompt)
+            # Stream the response so long generations arrive incrementally instead of
+            # holding one request open until the whole summary is produced.
+            response = model.generate_content(contents, stream=True)
+            raw_response = "".join(chunk.text for chunk in response if chunk.parts)
             
-            # Get output token count from response metadata
+            # Usage metadata is available once the stream has been fully consumed
             output_token_count = response.usage_metadata.candidates_token_count
             
-            raw_response = response.text
             if raw_response.strip().startswith("```json"):
                 clean_response = raw_response.strip()[7:-3].strip()
             else:
@@ -63,6 +68,31 @@ class GeminiClient:
             print(f"An error occurred while calling the Gemini API: {e}")
             raise
 
+    @staticmethod
+    def parse_json(data: str) -> Optional[Any]:
+        """
+        Parses a string as a JSON object or array.
+
+        Strings that cannot start a JSON object or array are rejected before
+        any parsing is attempted.
+
+        Args:
+            data (str): The string to parse.
+
+        Returns:
+            The parsed JSON value, or None if the string is not valid JSON.
+        """
+        if not data or data.lstrip()[:1] not in ('{', '['):
+            print("JSON validation failed.")
+            return None
+        try:
+            parsed = orjson.loads(data)
+            print("JSON validation successful.")
+            return parsed
+        except orjson.JSONDecodeError:
+            print("JSON validation failed.")
+            return None
+
     @staticmethod
     def is_valid_json(data: str) -> bool:
         """
@@ -74,12 +104,4 @@ class GeminiClient:
         Returns:
             bool: True if the string is valid JSON, False otherwise.
         """
-        if not data:
-            return False
-        try:
-            json.loads(data)
-            print("JSON validation successful.")
-            return True
-        except json.JSONDecodeError:
-            print("JSON validation failed.")
-            return False
\ No newline at end of file
+        return GeminiClient.parse_json(data) is not None
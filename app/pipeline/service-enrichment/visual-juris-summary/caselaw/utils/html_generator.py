@@ -18,7 +18,9 @@ class HtmlGenerator:
             str: A self-contained HTML document as a string.
         """
         # Convert the Python dictionary to a JSON string to be safely embedded in the HTML script tag.
-        json_string_for_html = json.dumps(json_data)
+        # The page is served as UTF-8, so non-ASCII text is kept as-is rather than \uXXXX-escaped.
+        # Escaping '</' is enough to stop a '</script>' inside the data from closing the tag early.
+        json_string_for_html = json.dumps(json_data, ensure_ascii=False).replace('</', '<\\/')
 
         html_template = f"""
 <!DOCTYPE html>
@@ -38,38 +40,21 @@ class HtmlGenerator:
             font-size: 14px;
         }}
         .nav-item {{
-            position: relative; /* Required for absolute positioning of child spans */
             cursor: pointer;
             padding: 0.25rem 1rem; /* Reduced vertical padding to bring items closer */
             border-radius: 0.5rem;
             font-size: 14px;
         }}
-        /* This span holds the visible text, which fades out */
-        .nav-item .text-normal {{
+        /* A single label switches weight instead of cross-fading two spans; Poppins is static, so only the colour transitions */
+        .nav-item .label {{
             font-weight: 500;
             color: #374151; /* Gray-700 */
-            transition: opacity 0.3s ease-in-out;
+            transition: color 0.3s ease-in-out;
         }}
-        /* This span holds the bold text, which fades in */
-        .nav-item .text-bold {{
-            position: absolute;
-            top: 0.25rem;  /* Adjusted to match parent's new top padding */
-            left: 1rem;   /* Must match parent's left padding */
+        .nav-item:hover .label,
+        .nav-item.active .label {{
             font-weight: 600;
             color: #111827; /* Dark Gray-900 */
-            opacity: 0; /* Hidden by default */
-            transition: opacity 0.3s ease-in-out;
-        }}
-        /* --- The Animation --- */
-        /* Fade out the normal text on hover/active */
-        .nav-item:hover .text-normal,
-        .nav-item.active .text-normal {{
-            opacity: 0;
-        }}
-        /* Fade in the bold text on hover/active */
-        .nav-item:hover .text-bold,
-        .nav-item.active .text-bold {{
-            opacity: 1;
         }}
         .content-card {{
             display: none;
@@ -112,29 +97,19 @@ class HtmlGenerator:
         const navMenu = document.getElementById('nav-menu');
         const contentArea = document.getElementById('content-area');
 
-        // Populate navigation and content cards
-        caseData.cards.forEach((card, index) => {{
-            const navItem = document.createElement('li');
-            navItem.className = 'nav-item';
-            navItem.dataset.index = index;
-
-            // Create two spans inside the li for the smooth bold transition
-            navItem.innerHTML = `
-                <span class="text-normal">${{card.menuLabel}}</span>
-                <span class="text-bold">${{card.menuLabel}}</span>
-            `;
-            navMenu.appendChild(navItem);
-
-            // Create Content Card
-            const contentCard = document.createElement('div');
-            contentCard.className = 'content-card';
-            contentCard.dataset.index = index;
-            contentCard.innerHTML = generateCardHTML(card);
-            contentArea.appendChild(contentCard);
-        }});
+        // Populate navigation and content cards with a single innerHTML write each
+        let navHTML = '';
+        let contentHTML = '';
+        for (let index = 0; index < caseData.cards.length; index++) {{
+            const card = caseData.cards[index];
+            navHTML += `<li class="nav-item" data-index="${{index}}"><span class="label">${{card.menuLabel}}</span></li>`;
+            contentHTML += `<div class="content-card" data-index="${{index}}">${{generateCardHTML(card)}}</div>`;
+        }}
+        navMenu.innerHTML = navHTML;
+        contentArea.innerHTML = contentHTML;
 
-        const navItems = document.querySelectorAll('.nav-item');
-        const contentCards = document.querySelectorAll('.content-card');
+        const navItems = navMenu.querySelectorAll('.nav-item');
+        const contentCards = contentArea.querySelectorAll('.content-card');
 
         // Function to switch active view
         function switchView(index) {{
@@ -149,9 +124,12 @@ class HtmlGenerator:
             }}
         }}
 
-        // Add click event listeners to navigation items
-        navItems.forEach((item, index) => {{
-            item.addEventListener('click', () => switchView(index));
+        // A single delegated click listener handles every navigation item
+        navMenu.addEventListener('click', (event) => {{
+            const item = event.target.closest('.nav-item');
+            if (item) {{
+                switchView(Number(item.dataset.index));
+            }}
         }});
 
         // Activate the first item by default
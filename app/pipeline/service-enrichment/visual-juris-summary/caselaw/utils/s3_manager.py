@@ -1,4 +1,5 @@
 import boto3
+import gzip
 import os
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError, ClientError
 
@@ -45,7 +46,10 @@ class S3Manager:
         try:
             print(f"Attempting to retrieve file: s3://{bucket_name}/{file_key}")
             response = self.s3_client.get_object(Bucket=bucket_name, Key=file_key)
-            content = response['Body'].read().decode('utf-8')
+            body = response['Body'].read()
+            if response.get('ContentEncoding') == 'gzip':
+                body = gzip.decompress(body)
+            content = body.decode('utf-8')
             print(f"Successfully retrieved file: s3://{bucket_name}/{file_key}")
             return content
         except ClientError as e:
@@ -55,18 +59,22 @@ class S3Manager:
                 print(f"An S3 client error occurred while getting file: {e}")
             raise
 
-    def save_text_file(self, bucket_name: str, file_key: str, data: str):
+    def save_text_file(self, bucket_name: str, file_key: str, data: str, content_type: str = 'text/plain; charset=utf-8'):
         """
-        Saves a string of data to a text file in an S3 bucket.
+        Saves a string of data to a gzip-compressed text file in an S3 bucket.
+        The object is stored with 'ContentEncoding: gzip' so browsers and
+        CloudFront decompress it transparently.
 
         Args:
             bucket_name (str): The name of the S3 bucket.
             file_key (str): The full path (key) where the file will be saved.
             data (str): The string data to save.
+            content_type (str): The MIME type to store the object with.
         """
         try:
             print(f"Attempting to save file: s3://{bucket_name}/{file_key}")
-            self.s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=data, ContentType='text/plain')
+            body = gzip.compress(data.encode('utf-8'), compresslevel=6)
+            self.s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=body, ContentType=content_type, ContentEncoding='gzip')
             print(f"Successfully saved file: s3://{bucket_name}/{file_key}")
         except ClientError as e:
             print(f"An S3 client error occurred while saving text file: {e}")
@@ -74,7 +82,7 @@ class S3Manager:
 
     def save_json_file(self, bucket_name: str, file_key: str, data: str):
         """
-        Saves a string of JSON data to a file in an S3 bucket.
+        Saves a string of JSON data to a gzip-compressed file in an S3 bucket.
 
         Args:
             bucket_name (str): The name of the S3 bucket.
@@ -83,7 +91,8 @@ class S3Manager:
         """
         try:
             print(f"Attempting to save JSON file: s3://{bucket_name}/{file_key}")
-            self.s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=data, ContentType='application/json')
+            body = gzip.compress(data.encode('utf-8'), compresslevel=6)
+            self.s3_client.put_object(Bucket=bucket_name, Key=file_key, Body=body, ContentType='application/json', ContentEncoding='gzip')
             print(f"Successfully saved JSON file: s3://{bucket_name}/{file_key}")
         except ClientError as e:
             print(f"An S3 client error occurred while saving JSON file: {e}")
@@ -1,6 +1,6 @@
 import os
 import time
-import json
+import orjson
 from datetime import datetime, timezone
 from utils.database_connector import DatabaseConnector
 from utils.gemini_client import GeminiClient
@@ -72,7 +72,7 @@ class AiProcessor:
                 print("JSON already generated. Loading from S3.")
                 try:
                     json_string = self.s3_manager.get_file_content(s3_bucket, json_file_key)
-                    json_content = json.loads(json_string)
+                    json_content = orjson.loads(json_string)
                 except Exception as e:
                     print(f"Could not load existing JSON for {source_id}. Error: {e}")
                     continue
@@ -133,7 +133,7 @@ class AiProcessor:
                     start_time=start_time_dt,
                     end_time=end_time_dt
                 )
-                return json.loads(gemini_response_str)
+                return orjson.loads(gemini_response_str)
             else:
                 # If JSON is invalid, raise an error to be caught by the except block
                 raise ValueError("Gemini response was not valid JSON.")
@@ -160,7 +160,9 @@ class AiProcessor:
     def _generate_and_save_html_tree(self, json_data, bucket, html_key, status_table, source_id, column_config):
         start_time = time.time()
         try:
-            html_content = self.html_generator.generate_html_tree(json_data)
+            html_content, tree_meta = self.html_generator.generate_html_tree_with_meta(json_data)
+            print(f"Rendered JuriTree with {tree_meta['node_count']} nodes, depth {tree_meta['depth']}, "
+                  f"{len(tree_meta['primary_branches'])} primary branches.")
             self.s3_manager.save_text_file(bucket, html_key, html_content)
             duration = time.time() - start_time
             self.dest_db.update_step_result(status_table, source_id, 'jurismap_html', 'pass', duration, column_config)
@@ -1,177 +1,158 @@
 import json
-import html
 import re
+from functools import lru_cache
+from typing import Callable, Optional, Tuple
 
-class HtmlGenerator:
-    """
-    Generates an interactive HTML flowchart from a JuriTree JSON object.
-    The generated HTML uses TailwindCSS for styling and is fully self-contained.
-    """
-
-    def __init__(self):
-        """Initializes the generator with a color palette for tags."""
-        self.tag_color_palette = [
-            '#E96822', '#405FAE', '#96A428', '#CD54E3',
-            '#964FE2', '#E7C027', '#40AE5B', '#388EAD'
-        ]
-
-    def _get_text_color_for_bg(self, hex_color: str) -> str:
-        """Sets the text color for the tags to white."""
-        return 'white'
-
-    def _format_tooltip_text(self, text: str) -> str:
-        """Finds patterns like 'Reason 1:' and makes them bold."""
-        escaped_text = html.escape(text)
-        formatted_text = re.sub(r'(Reason\s*\d*:)', r'<strong>\1</strong>', escaped_text, flags=re.IGNORECASE)
-        return formatted_text
-
-    def _render_node_html(self, node: dict, is_root: bool = False) -> str:
-        """Renders a single flowchart node and its expandable children into an HTML string."""
-        if not node:
-            return ""
-
-        node_id = html.escape(node.get('id', ''))
-        node_type = html.escape(node.get('type', ''))
-        raw_title = node.get('title', '')
-
-        tag_html = ""
-        display_title = html.escape(raw_title)
-
-        if ':' in raw_title:
-            parts = [part.strip() for part in raw_title.split(':', 1)]
-            if len(parts) == 2 and parts[0] and parts[1]:
-                tag_text, title_text = parts
-                display_title = html.escape(title_text)
-
-                hash_val = sum(ord(c) for c in tag_text)
-                color_index = hash_val % len(self.tag_color_palette)
-                tag_bg_color = self.tag_color_palette[color_index]
-
-                tag_text_color = self._get_text_color_for_bg(tag_bg_color)
-                tag_html = f'<div class="node-tag" style="background-color: {tag_bg_color}; color: {tag_text_color};">{html.escape(tag_text)}</div>'
-
-        expander_html = ""
-        children_html = ""
-        if node.get('children'):
-            expander_html = f'<div class="node-expander" data-node-id="{node_id}">+</div>'
-            children_html = self._render_children_html(node.get('children', []), node.get('id', ''))
-
-        wrapper_id = 'id="root-node-wrapper"' if is_root else ''
-
-        tooltip_data = node.get('tooltip', {})
-        tooltip_what = self._format_tooltip_text(tooltip_data.get('what', ''))
-        tooltip_who = self._format_tooltip_text(tooltip_data.get('who', ''))
-        tooltip_why = self._format_tooltip_text(tooltip_data.get('why', ''))
-
-        reference_data = node.get('reference', {})
-        ref_text = html.escape(reference_data.get('refText', ''))
-        ref_popup_text = html.escape(reference_data.get('refPopupText', ''))
-
-        return f"""
-        <div {wrapper_id} class="flowchart-node-wrapper">
-            <div class="flowchart-node {node_type}" data-node-id="{node_id}">
-                {tag_html}
-                <span>{display_title}</span>
-                <div class="tooltip" data-parent-node-id="{node_id}">
-                    <div class="popup-close-btn">&times;</div>
-                    <div class="tooltip-item"><strong>What:</strong><div class="tooltip-content">{tooltip_what}</div></div>
-                    <div class="tooltip-item"><strong>Who:</strong><div class="tooltip-content">{tooltip_who}</div></div>
-                    <div class="tooltip-item"><strong>Why:</strong><div class="tooltip-content">{tooltip_why}</div></div>
-                    <span class="tooltip-ref">
-                        {ref_text}
-                        <div class="ref-popup" data-parent-node-id="{node_id}">
-                            <div class="popup-close-btn">&times;</div>
-                            {ref_popup_text}
-                        </div>
-                    </span>
-                </div>
-                {expander_html}
-            </div>
-        </div>
-        {children_html}
-        """
+# Matches 'Reason 1:'-style labels in tooltip text so they can be emphasised.
+_REASON_RE = re.compile(r'(Reason\s*\d*:)', re.IGNORECASE)
 
-    def _render_children_html(self, children: list, parent_id: str) -> str:
-        """Renders the children of a node inside a collapsible container."""
-        if not children:
-            return ""
+# Node ids are identifiers like 'node-1-2'; these need no escaping in attributes.
+_SAFE_TOKEN_RE = re.compile(r'[A-Za-z0-9_\-]+')
 
-        # Default connector for a single child is a simple vertical line.
-        connector_html = '<div class="w-px h-12 bg-gray-300 mx-auto"></div>'
+# Shared read-only default for nodes without a tooltip or reference.
+_EMPTY = {}
 
-        # For multiple children, generate an SVG for a T-junction with rounded corners.
-        if len(children) > 1:
-            num_children = len(children)
-            viewbox_width = 1000
-            viewbox_height = 50
-            h_bar_y = 25
-            radius = 10
-
-            x_coords = [((i + 0.5) / num_children) * viewbox_width for i in range(num_children)]
-            x_min = min(x_coords)
-            x_max = max(x_coords)
-            center_x = viewbox_width / 2
-            
-            path_commands = []
-            
-            rake_path = f"M {x_min} {viewbox_height} V {h_bar_y + radius} "
-            rake_path += f"A {radius} {radius} 0 0 1 {x_min + radius} {h_bar_y} "
-            rake_path += f"H {x_max - radius} "
-            rake_path += f"A {radius} {radius} 0 0 1 {x_max} {h_bar_y + radius} "
-            rake_path += f"V {viewbox_height}"
-            path_commands.append(rake_path)
-            
-            for x in x_coords[1:-1]:
-                path_commands.append(f"M {x} {h_bar_y} V {viewbox_height}")
-
-            branch_midpoint_x = (x_min + x_max) / 2
-            path_commands.append(f"M {center_x} 0 V {h_bar_y}")
-            path_commands.append(f"M {center_x} {h_bar_y} H {branch_midpoint_x}")
-
-            final_path_d = " ".join(path_commands)
-
-            connector_html = f"""
-            <div class="connector-svg-container" style="height: {viewbox_height}px;">
-                <svg width="100%" height="{viewbox_height}" viewBox="0 0 {viewbox_width} {viewbox_height}" preserveAspectRatio="none">
-                    <path d="{final_path_d}" stroke="#d1d5db" stroke-width="1.5" fill="none" />
-                </svg>
-            </div>
-            """
-
-        is_main_branch = any(child.get('type') == 'node-primary-branch' for child in children)
-
-        branch_container_class = "flex flex-row gap-8 w-full flowchart-branch" if is_main_branch else \
-                                 ("flex flex-col md:flex-row gap-8 w-full" if len(children) > 1 else "flex flex-col items-center w-full")
-
-        child_wrapper_class = "flex-1 flex flex-col items-center flowchart-column" if len(children) > 1 else "w-full flowchart-column"
+# Layout classes for a children container and the opening tag of each child column.
+_BRANCH_CLASS_MAIN = "flex flex-row gap-8 w-full flowchart-branch"
+_BRANCH_CLASS_MULTI = "flex flex-col md:flex-row gap-8 w-full"
+_BRANCH_CLASS_SINGLE = "flex flex-col items-center w-full"
+_CHILD_WRAPPER_OPEN_MULTI = '<div class="flex-1 flex flex-col items-center flowchart-column">'
+_CHILD_WRAPPER_OPEN_SINGLE = '<div class="w-full flowchart-column">'
 
-        child_branches = [f'<div class="{child_wrapper_class}">{self._render_node_html(child)}</div>' for child in children]
+# Static page chassis. Only the title, the rendered trees and the connector
+# between them vary per page, so everything else is built once at import time.
+_HTML_HEAD = """
+<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>"""
 
-        return f"""
-        <div class="node-children-container" id="children-of-{parent_id}">
-            <div class="children-content">
-                {connector_html}
-                <div class="{branch_container_class}">
-                    {''.join(child_branches)}
-                </div>
-            </div>
-        </div>
-        """
+_HTML_STYLESHEETS = """</title>
+    <script src="https://cdn.tailwindcss.com"></script>
+    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600;700&display=swap" rel="stylesheet">
+    <style>"""
 
-    def generate_html_tree(self, json_data: dict) -> str:
-        """Generates the complete HTML string for the interactive flowchart."""
-        flowchart_data = json_data.get('flowchart', {})
-        title = html.escape(flowchart_data.get('title', 'JuriTree Flowchart'))
-        subtitle = html.escape(flowchart_data.get('subtitle', ''))
-        root_node = flowchart_data.get('rootNode')
-        final_outcome = flowchart_data.get('finalOutcome')
+_CSS = """
+        html, body {
+            width: 100%; height: 100%; margin: 0; padding: 0;
+        }
+        body { font-family: 'Poppins', sans-serif; background-color: #FFFFFF; color: black; }
+        .viewport { width: 100%; height: 100%; cursor: grab; overflow: auto; }
+        .zoom-container { display: inline-block; transform-origin: top left; padding: 2rem; }
+        #flowchart-content { display: flex; flex-direction: column; align-items: center; width: 100%; }
+        #flowchart-content > div { opacity: 0; }
+        .flowchart-column { overflow: visible; }
+        .flowchart-node-wrapper { position: relative; margin-top: 30px; width: 100%; display: flex; justify-content: center; padding-bottom: 15px;}
+        .flowchart-node-wrapper.is-active-node { z-index: 100; }
+        .flowchart-node {
+            border: 1px solid #E9E5E5; border-radius: 50px; padding: 1rem 1.25rem;
+            text-align: center; position: relative; transition: box-shadow 0.3s ease; max-width: 500px; min-width: 160px;
+            box-shadow: 0 4px 6px -1px rgba(0,0,0,0.05); cursor: pointer;
+            font-size: 0.875rem; font-weight: 500; user-select: none;
+            color: black; background-color: white; padding-bottom: 1.5rem;
+        }
+        .flowchart-node:hover { box-shadow: 0 10px 15px -3px rgba(0,0,0,0.07); }
+        .node-tag {
+            position: absolute; top: -20px; left: 50%; transform: translateX(-50%);
+            padding: 0.25rem 0.85rem; border-radius: 9999px; font-size: 0.8rem;
+            font-weight: 600; z-index: 5; white-space: nowrap; border: 5px solid white;
+        }
+        .node-expander {
+            position: absolute; bottom: -12px; left: 50%; transform: translateX(-50%);
+            width: 24px; height: 24px; background-color: #718096; color: white;
+            border-radius: 50%; border: 2px solid white;
+            font-size: 18px; font-weight: 600;
+            z-index: 10; cursor: pointer;
+            transition: background-color 0.2s;
+            display: flex; align-items: center; justify-content: center;
+            padding-bottom: 1px;
+        }
+        .node-expander:hover { background-color: #2d3748; }
+        .node-children-container { display: grid; grid-template-rows: 0fr; transition: grid-template-rows 0.5s ease-in-out; overflow: hidden; }
+        .node-children-container.is-expanded { grid-template-rows: 1fr; }
+        .children-content { min-height: 0; opacity: 0; transition: opacity 0.4s ease-in-out 0.1s; }
+        .node-children-container.is-expanded .children-content { opacity: 1; }
+        .tooltip, .ref-popup {
+            visibility: hidden; opacity: 0;
+            position: fixed;
+            width: 320px;
+            background-color: #FFFFFF; color: black;
+            text-align: left; padding: 1rem; border-radius: 0.5rem;
+            transition: opacity 0.3s;
+            box-shadow: 0 10px 15px -3px rgba(0,0,0,0.1), 0 4px 6px -2px rgba(0,0,0,0.1);
+            border: 1px solid #e5e7eb; font-size: 0.8rem;
+            user-select: text;
+        }
+        .tooltip { z-index: 2000; }
+        .ref-popup { z-index: 2001; width: 350px; color: #4B5563; }
+        .tooltip.is-visible, .ref-popup.is-visible {
+            visibility: visible; opacity: 1; pointer-events: auto;
+        }
+        .tooltip-item { margin-bottom: 0.75rem; }
+        .tooltip-item:last-of-type { margin-bottom: 0; }
+        .tooltip-item > strong { display: block; margin-bottom: 0.35rem; font-weight: 600; color: #1f2937; }
+        .tooltip-content { color: #4B5563; }
+        .tooltip-ref {
+            display: block; margin-top: 0.75rem; padding-top: 0.75rem;
+            border-top: 1px solid #d1d5db; font-style: italic; color: #6B7280;
+            position: relative; cursor: help;
+        }
+        .popup-close-btn {
+            position: absolute; top: 5px; right: 10px; width: 20px; height: 20px;
+            font-size: 1.5rem; line-height: 20px; color: #aaa; text-align: center;
+            cursor: pointer; transition: color 0.2s;
+        }
+        .popup-close-btn:hover { color: #333; }
+        .overflow-visible-temp { overflow: visible !important; }
+        #controls-container {
+            position: fixed; top: 20px; left: 20px;
+            z-index: 1000; display: flex; align-items: center; gap: 10px;
+            background-color: transparent;
+            padding: 8px 12px;
+        }
+        .toggle-switch-label { font-size: 14px; font-weight: 400; color: #808080; }
+        .toggle-switch { position: relative; display: inline-block; width: 44px; height: 24px; }
+        .toggle-switch input { opacity: 0; width: 0; height: 0; }
+        .slider {
+            position: absolute; cursor: pointer; top: 0; left: 0; right: 0; bottom: 0;
+            background-color: #ccc; transition: .4s; border-radius: 24px;
+        }
+        .slider:before {
+            position: absolute; content: ""; height: 18px; width: 18px;
+            left: 3px; bottom: 3px; background-color: white;
+            transition: .4s; border-radius: 50%;
+        }
+        input:checked + .slider { background-color: #48BB78; }
+        input:checked + .slider:before { transform: translateX(20px); }
+        .animate-in { animation: fadeIn 0.8s ease-out forwards, slideUp 0.8s ease-out forwards; }
+        @keyframes fadeIn { to { opacity: 1; } }
+        @keyframes slideUp { from { transform: translateY(20px); } to { transform: translateY(0); } }
+"""
+
+_HTML_BODY_OPEN = """</style>
+</head>
+<body>
+    <div id="controls-container">
+        <label class="toggle-switch-label">Expand All</label>
+        <label class="toggle-switch">
+            <input type="checkbox" id="expand-all-toggle">
+            <span class="slider"></span>
+        </label>
+    </div>
+    <div id="viewport" class="viewport">
+        <div id="zoom-container" class="zoom-container">
+            <div id="flowchart-content">
+                <div class="w-full">"""
 
-        root_html = self._render_node_html(root_node, is_root=True)
-        final_outcome_html = self._render_node_html(final_outcome)
+_HTML_BETWEEN_ROOT_AND_CONNECTOR = """</div>
+                """
 
-        interstitial_connector = '<div class="w-px h-16 bg-gray-300 mx-auto"></div>' if root_html and final_outcome_html else ''
+_HTML_BETWEEN_CONNECTOR_AND_OUTCOME = """
+                <div class="w-full">"""
 
-        javascript_code = """
+_JAVASCRIPT_CODE = """
         document.addEventListener('DOMContentLoaded', () => {
             const viewport = document.getElementById('viewport');
             const zoomContainer = document.getElementById('zoom-container');
@@ -362,130 +343,336 @@ class HtmlGenerator:
         });
         """
 
-        return f"""
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}: {subtitle}</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <link href="https://fonts.googleapis.com/css2?family=Poppins:wght@400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        html, body {{
-            width: 100%; height: 100%; margin: 0; padding: 0;
-        }}
-        body {{ font-family: 'Poppins', sans-serif; background-color: #FFFFFF; color: black; }}
-        .viewport {{ width: 100%; height: 100%; cursor: grab; overflow: auto; }}
-        .zoom-container {{ display: inline-block; transform-origin: top left; padding: 2rem; }}
-        #flowchart-content {{ display: flex; flex-direction: column; align-items: center; width: 100%; }}
-        #flowchart-content > div {{ opacity: 0; }}
-        .flowchart-column {{ overflow: visible; }}
-        .flowchart-node-wrapper {{ position: relative; margin-top: 30px; width: 100%; display: flex; justify-content: center; padding-bottom: 15px;}}
-        .flowchart-node-wrapper.is-active-node {{ z-index: 100; }}
-        .flowchart-node {{
-            border: 1px solid #E9E5E5; border-radius: 50px; padding: 1rem 1.25rem;
-            text-align: center; position: relative; transition: box-shadow 0.3s ease; max-width: 500px; min-width: 160px;
-            box-shadow: 0 4px 6px -1px rgba(0,0,0,0.05); cursor: pointer;
-            font-size: 0.875rem; font-weight: 500; user-select: none;
-            color: black; background-color: white; padding-bottom: 1.5rem;
-        }}
-        .flowchart-node:hover {{ box-shadow: 0 10px 15px -3px rgba(0,0,0,0.07); }}
-        .node-tag {{
-            position: absolute; top: -20px; left: 50%; transform: translateX(-50%);
-            padding: 0.25rem 0.85rem; border-radius: 9999px; font-size: 0.8rem;
-            font-weight: 600; z-index: 5; white-space: nowrap; border: 5px solid white;
-        }}
-        .node-expander {{
-            position: absolute; bottom: -12px; left: 50%; transform: translateX(-50%);
-            width: 24px; height: 24px; background-color: #718096; color: white;
-            border-radius: 50%; border: 2px solid white;
-            font-size: 18px; font-weight: 600;
-            z-index: 10; cursor: pointer;
-            transition: background-color 0.2s;
-            display: flex; align-items: center; justify-content: center;
-            padding-bottom: 1px;
-        }}
-        .node-expander:hover {{ background-color: #2d3748; }}
-        .node-children-container {{ display: grid; grid-template-rows: 0fr; transition: grid-template-rows 0.5s ease-in-out; overflow: hidden; }}
-        .node-children-container.is-expanded {{ grid-template-rows: 1fr; }}
-        .children-content {{ min-height: 0; opacity: 0; transition: opacity 0.4s ease-in-out 0.1s; }}
-        .node-children-container.is-expanded .children-content {{ opacity: 1; }}
-        .tooltip, .ref-popup {{
-            visibility: hidden; opacity: 0;
-            position: fixed;
-            width: 320px;
-            background-color: #FFFFFF; color: black;
-            text-align: left; padding: 1rem; border-radius: 0.5rem;
-            transition: opacity 0.3s;
-            box-shadow: 0 10px 15px -3px rgba(0,0,0,0.1), 0 4px 6px -2px rgba(0,0,0,0.1);
-            border: 1px solid #e5e7eb; font-size: 0.8rem;
-            user-select: text;
-        }}
-        .tooltip {{ z-index: 2000; }}
-        .ref-popup {{ z-index: 2001; width: 350px; color: #4B5563; }}
-        .tooltip.is-visible, .ref-popup.is-visible {{
-            visibility: visible; opacity: 1; pointer-events: auto;
-        }}
-        .tooltip-item {{ margin-bottom: 0.75rem; }}
-        .tooltip-item:last-of-type {{ margin-bottom: 0; }}
-        .tooltip-item > strong {{ display: block; margin-bottom: 0.35rem; font-weight: 600; color: #1f2937; }}
-        .tooltip-content {{ color: #4B5563; }}
-        .tooltip-ref {{
-            display: block; margin-top: 0.75rem; padding-top: 0.75rem;
-            border-top: 1px solid #d1d5db; font-style: italic; color: #6B7280;
-            position: relative; cursor: help;
-        }}
-        .popup-close-btn {{
-            position: absolute; top: 5px; right: 10px; width: 20px; height: 20px;
-            font-size: 1.5rem; line-height: 20px; color: #aaa; text-align: center;
-            cursor: pointer; transition: color 0.2s;
-        }}
-        .popup-close-btn:hover {{ color: #333; }}
-        .overflow-visible-temp {{ overflow: visible !important; }}
-        #controls-container {{
-            position: fixed; top: 20px; left: 20px;
-            z-index: 1000; display: flex; align-items: center; gap: 10px;
-            background-color: transparent;
-            padding: 8px 12px;
-        }}
-        .toggle-switch-label {{ font-size: 14px; font-weight: 400; color: #808080; }}
-        .toggle-switch {{ position: relative; display: inline-block; width: 44px; height: 24px; }}
-        .toggle-switch input {{ opacity: 0; width: 0; height: 0; }}
-        .slider {{
-            position: absolute; cursor: pointer; top: 0; left: 0; right: 0; bottom: 0;
-            background-color: #ccc; transition: .4s; border-radius: 24px;
-        }}
-        .slider:before {{
-            position: absolute; content: ""; height: 18px; width: 18px;
-            left: 3px; bottom: 3px; background-color: white;
-            transition: .4s; border-radius: 50%;
-        }}
-        input:checked + .slider {{ background-color: #48BB78; }}
-        input:checked + .slider:before {{ transform: translateX(20px); }}
-        .animate-in {{ animation: fadeIn 0.8s ease-out forwards, slideUp 0.8s ease-out forwards; }}
-        @keyframes fadeIn {{ to {{ opacity: 1; }} }}
-        @keyframes slideUp {{ from {{ transform: translateY(20px); }} to {{ transform: translateY(0); }} }}
-    </style>
-</head>
-<body>
-    <div id="controls-container">
-        <label class="toggle-switch-label">Expand All</label>
-        <label class="toggle-switch">
-            <input type="checkbox" id="expand-all-toggle">
-            <span class="slider"></span>
-        </label>
-    </div>
-    <div id="viewport" class="viewport">
-        <div id="zoom-container" class="zoom-container">
-            <div id="flowchart-content">
-                <div class="w-full">{root_html}</div>
-                {interstitial_connector}
-                <div class="w-full">{final_outcome_html}</div>
+_HTML_SCRIPT_OPEN = """</div>
             </div>
         </div>
     </div>
-    <script>{javascript_code}</script>
+    <script>"""
+
+_HTML_TAIL = """</script>
 </body>
 </html>
-        """
\ No newline at end of file
+        """
+
+def _minify_css(css: str) -> str:
+    """Strips comments and collapses whitespace around CSS punctuation."""
+    css = re.sub(r'/\*.*?\*/', '', css, flags=re.DOTALL)
+    css = re.sub(r'\s+', ' ', css)
+    css = re.sub(r'\s*([{};,>])\s*', r'\1', css)
+    # Only whitespace *after* a colon is dropped; a space before one is a descendant selector.
+    return re.sub(r':\s+', ':', css).strip()
+
+def _minify_js(js: str) -> str:
+    """
+    Drops indentation, blank lines and whole-line '//' comments. Line breaks are
+    kept so automatic semicolon insertion is unaffected; this is safe because the
+    script has no multi-line strings or template literals.
+    """
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+# Minified once at import; every generated page embeds these.
+_MIN_CSS = _minify_css(_CSS)
+_MIN_JS = _minify_js(_JAVASCRIPT_CODE)
+
+def _esc(s: str) -> str:
+    """
+    Equivalent of html.escape(s, quote=True), optimised for the common case.
+
+    Each membership test is a C-level scan, so text without special characters
+    (most titles and tooltips) is returned as-is without building a new string.
+    Otherwise the str.replace chain is used; it is much faster than
+    str.translate with multi-character replacements.
+    """
+    if not s:
+        return ''
+    if '&' not in s and '<' not in s and '>' not in s and '"' not in s and "'" not in s:
+        return s
+    return (s.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+             .replace('"', '&quot;').replace("'", '&#x27;'))
+
+def _safe_token(s: str) -> str:
+    """Passes through identifier-like values unchanged and escapes anything else."""
+    return s if s and _SAFE_TOKEN_RE.fullmatch(s) else _esc(s)
+
+@lru_cache(maxsize=4096)
+def _esc_cached(s: str) -> str:
+    """Memoized _esc for highly repetitive values such as node types, tags and references."""
+    return _esc(s)
+
+@lru_cache(maxsize=4096)
+def _format_tooltip_text(text: str) -> str:
+    """Finds patterns like 'Reason 1:' and makes them bold."""
+    escaped_text = _esc(text)
+    # Most tooltips have no 'Reason N:' label, so skip the regex when it cannot match.
+    if ':' not in escaped_text or 'eason' not in escaped_text.lower():
+        return escaped_text
+    return _REASON_RE.sub(r'<strong>\1</strong>', escaped_text)
+
+@lru_cache(maxsize=256)
+def _tag_color(tag_text: str, palette: tuple) -> str:
+    """Picks a stable palette color for a tag from the sum of its character codes."""
+    return palette[sum(map(ord, tag_text)) % len(palette)]
+
+@lru_cache(maxsize=32)
+def _multi_child_connector(num_children: int) -> str:
+    """
+    Builds the SVG T-junction connector (with rounded corners) for a given number
+    of children. The geometry is fixed, so the markup depends only on the count.
+    """
+    viewbox_width = 1000
+    viewbox_height = 50
+    h_bar_y = 25
+    radius = 10
+
+    x_coords = [((i + 0.5) / num_children) * viewbox_width for i in range(num_children)]
+    x_min = min(x_coords)
+    x_max = max(x_coords)
+    center_x = viewbox_width / 2
+
+    path_commands = []
+
+    rake_path = f"M {x_min} {viewbox_height} V {h_bar_y + radius} "
+    rake_path += f"A {radius} {radius} 0 0 1 {x_min + radius} {h_bar_y} "
+    rake_path += f"H {x_max - radius} "
+    rake_path += f"A {radius} {radius} 0 0 1 {x_max} {h_bar_y + radius} "
+    rake_path += f"V {viewbox_height}"
+    path_commands.append(rake_path)
+
+    for x in x_coords[1:-1]:
+        path_commands.append(f"M {x} {h_bar_y} V {viewbox_height}")
+
+    branch_midpoint_x = (x_min + x_max) / 2
+    path_commands.append(f"M {center_x} 0 V {h_bar_y}")
+    path_commands.append(f"M {center_x} {h_bar_y} H {branch_midpoint_x}")
+
+    final_path_d = " ".join(path_commands)
+
+    return f"""
+    <div class="connector-svg-container" style="height: {viewbox_height}px;">
+        <svg width="100%" height="{viewbox_height}" viewBox="0 0 {viewbox_width} {viewbox_height}" preserveAspectRatio="none">
+            <path d="{final_path_d}" stroke="#d1d5db" stroke-width="1.5" fill="none" />
+        </svg>
+    </div>
+    """
+
+class HtmlGenerator:
+    """
+    Generates an interactive HTML flowchart from a JuriTree JSON object.
+    The generated HTML uses TailwindCSS for styling and is fully self-contained.
+    """
+
+    def __init__(self):
+        """Initializes the generator with a color palette for tags."""
+        self.tag_color_palette = [
+            '#E96822', '#405FAE', '#96A428', '#CD54E3',
+            '#964FE2', '#E7C027', '#40AE5B', '#388EAD'
+        ]
+        self._tag_palette = tuple(self.tag_color_palette)
+
+    def _get_text_color_for_bg(self, hex_color: str) -> str:
+        """Sets the text color for the tags to white."""
+        return 'white'
+
+    def _render_node_html(self, node: dict, write: Callable[[str], None], is_root: bool = False,
+                          meta: Optional[dict] = None):
+        """
+        Renders a flowchart node and all of its descendants, passing each HTML
+        fragment to `write` as soon as it is produced.
+
+        The tree is walked with an explicit stack rather than recursion. Stack
+        entries are either literal closing fragments (str) or nodes still to be
+        opened, so deep trees cost no Python call frames per level.
+
+        If `meta` is given, the same walk also accumulates the tree statistics
+        described in generate_html_tree_with_meta.
+        """
+        stack = [(node, is_root, 1)]
+        node_count = 0
+        max_depth = 0
+        primary_branches = meta['primary_branches'] if meta is not None else None
+        # Bind the loop's attribute lookups to locals once; this loop runs a few
+        # times per node and is the hot path for large trees.
+        pop = stack.pop
+        render_node_box = self._render_node_box
+        render_children_html = self._render_children_html
+        while stack:
+            item = pop()
+            if item.__class__ is str:
+                write(item)
+                continue
+
+            current, current_is_root, depth = item
+            if not current:
+                continue
+            node_count += 1
+            if depth > max_depth:
+                max_depth = depth
+            if primary_branches is not None and current.get('type') == 'node-primary-branch':
+                primary_branches.append(current.get('title') or '')
+            children = current.get('children')
+            node_id = render_node_box(current, write, current_is_root, bool(children))
+            if children:
+                render_children_html(children, node_id, write, stack, depth + 1)
+
+        if meta is not None:
+            meta['node_count'] += node_count
+            meta['depth'] = max(meta['depth'], max_depth)
+
+    def _render_node_box(self, node: dict, write: Callable[[str], None], is_root: bool, has_children: bool) -> str:
+        """
+        Renders the box, tag, tooltip and expander of a single node (without its
+        children) and returns the attribute-safe node id.
+        """
+        get = node.get
+        node_id = _safe_token(get('id') or '')
+        node_type = _esc_cached(get('type') or '')
+        raw_title = get('title') or ''
+
+        tag_html = ""
+        display_title = _esc(raw_title)
+
+        tag_text, separator, title_text = raw_title.partition(':')
+        if separator:
+            tag_text = tag_text.strip()
+            title_text = title_text.strip()
+            if tag_text and title_text:
+                display_title = _esc(title_text)
+
+                tag_bg_color = _tag_color(tag_text, self._tag_palette)
+
+                tag_text_color = self._get_text_color_for_bg(tag_bg_color)
+                tag_html = f'<div class="node-tag" style="background-color: {tag_bg_color}; color: {tag_text_color};">{_esc_cached(tag_text)}</div>'
+
+        expander_html = ""
+        if has_children:
+            expander_html = f'<div class="node-expander" data-node-id="{node_id}">+</div>'
+
+        wrapper_id = 'id="root-node-wrapper"' if is_root else ''
+
+        tooltip_data = get('tooltip') or _EMPTY
+        tooltip_what = _format_tooltip_text(tooltip_data.get('what') or '')
+        tooltip_who = _format_tooltip_text(tooltip_data.get('who') or '')
+        tooltip_why = _format_tooltip_text(tooltip_data.get('why') or '')
+
+        reference_data = get('reference') or _EMPTY
+        ref_text = _esc_cached(reference_data.get('refText') or '')
+        ref_popup_text = _esc(reference_data.get('refPopupText') or '')
+
+        write(f"""
+        <div {wrapper_id} class="flowchart-node-wrapper">
+            <div class="flowchart-node {node_type}" data-node-id="{node_id}">
+                {tag_html}
+                <span>{display_title}</span>
+                <div class="tooltip" data-parent-node-id="{node_id}">
+                    <div class="popup-close-btn">&times;</div>
+                    <div class="tooltip-item"><strong>What:</strong><div class="tooltip-content">{tooltip_what}</div></div>
+                    <div class="tooltip-item"><strong>Who:</strong><div class="tooltip-content">{tooltip_who}</div></div>
+                    <div class="tooltip-item"><strong>Why:</strong><div class="tooltip-content">{tooltip_why}</div></div>
+                    <span class="tooltip-ref">
+                        {ref_text}
+                        <div class="ref-popup" data-parent-node-id="{node_id}">
+                            <div class="popup-close-btn">&times;</div>
+                            {ref_popup_text}
+                        </div>
+                    </span>
+                </div>
+                {expander_html}
+            </div>
+        </div>
+        """)
+        return node_id
+
+    def _render_children_html(self, children: list, parent_id: str, write: Callable[[str], None], stack: list,
+                              child_depth: int):
+        """
+        Opens the collapsible container for a node's children and schedules the
+        children, each in its column wrapper, followed by the closing markup.
+        """
+        if not children:
+            return
+
+        # Default connector for a single child is a simple vertical line.
+        connector_html = '<div class="w-px h-12 bg-gray-300 mx-auto"></div>'
+
+        # For multiple children, use the SVG T-junction with rounded corners.
+        if len(children) > 1:
+            connector_html = _multi_child_connector(len(children))
+
+        is_main_branch = any(child.get('type') == 'node-primary-branch' for child in children)
+
+        is_multi = len(children) > 1
+        branch_container_class = _BRANCH_CLASS_MAIN if is_main_branch else \
+                                 (_BRANCH_CLASS_MULTI if is_multi else _BRANCH_CLASS_SINGLE)
+
+        child_wrapper_open = _CHILD_WRAPPER_OPEN_MULTI if is_multi else _CHILD_WRAPPER_OPEN_SINGLE
+
+        write(f"""
+        <div class="node-children-container" id="children-of-{parent_id}">
+            <div class="children-content">
+                {connector_html}
+                <div class="{branch_container_class}">
+                    """)
+        # Pushed in reverse so the children are popped (and rendered) in document order.
+        stack.append("""
+                </div>
+            </div>
+        </div>
+        """)
+        for child in reversed(children):
+            stack.append('</div>')
+            stack.append((child, False, child_depth))
+            stack.append(child_wrapper_open)
+
+    def generate_html_tree(self, json_data: dict) -> str:
+        """Generates the complete HTML string for the interactive flowchart."""
+        parts = []
+        self.generate_html_tree_to(json_data, parts.append)
+        return ''.join(parts)
+
+    def generate_html_tree_with_meta(self, json_data: dict) -> Tuple[str, dict]:
+        """
+        Generates the HTML like generate_html_tree and, in the same traversal,
+        collects statistics about the tree.
+
+        Returns:
+            A tuple of the HTML string and a dict with:
+            - node_count: number of rendered nodes (root tree and final outcome).
+            - depth: depth of the deepest rendered node (a lone root is 1).
+            - primary_branches: titles of the 'node-primary-branch' nodes, in order.
+        """
+        parts = []
+        meta = {'node_count': 0, 'depth': 0, 'primary_branches': []}
+        self.generate_html_tree_to(json_data, parts.append, meta)
+        return ''.join(parts), meta
+
+    def generate_html_tree_to(self, json_data: dict, write: Callable[[str], None], meta: Optional[dict] = None):
+        """
+        Streams the HTML for the interactive flowchart to `write` (e.g. a file's
+        write method) fragment by fragment, without building the whole page in memory.
+        Statistics are accumulated into `meta` when it is given.
+        """
+        flowchart_data = json_data.get('flowchart', {})
+        title = _esc(flowchart_data.get('title', 'JuriTree Flowchart'))
+        subtitle = _esc(flowchart_data.get('subtitle', ''))
+        root_node = flowchart_data.get('rootNode')
+        final_outcome = flowchart_data.get('finalOutcome')
+
+        write(_HTML_HEAD)
+        write(title)
+        write(': ')
+        write(subtitle)
+        write(_HTML_STYLESHEETS)
+        write(_MIN_CSS)
+        write(_HTML_BODY_OPEN)
+        self._render_node_html(root_node, write, is_root=True, meta=meta)
+        write(_HTML_BETWEEN_ROOT_AND_CONNECTOR)
+        # A node renders to nothing only when it is missing, so the connector is
+        # needed exactly when both the root and the final outcome are present.
+        if root_node and final_outcome:
+            write('<div class="w-px h-16 bg-gray-300 mx-auto"></div>')
+        write(_HTML_BETWEEN_CONNECTOR_AND_OUTCOME)
+        self._render_node_html(final_outcome, write, meta=meta)
+        write(_HTML_SCRIPT_OPEN)
+        write(_MIN_JS)
+        write(_HTML_TAIL)
@@ -1,7 +1,6 @@
 import os
 import argparse
 import sys
-import json # Added for JSON operations
 from google.cloud import documentai_v1 as documentai # For type hinting
 from google.protobuf.json_format import MessageToJson # Added to convert Document object to JSON
 from pathlib import Path
@@ -14,38 +13,39 @@ sys.path.insert(0, project_root)
 from core.layout_documentai import process_pdf, save_document_as_json
 from services.documentai_client import process_document_sample
 
+# Whether the import above fell back to the placeholder client; this cannot change at runtime.
+IS_DUMMY_CLIENT = 'CRITICAL DUMMY' in (getattr(process_document_sample, '__doc__', None) or '')
+
 # Configuration from environment variables
 PROJECT_ID = os.getenv("PROJECT_ID")
 LOCATION = os.getenv("LOCATION")
 PROCESSOR_ID = os.getenv("PROCESSOR_ID")
 
+# Script-relative locations are fixed, so resolve them once at import time.
+# handler.py is in 'docudive-juristab/app/functions/doc-layout-extraction-DAI/'
+BASE_DIR = Path(__file__).resolve().parent
+# project_root_path for assets is 'app/' (parents[2] from .../doc-layout-extraction-DAI/)
+ASSETS_PROJECT_ROOT = BASE_DIR.parents[2]
+DEFAULT_PDF_PATH = ASSETS_PROJECT_ROOT / "tests" / "assets" / "inputs" / "sample.pdf"
+# Define output directory structure
+OUTPUT_DIR_BASE = ASSETS_PROJECT_ROOT / "tests" / "assets" / "outputs" / "functions" / "output_doc_layout"
+GENAI_OUTPUT_DIR = OUTPUT_DIR_BASE / "genai_outputs"
+
 def main():
     """
     Main function to parse arguments, trigger PDF processing, and save the output.
     """
-    # Define base paths using pathlib as per user's structure
-    # handler.py is in 'docudive-juristab/app/functions/doc-layout-extraction-DAI/'
-    base_dir = Path(__file__).resolve().parent 
-    # project_root_path for assets is 'app/' (parents[2] from .../doc-layout-extraction-DAI/)
-    assets_project_root = base_dir.parents[2] 
-    
-    default_pdf_path = assets_project_root / "tests" / "assets" / "inputs" / "sample.pdf"
-    
-    # Define output directory structure
-    output_dir_base = assets_project_root / "tests" / "assets" / "outputs" / "functions" / "output_doc_layout"
-    genai_output_dir_abs_path = output_dir_base / "genai_outputs"
-
     parser = argparse.ArgumentParser(description="Process a PDF document using Google Document AI and save output as JSON.")
     parser.add_argument(
         "pdf_file_path", 
         type=str, 
         nargs='?',
-        default=str(default_pdf_path), # Use the defined default path
-        help=f"The path to the PDF file to process. Defaults to '{default_pdf_path}'"
+        default=str(DEFAULT_PDF_PATH), # Use the defined default path
+        help=f"The path to the PDF file to process. Defaults to '{DEFAULT_PDF_PATH}'"
     )
     args = parser.parse_args()
 
-    if hasattr(process_document_sample, '__name__') and 'CRITICAL DUMMY' in process_document_sample.__doc__:
+    if IS_DUMMY_CLIENT:
          print("ERROR: Exiting due to critical import errors for Document AI client functions.")
          return
 
@@ -55,7 +55,7 @@ def main():
     # To make it relative to script dir if not absolute (current behavior was os.path.join(script_dir, path)):
     pdf_input_path_obj = Path(args.pdf_file_path)
     if not pdf_input_path_obj.is_absolute():
-        pdf_full_path = (base_dir / pdf_input_path_obj).resolve()
+        pdf_full_path = (BASE_DIR / pdf_input_path_obj).resolve()
     else:
         pdf_full_path = pdf_input_path_obj.resolve()
     
@@ -66,7 +66,7 @@ def main():
         print("\nINFO: Document processing successful.")
         input_pdf_filename = pdf_full_path.name # Get filename from Path object
         
-        save_document_as_json(document_result, genai_output_dir_abs_path, input_pdf_filename)
+        save_document_as_json(document_result, GENAI_OUTPUT_DIR, input_pdf_filename)
     else:
         print("\nINFO: Document processing failed or was aborted.")
 
@@ -1,9 +1,12 @@
 import os
 import sys
 import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import repeat
 from pathlib import Path
 import fitz
-import json
+import orjson
 
 
 # Add project root to PYTHONPATH
@@ -12,11 +15,11 @@ project_root = os.path.abspath(os.path.join(current_dir, "../../"))
 sys.path.insert(0, project_root)
 
 # Local imports
-from utils.file_utils import encode_pdf_to_base64
-from utils.pdf_utils import _create_temp_page_pdf
+from utils.pdf_utils import _extract_single_page_bytes
 from utils.metrics_utils import _initialize_page_metrics
-from utils.pdf_text_extractor import extract_text_from_pdf_page, extract_text_from_ocr, extract_text_and_links_with_fitz
-from utils.text_utils import _verify_item_content_in_direct_text_fuzzy
+from utils.content_cache import ContentCache, content_hash, layout_response_cache
+from utils.pdf_text_extractor import open_pdf_reader, extract_text_from_pdf_reader_page, extract_text_from_ocr_fitz_page, extract_text_and_links_from_fitz_page
+from utils.text_utils import _normalize_text, _verify_item_content_in_direct_text_fuzzy
 
 from core.layout_gemini import _call_gemini_for_layout
 from core.layout_openai import _call_openai_for_layout
@@ -25,195 +28,385 @@ from core.finalizer import _save_results
 
 
 
-def process_pdf(pdf_path: str, output_dir: str, temp_page_dir: str) -> list:
-    os.makedirs(temp_page_dir, exist_ok=True)
-    os.makedirs(output_dir, exist_ok=True)
-    genai_output_dir = os.path.join(output_dir, "genai_outputs")
-    os.makedirs(genai_output_dir, exist_ok=True)
+# Thresholds shared by every page worker.
+PAGE_THRESHOLDS = {
+    "min_direct_pypdf2_text_length": 20,  # Min characters for direct text to be considered "sufficient"
+    "min_fitz_text_length": 20,
+    "fuzzy_match": 88,  # Configurable threshold for fuzzy matching
+}
+
+# Tesseract is fastest with roughly four cores per process, so give each worker four.
+TESSERACT_THREADS_PER_WORKER = 4
+PAGE_WORKERS = max(1, (os.cpu_count() or 1) // TESSERACT_THREADS_PER_WORKER)
+
+# Pages whose GenAI calls may be in flight at once on the driver.
+LAYOUT_WORKERS = 4
+
+# Write buffer for the run-level Fitz/fallback JSONL files.
+RECORD_FILE_BUFFER_SIZE = 1 << 20
+
+# Folded into OCR cache keys; bump it when the OCR settings change so stale text is not reused.
+OCR_CACHE_VERSION = b"fitz-300dpi-gray-tesseract"
+
+# Upper bound on the on-disk GenAI layout response cache; oldest entries are evicted past it.
+LLM_CACHE_SIZE_LIMIT = 10 * 2**30
+
+
+def _init_extraction_worker() -> None:
+    """
+    Caps the OpenMP threads of the Tesseract processes this worker launches, so the
+    PAGE_WORKERS concurrent OCR runs share the cores instead of oversubscribing them.
+    """
+    os.environ.setdefault("OMP_THREAD_LIMIT", str(TESSERACT_THREADS_PER_WORKER))
+
+
+@lru_cache(maxsize=1)
+def _open_source_document(pdf_path: str) -> fitz.Document:
+    """
+    Opens the source PDF once per worker process and keeps the handle for every page the
+    worker prepares, instead of re-parsing the document for each page.
+    """
+    return fitz.open(pdf_path)
+
+
+@lru_cache(maxsize=1)
+def _open_source_pdf_reader(pdf_path: str):
+    """PyPDF2 counterpart of _open_source_document: the source PDF is parsed once per worker process."""
+    return open_pdf_reader(pdf_path)
+
+
+def _prepare_page(pdf_path: str, page_index: int, ocr_cache_dir: str, thresholds: dict) -> dict:
+    """
+    CPU-bound first stage for a single page: page bytes, PyPDF2/OCR fallback text and Fitz text/links.
+    Executed in a worker process, so the source PDF is opened here (fitz documents
+    cannot be pickled) and shared across the worker's pages. The page is handled as in-memory PDF bytes; nothing is written
+    to a temporary file. Returns everything _layout_page needs for the page, plus the
+    Fitz/fallback records the driver appends to the run's JSONL files.
+    """
+    page_num_actual = page_index + 1
+    # Log lines are buffered and written with a single print per page, so concurrent workers
+    # do not interleave partial page logs or contend on stdout for every line.
+    log_lines = []
+    log = log_lines.append
+    log("---------------------")
+    log(f"📤 Processing page: {page_num_actual}")
+
+    MIN_DIRECT_PYPDF2_TEXT_LENGTH_THRESHOLD = thresholds["min_direct_pypdf2_text_length"]
+    MIN_FITZ_TEXT_LENGTH_THRESHOLD = thresholds["min_fitz_text_length"]
+
+    metrics = _initialize_page_metrics(page_num_actual)
+    # Metrics for the "previous fallback mechanism" (Direct PyPDF2 -> OCR)
+    metrics["fallback_text_method_used"] = "none"
+    metrics["fallback_text_status"] = "not_attempted"
+    metrics["fallback_text_char_count"] = 0
+    # Metrics for Fitz extraction
+    metrics["fitz_extraction_status"] = "not_attempted"
+    metrics["fitz_text_char_count"] = 0 # Text from Fitz
+    metrics["fitz_link_count"] = 0
+    # Final chosen text for verification
+    metrics["verification_text_source"] = "none"
+    
+    page_processing_start_time = time.time()
 
-    print(f"📄 Processing PDF: {pdf_path} page by page.")
+    pdf_page_bytes = None
+    chosen_text_from_fallback = ""
+    # Each text source is stripped once and the stripped copy reused for every emptiness/length check.
+    fitz_stripped = ""
+    fallback_stripped = ""
+    hyperlinks_from_fitz = []
+    text_for_content_verification = ""
+    fitz_data_record = None
+    fallback_text_record = None
+    preparation_error = None
 
-    all_responses = []
-    page_metrics_list = []
-    
-    poppler_bin_path = None
-    MIN_DIRECT_PYPDF2_TEXT_LENGTH_THRESHOLD = 20  # Min characters for direct text to be considered "sufficient"
-    MIN_FITZ_TEXT_LENGTH_THRESHOLD = 20
-    FUZZY_MATCH_THRESHOLD = 88 # Configurable threshold for fuzzy matching
-    
-    try:
-        pdf_document = fitz.open(pdf_path)
-    except Exception as e:
-        print(f"❌ Failed to open PDF {pdf_path}: {e}")
-        return []
+    extraction_path_taken = ["fitz"] # Extractors actually run for this page, recorded in metrics
 
-    for page_index in range(len(pdf_document)):
-        page_num_actual = page_index + 1
-        print("---------------------")
-        print(f"📤 Processing page: {page_num_actual}")
-
-        metrics = _initialize_page_metrics(page_num_actual)
-        # Metrics for the "previous fallback mechanism" (Direct PyPDF2 -> OCR)
-        metrics["fallback_text_method_used"] = "none"
-        metrics["fallback_text_status"] = "not_attempted"
-        metrics["fallback_text_char_count"] = 0
-        # Metrics for Fitz extraction
-        metrics["fitz_extraction_status"] = "not_attempted"
-        metrics["fitz_text_char_count"] = 0 # Text from Fitz
-        metrics["fitz_link_count"] = 0
-        # Final chosen text for verification
-        metrics["verification_text_source"] = "none"
-        
-        page_processing_start_time = time.time()
-
-        temp_pdf_page_path = os.path.join(temp_page_dir, f"temp_page_{page_num_actual}.pdf")
-        pdf_page_base64 = None
-        chosen_text_for_page = ""
-        hyperlinks_from_fitz = []
-        actual_direct_text_for_page = "" # Store direct text separately for verification
-
-        # Initialize hyperlink data structure for the current page
-        # This will now be returned by the subfunction.
-        # extracted_hyperlinks_data = {"hyperlinks": [], "status": "not_attempted", "error_message": ""}
+    try:
+        pdf_document = _open_source_document(pdf_path)
+        page_bytes_start_time = time.time()
+        pdf_page_bytes = _extract_single_page_bytes(pdf_document, page_index)
+        metrics["time_sec_temp_pdf_creation"] = time.time() - page_bytes_start_time
 
+        # --- Block 1: Fitz Text and Link Extraction ---
+        log(f"ℹ️ Attempting text and link extraction with Fitz for page {page_num_actual}")
         try:
-            temp_pdf_creation_start_time = time.time()
-            _create_temp_page_pdf(pdf_document, page_index, temp_pdf_page_path)
-            metrics["time_sec_temp_pdf_creation"] = time.time() - temp_pdf_creation_start_time
-            pdf_page_base64 = encode_pdf_to_base64(temp_pdf_page_path)
-
-            # --- Block 1: "Previous Fallback Mechanism" (Direct PyPDF2 -> OCR) ---
+            # Read straight from the already parsed source page rather than re-opening the page bytes.
+            fitz_page_text, hyperlinks_from_fitz = extract_text_and_links_from_fitz_page(pdf_document[page_index], pdf_path)
+            fitz_stripped = fitz_page_text.strip()
+            fitz_data_record = {
+                "page_number": page_num_actual,
+                "fitz_extracted_text": fitz_page_text,
+                "extracted_hyperlinks": hyperlinks_from_fitz
+            }
+            log(f"✅ Fitz data (text & {len(hyperlinks_from_fitz)} links) extracted for page {page_num_actual}.")
+            metrics["fitz_extraction_status"] = "success"
+            metrics["fitz_text_char_count"] = len(fitz_stripped)
+            metrics["fitz_link_count"] = len(hyperlinks_from_fitz)
+        except Exception as e_fitz:
+            log(f"⚠️ Fitz extraction failed for page {page_num_actual}: {e_fitz}")
+            metrics["fitz_extraction_status"] = f"fail: {str(e_fitz)}"
+            fitz_page_text = "" # Ensure empty on failure for decision making
+            fitz_stripped = ""
+            hyperlinks_from_fitz = []
+            fitz_data_record = {"error": f"Fitz extraction failed: {str(e_fitz)}", "page_number": page_num_actual}
+
+        # --- Block 2: "Previous Fallback Mechanism" (Direct PyPDF2 -> OCR) ---
+        # Only needed when Fitz found too little text; this skips the OCR cost on text-native pages.
+        fitz_text_sufficient = (metrics["fitz_extraction_status"] == "success"
+                                and len(fitz_stripped) > MIN_FITZ_TEXT_LENGTH_THRESHOLD)
+        if fitz_text_sufficient:
+            metrics["fallback_text_method_used"] = "skipped_fitz_sufficient"
+            metrics["fallback_text_status"] = "skipped"
+            log(f"ℹ️ Fitz text is sufficient for page {page_num_actual}; skipping PyPDF2/OCR fallback.")
+        else:
             direct_pypdf2_sufficient = False
-            try:
-                print(f"ℹ️ Attempting PyPDF2 direct text extraction for page {page_num_actual}")
-                direct_pypdf2_text = extract_text_from_pdf_page(temp_pdf_page_path, 0)
-                if direct_pypdf2_text and len(direct_pypdf2_text.strip()) > MIN_DIRECT_PYPDF2_TEXT_LENGTH_THRESHOLD:
-                    chosen_text_from_fallback = direct_pypdf2_text
+            direct_pypdf2_text, pypdf2_stripped = "", ""
+            # A page Fitz read successfully without finding any text has no text layer for PyPDF2 either;
+            # with no raster images it has nothing to OCR either, so it is treated as empty.
+            fitz_found_no_text = metrics["fitz_extraction_status"] == "success" and not fitz_stripped
+            page_has_images = bool(pdf_document[page_index].get_images())
+            if fitz_found_no_text:
+                log(f"ℹ️ Fitz found no text layer on page {page_num_actual}; skipping PyPDF2.")
+            else:
+                extraction_path_taken.append("pypdf2")
+                try:
+                    log(f"ℹ️ Attempting PyPDF2 direct text extraction for page {page_num_actual}")
+                    direct_pypdf2_text = extract_text_from_pdf_reader_page(_open_source_pdf_reader(pdf_path), page_index)
+                    pypdf2_stripped = (direct_pypdf2_text or "").strip()
+                    if len(pypdf2_stripped) > MIN_DIRECT_PYPDF2_TEXT_LENGTH_THRESHOLD:
+                        chosen_text_from_fallback = direct_pypdf2_text
+                        fallback_stripped = pypdf2_stripped
+                        metrics["fallback_text_method_used"] = "direct_pypdf2"
+                        metrics["fallback_text_status"] = "success"
+                        direct_pypdf2_sufficient = True
+                        log(f"✅ PyPDF2 direct text extracted for fallback mechanism page {page_num_actual}.")
+                    else:
+                        log_msg = "no/empty text" if not pypdf2_stripped else "insufficient text"
+                        log(f"ℹ️ PyPDF2 direct text extraction yielded {log_msg}. Will attempt OCR for fallback.")
+                except Exception as e_direct:
+                    log(f"⚠️ PyPDF2 direct text extraction failed for page {page_num_actual}: {e_direct}")
+
+            if not direct_pypdf2_sufficient and (pypdf2_stripped or fitz_stripped) and not page_has_images:
+                # A page with a text layer and no raster images: OCR could only re-read that same text layer.
+                if pypdf2_stripped:
+                    chosen_text_from_fallback, fallback_stripped = direct_pypdf2_text, pypdf2_stripped
                     metrics["fallback_text_method_used"] = "direct_pypdf2"
-                    metrics["fallback_text_status"] = "success"
-                    direct_pypdf2_sufficient = True
-                    print(f"✅ PyPDF2 direct text extracted for fallback mechanism page {page_num_actual}.")
                 else:
-                    log_msg = "no/empty text" if not direct_pypdf2_text or len(direct_pypdf2_text.strip()) == 0 else "insufficient text"
-                    print(f"ℹ️ PyPDF2 direct text extraction yielded {log_msg}. Will attempt OCR for fallback.")
-            except Exception as e_direct:
-                print(f"⚠️ PyPDF2 direct text extraction failed for page {page_num_actual}: {e_direct}")
-
-            if not direct_pypdf2_sufficient:
-                print(f"ℹ️ Attempting OCR for page {page_num_actual} (Fallback Mekanisme 2)...")
+                    chosen_text_from_fallback, fallback_stripped = fitz_page_text, fitz_stripped
+                    metrics["fallback_text_method_used"] = "fitz"
+                metrics["fallback_text_status"] = "ocr_skipped_no_raster_images"
+                log(f"ℹ️ Page {page_num_actual} has embedded text and no images; skipping OCR.")
+            elif fitz_found_no_text and not page_has_images:
+                metrics["fallback_text_status"] = "skipped_empty_page"
+                extraction_path_taken.append("empty_page")
+                log(f"ℹ️ Page {page_num_actual} has neither text nor images; skipping OCR.")
+            elif not direct_pypdf2_sufficient:
+                extraction_path_taken.append("ocr")
+                log(f"ℹ️ Attempting OCR for page {page_num_actual} (Fallback Mekanisme 2)...")
                 try:
-                    ocr_text = extract_text_from_ocr(temp_pdf_page_path, 0, poppler_path=poppler_bin_path)
-                    if ocr_text and len(ocr_text.strip()) > 0:
+                    # OCR is the slowest step, so its text is cached on disk keyed by the page's content hash.
+                    ocr_cache = ContentCache(ocr_cache_dir)
+                    ocr_cache_key = content_hash(pdf_page_bytes, OCR_CACHE_VERSION)
+                    cached_ocr_text = ocr_cache.get(ocr_cache_key)
+                    if cached_ocr_text is not None:
+                        ocr_text = cached_ocr_text.decode("utf-8")
+                        log(f"ℹ️ OCR cache hit for page {page_num_actual}.")
+                    else:
+                        ocr_text = extract_text_from_ocr_fitz_page(pdf_document[page_index])
+                        ocr_cache.set(ocr_cache_key, ocr_text.encode("utf-8"))
+                    ocr_stripped = (ocr_text or "").strip()
+                    if ocr_stripped:
                         chosen_text_from_fallback = ocr_text
+                        fallback_stripped = ocr_stripped
                         metrics["fallback_text_method_used"] = "ocr_fallback"
                         metrics["fallback_text_status"] = "success"
-                        print(f"✅ OCR text extracted for fallback mechanism page {page_num_actual}.")
+                        log(f"✅ OCR text extracted for fallback mechanism page {page_num_actual}.")
                     else:
                         metrics["fallback_text_method_used"] = "ocr_fallback"
                         metrics["fallback_text_status"] = "ocr_empty_result"
                 except Exception as e_ocr:
-                    print(f"⚠️ OCR extraction failed for page {page_num_actual}: {e_ocr}")
+                    log(f"⚠️ OCR extraction failed for page {page_num_actual}: {e_ocr}")
                     metrics["fallback_text_method_used"] = "ocr_fallback"
                     metrics["fallback_text_status"] = f"ocr_fail: {str(e_ocr)}"
-            
-            metrics["fallback_text_char_count"] = len(chosen_text_from_fallback.strip())
-            if chosen_text_from_fallback.strip():
-                fb_text_path = os.path.join(genai_output_dir, f"page_{page_num_actual}_fallback_text.txt")
-                with open(fb_text_path, "w", encoding="utf-8") as f: f.write(chosen_text_from_fallback)
-                #print(f"✅ Fallback text saved to {fb_text_path}")
-                print(f"✅ Fallback text saved")
-
-
-            # --- Block 2: Fitz Text and Link Extraction ---
-            print(f"ℹ️ Attempting text and link extraction with Fitz for page {page_num_actual}")
-            fitz_output_filename = f"page_{page_num_actual}_fitz_data.json"
-            fitz_output_path = os.path.join(genai_output_dir, fitz_output_filename)
-            try:
-                fitz_page_text, hyperlinks_from_fitz = extract_text_and_links_with_fitz(temp_pdf_page_path, 0)
-                fitz_data_to_save = {
-                    "page_number": page_num_actual,
-                    "fitz_extracted_text": fitz_page_text,
-                    "extracted_hyperlinks": hyperlinks_from_fitz
-                }
-                with open(fitz_output_path, "w", encoding="utf-8") as f:
-                    json.dump(fitz_data_to_save, f, indent=2, ensure_ascii=False)
-                print(f"✅ Fitz data (text & {len(hyperlinks_from_fitz)} links) for page {page_num_actual} saved.")
-                metrics["fitz_extraction_status"] = "success"
-                metrics["fitz_text_char_count"] = len(fitz_page_text.strip())
-                metrics["fitz_link_count"] = len(hyperlinks_from_fitz)
-            except Exception as e_fitz:
-                print(f"⚠️ Fitz extraction failed for page {page_num_actual}: {e_fitz}")
-                metrics["fitz_extraction_status"] = f"fail: {str(e_fitz)}"
-                fitz_page_text = "" # Ensure empty on failure for decision making
-                hyperlinks_from_fitz = []
-                with open(fitz_output_path, "w", encoding="utf-8") as f: # Save error info
-                    json.dump({"error": f"Fitz extraction failed: {str(e_fitz)}", "page_number": page_num_actual}, f, indent=2)
-
-            # --- Determine Text for Content Verification ---
-            if metrics["fitz_extraction_status"] == "success" and fitz_page_text.strip():
-                text_for_content_verification = fitz_page_text
-                metrics["verification_text_source"] = "fitz"
-                print(f"ℹ️ Using Fitz-extracted text for content verification on page {page_num_actual}.")
-            elif chosen_text_from_fallback.strip():
-                text_for_content_verification = chosen_text_from_fallback
-                metrics["verification_text_source"] = metrics["fallback_text_method_used"]
-                print(f"ℹ️ Using Fallback text for content verification on page {page_num_actual} (Fitz text unavailable/empty).")
-            else:
-                text_for_content_verification = "" # No usable text from either method
-                metrics["verification_text_source"] = "none_available"
-                print(f"ℹ️ No text available from Fitz or Fallback for content verification on page {page_num_actual}.")
 
+            metrics["fallback_text_char_count"] = len(fallback_stripped)
+            if fallback_stripped:
+                fallback_text_record = {"page_number": page_num_actual, "fallback_text": chosen_text_from_fallback}
+
+        # --- Determine Text for Content Verification ---
+        if metrics["fitz_extraction_status"] == "success" and fitz_stripped:
+            text_for_content_verification = fitz_page_text
+            metrics["verification_text_source"] = "fitz"
+            log(f"ℹ️ Using Fitz-extracted text for content verification on page {page_num_actual}.")
+        elif fallback_stripped:
+            text_for_content_verification = chosen_text_from_fallback
+            metrics["verification_text_source"] = metrics["fallback_text_method_used"]
+            log(f"ℹ️ Using Fallback text for content verification on page {page_num_actual} (Fitz text unavailable/empty).")
+        else:
+            text_for_content_verification = "" # No usable text from either method
+            metrics["verification_text_source"] = "none_available"
+            log(f"ℹ️ No text available from Fitz or Fallback for content verification on page {page_num_actual}.")
+
+    except Exception as e_outer_page_processing:
+        log(f"❌ Outer error preparing page {page_num_actual}: {e_outer_page_processing}")
+        preparation_error = str(e_outer_page_processing)
+        metrics["text_extraction_status"] = metrics.get("text_extraction_status", "fail_due_to_outer_error")
+
+    finally:
+        metrics["extraction_path_taken"] = "+".join(extraction_path_taken)
+        metrics["time_sec_total_page_processing"] = time.time() - page_processing_start_time
+        print("\n".join(log_lines), flush=True)
+
+    return {
+        "page_num_actual": page_num_actual,
+        "pdf_page_bytes": pdf_page_bytes,
+        "text_for_content_verification": text_for_content_verification,
+        # Normalized once here, in the extraction worker, rather than on the driver during verification.
+        "normalized_text_for_content_verification": _normalize_text(text_for_content_verification),
+        "fitz_data_record": fitz_data_record,
+        "fallback_text_record": fallback_text_record,
+        "preparation_error": preparation_error,
+        "metrics": metrics,
+    }
+
+
+def _layout_page(prepared_page: dict, genai_output_dir: str, thresholds: dict) -> tuple:
+    """
+    Network-bound second stage for a single page: GenAI layout, orchestration and content
+    verification. Runs on a driver thread. Returns (final_page_response, metrics).
+    """
+    page_num_actual = prepared_page["page_num_actual"]
+    pdf_page_bytes = prepared_page["pdf_page_bytes"]
+    text_for_content_verification = prepared_page["text_for_content_verification"]
+    normalized_text_for_content_verification = prepared_page["normalized_text_for_content_verification"]
+    metrics = prepared_page["metrics"]
+    FUZZY_MATCH_THRESHOLD = thresholds["fuzzy_match"]
+    log_lines = []
+    log = log_lines.append
+
+    layout_start_time = time.time()
+    try:
+        if prepared_page["preparation_error"] is not None:
+            raise RuntimeError(prepared_page["preparation_error"])
+
+        # --- GenAI Layout Calls ---
+        # The two models are independent network round-trips, so run them side by side.
+        # Both take the raw page bytes; Gemini base64-encodes them directly into its request body.
+        with ThreadPoolExecutor(max_workers=2) as model_executor:
+            gemini_future = model_executor.submit(_call_gemini_for_layout, pdf_page_bytes, page_num_actual, 1, metrics)
+            openai_future = model_executor.submit(_call_openai_for_layout, pdf_page_bytes, page_num_actual, genai_output_dir, metrics)
+            gemini_json = gemini_future.result()
+            openai_json = openai_future.result()
+
+        # --- Orchestration Call ---
+        final_page_response = _orchestrate_page_processing(
+            pdf_page_bytes, gemini_json, openai_json,
+            page_num_actual, genai_output_dir, pdf_page_bytes, metrics
+        )
+
+        # --- Content Verification Step ---
+        # This modifies final_page_response in place by updating "verification-flag"
+        if isinstance(final_page_response, dict):
+            final_page_response = _verify_item_content_in_direct_text_fuzzy( # Ensure this function is correctly imported/defined
+                final_page_response, 
+                text_for_content_verification, 
+                page_num_actual,
+                fuzzy_threshold=FUZZY_MATCH_THRESHOLD,
+                normalized_direct_text=normalized_text_for_content_verification
+            )
+            log(f"✅ Content verification against chosen extracted text completed for page {page_num_actual}.")
+        else:
+            log(f"⚠️ Skipping content verification for page {page_num_actual} as final_page_response is not a dictionary.")
 
-            # --- GenAI Layout Calls ---
-            gemini_json = _call_gemini_for_layout(pdf_page_base64, page_num_actual, genai_output_dir, metrics)
-            openai_json = _call_openai_for_layout(temp_pdf_page_path, page_num_actual, genai_output_dir, metrics)
+        log(f"✅ Page {page_num_actual} processed.")
 
-            # --- Orchestration Call ---
-            final_page_response = _orchestrate_page_processing(
-                pdf_page_base64, gemini_json, openai_json,
-                page_num_actual, genai_output_dir, temp_pdf_page_path, metrics
-            )
+    except Exception as e_outer_page_processing:
+        log(f"❌ Outer error processing page {page_num_actual}: {e_outer_page_processing}")
+        page_error_info = {
+            "error": f"General error processing page {page_num_actual}", "details": str(e_outer_page_processing),
+            "page_number": page_num_actual, "page_verification_status": "fail - page processing error"
+        }
+        final_page_response = page_error_info
+        metrics["verification_status"] = metrics.get("verification_status", "fail - page processing error")
+        metrics["text_extraction_status"] = metrics.get("text_extraction_status", "fail_due_to_outer_error")
 
-            # --- Content Verification Step ---
-            # This modifies final_page_response in place by updating "verification-flag"
-            if isinstance(final_page_response, dict):
-                final_page_response = _verify_item_content_in_direct_text_fuzzy( # Ensure this function is correctly imported/defined
-                    final_page_response, 
-                    text_for_content_verification, 
-                    page_num_actual,
-                    fuzzy_threshold=FUZZY_MATCH_THRESHOLD 
-                )
-                print(f"✅ Content verification against chosen extracted text completed for page {page_num_actual}.")
-            else:
-                print(f"⚠️ Skipping content verification for page {page_num_actual} as final_page_response is not a dictionary.")
+    finally:
+        metrics["time_sec_total_page_processing"] += time.time() - layout_start_time
+        print("\n".join(log_lines), flush=True)
 
-            all_responses.append(final_page_response)
-            print(f"✅ Page {page_num_actual} processed and response appended.")
+    return final_page_response, metrics
 
-        except Exception as e_outer_page_processing:
-            print(f"❌ Outer error processing page {page_num_actual} (temp PDF: {temp_pdf_page_path}): {e_outer_page_processing}")
-            page_error_info = {
-                "error": f"General error processing page {page_num_actual}", "details": str(e_outer_page_processing),
-                "page_number": page_num_actual, "page_verification_status": "fail - page processing error"
-            }
-            all_responses.append(page_error_info)
-            metrics["verification_status"] = metrics.get("verification_status", "fail - page processing error")
-            metrics["text_extraction_status"] = metrics.get("text_extraction_status", "fail_due_to_outer_error")
 
-        finally:
-            metrics["time_sec_total_page_processing"] = time.time() - page_processing_start_time
-            if os.path.exists(temp_pdf_page_path):
-                try:
-                    os.remove(temp_pdf_page_path)
-                except Exception as e_delete:
-                    print(f"⚠️ Failed to delete temporary PDF {temp_pdf_page_path}: {e_delete}")
+def process_pdf(pdf_path: str, output_dir: str, temp_page_dir: str) -> list:
+    # Pages are handled as in-memory bytes, so nothing is written to (or needs cleaning from)
+    # temp_page_dir any more; the argument is kept so existing callers do not break.
+    os.makedirs(output_dir, exist_ok=True)
+    genai_output_dir = os.path.join(output_dir, "genai_outputs")
+    os.makedirs(genai_output_dir, exist_ok=True)
+    ocr_cache_dir = os.path.join(output_dir, ".ocr_cache")
+    layout_response_cache.attach_directory(os.path.join(output_dir, ".llm_cache"), size_limit=LLM_CACHE_SIZE_LIMIT)
 
-        page_metrics_list.append(metrics)
+    print(f"📄 Processing PDF: {pdf_path} page by page.")
 
-    if pdf_document:
-        pdf_document.close()
+    try:
+        with fitz.open(pdf_path) as pdf_document:
+            page_count = len(pdf_document)
+    except Exception as e:
+        print(f"❌ Failed to open PDF {pdf_path}: {e}")
+        return []
 
-    _save_results(all_responses, page_metrics_list, output_dir)
+    # Two-stage pipeline: CPU-bound extraction runs in worker processes while the network-bound
+    # GenAI stage runs on driver threads, so one page's model calls overlap the next page's extraction.
+    # map() yields prepared pages in page order and the futures list keeps the results in that order.
+    page_indices = range(page_count)
+    # Per-page Fitz and fallback outputs go to one JSONL file each rather than two small files per page.
+    fitz_data_path = os.path.join(genai_output_dir, "fitz_data.jsonl")
+    fallback_texts_path = os.path.join(genai_output_dir, "fallback_texts.jsonl")
+    # Final page responses are streamed to results.jsonl in page order as they complete, instead of
+    # being held in memory for the whole document.
+    results_path = os.path.join(output_dir, "results.jsonl")
+    page_metrics_list = []
+    with ProcessPoolExecutor(max_workers=min(PAGE_WORKERS, max(1, page_count)),
+                             initializer=_init_extraction_worker) as extraction_executor, \
+            ThreadPoolExecutor(max_workers=LAYOUT_WORKERS) as layout_executor, \
+            open(fitz_data_path, "wb", buffering=RECORD_FILE_BUFFER_SIZE) as fitz_data_file, \
+            open(fallback_texts_path, "wb", buffering=RECORD_FILE_BUFFER_SIZE) as fallback_texts_file, \
+            open(results_path, "wb", buffering=RECORD_FILE_BUFFER_SIZE) as results_file:
+
+        layout_futures = []
+        next_result_index = 0
+
+        def write_finished_results(wait: bool) -> None:
+            nonlocal next_result_index
+            while next_result_index < len(layout_futures):
+                future = layout_futures[next_result_index]
+                if not wait and not future.done():
+                    return
+                final_page_response, metrics = future.result()
+                layout_futures[next_result_index] = None # Drop the reference so the response can be freed
+                results_file.write(orjson.dumps(final_page_response, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS))
+                page_metrics_list.append(metrics)
+                next_result_index += 1
+
+        prepared_pages = extraction_executor.map(
+            _prepare_page,
+            repeat(pdf_path, page_count), page_indices,
+            repeat(ocr_cache_dir, page_count), repeat(PAGE_THRESHOLDS, page_count)
+        )
+        for prepared_page in prepared_pages:
+            fitz_data_record = prepared_page.pop("fitz_data_record")
+            fallback_text_record = prepared_page.pop("fallback_text_record")
+            layout_futures.append(layout_executor.submit(_layout_page, prepared_page, genai_output_dir, PAGE_THRESHOLDS))
+            if fitz_data_record is not None:
+                fitz_data_file.write(orjson.dumps(fitz_data_record, option=orjson.OPT_APPEND_NEWLINE))
+            if fallback_text_record is not None:
+                fallback_texts_file.write(orjson.dumps(fallback_text_record, option=orjson.OPT_APPEND_NEWLINE))
+            del fitz_data_record, fallback_text_record
+            write_finished_results(wait=False)
+        write_finished_results(wait=True)
+
+    # Responses are already on disk in results.jsonl; _save_results only needs the metrics.
+    _save_results([], page_metrics_list, output_dir)
 
     return page_metrics_list
 
@@ -227,8 +420,8 @@ if __name__ == "__main__":
     except ImportError: print("⚠️ PyPDF2 library not found. Direct PyPDF2 text extraction will fail.")
     try: from pdf2image import convert_from_path
     except ImportError: print("⚠️ pdf2image library not found. OCR extraction will fail.")
-    try: from thefuzz import fuzz # For _verify_item_content_in_direct_text_fuzzy
-    except ImportError: print("⚠️ thefuzz library not found. Fuzzy verification will fail. pip install thefuzz python-Levenshtein")
+    try: from rapidfuzz import fuzz # For _verify_item_content_in_direct_text_fuzzy
+    except ImportError: print("⚠️ rapidfuzz library not found. Fuzzy verification will fail. pip install rapidfuzz")
 
  
     base_dir = Path(__file__).resolve().parent
@@ -250,7 +443,6 @@ if __name__ == "__main__":
     # Ensure output folders exist
     os.makedirs(output_dir_path, exist_ok=True)
     os.makedirs(genai_output_dir, exist_ok=True)
-    os.makedirs(temp_pdf_page_dir_path, exist_ok=True)
 
     print(f"Input PDF path: {pdf_path}")
     print(f"Output directory: {output_dir_path}")
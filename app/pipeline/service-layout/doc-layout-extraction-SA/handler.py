@@ -1,10 +1,12 @@
 import os
 import sys
 import time
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 import fitz  # PyMuPDF
-import json
-import copy # For deep copying
+import orjson # C-backed JSON serializer; writes UTF-8 bytes directly
+import ahocorasick
 
 # Add project root to PYTHONPATH
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -15,13 +17,14 @@ if project_root not in sys.path:
 
 # Local imports
 try:
-    from utils.file_utils import encode_pdf_to_base64
-    from utils.pdf_utils import _create_temp_chunk_pdf
+    from utils.pdf_utils import _extract_page_range_bytes
     from utils.metrics_utils import _initialize_page_metrics #
+    from utils.content_cache import layout_response_cache
     from utils.pdf_text_extractor import (
-        extract_text_from_pdf_chunk_pypdf2,
-        extract_text_from_chunk_ocr,
-        extract_text_and_links_from_chunk_fitz
+        open_pdf_reader,
+        extract_text_from_pdf_reader_page,
+        extract_text_from_ocr_fitz_page,
+        extract_text_and_links_from_fitz_page
     )
     from utils.file_converters import convert_book_json_to_html
     from utils import text_utils
@@ -32,10 +35,125 @@ except ImportError as e:
     sys.exit(1)
 
 
-def _extract_page_data_from_gemini_chunk_output(gemini_chunk_output: dict, target_actual_page_num: int) -> list:
+# Tesseract is fastest with roughly four cores per process, so give each Stage 2 worker four.
+TESSERACT_THREADS_PER_WORKER = 4
+PAGE_WORKERS = max(1, (os.cpu_count() or 1) // TESSERACT_THREADS_PER_WORKER)
+
+# Gemini batch calls that may be in flight at once on the driver.
+GEMINI_WORKERS = 4
+
+# Pages per Gemini call. Batches do not overlap, so every page is uploaded exactly once.
+DEFAULT_GEMINI_BATCH_SIZE = 10
+MAX_GEMINI_BATCH_SIZE = 1000 # Gemini's per-request PDF page limit
+
+# Preceding pages optionally sent ahead of each batch as layout context (GEMINI_BATCH_OVERLAP); their
+# output is discarded. The default of 0 keeps every page uploaded exactly once.
+DEFAULT_GEMINI_BATCH_OVERLAP = 0
+
+# Opt-in (FITZ_LAYOUT_SHORTCUT=1): pages with an ample text layer and no images get their layout from
+# Fitz text blocks instead of a Gemini call. "Ample" is this many times MIN_FITZ_LEN characters.
+DEFAULT_FITZ_LAYOUT_MIN_TEXT_FACTOR = 10
+
+# Upper bound on the on-disk Gemini layout response cache; oldest entries are evicted past it.
+LLM_CACHE_SIZE_LIMIT = 10 * 2**30
+
+
+def _init_extraction_worker() -> None:
+    """
+    Caps the OpenMP threads of the Tesseract processes this worker launches, so the
+    PAGE_WORKERS concurrent OCR runs share the cores instead of oversubscribing them.
+    """
+    os.environ.setdefault("OMP_THREAD_LIMIT", str(TESSERACT_THREADS_PER_WORKER))
+
+
+@lru_cache(maxsize=1)
+def _open_source_document(pdf_path: str) -> fitz.Document:
+    """Opens the source PDF once per worker process and reuses the handle for every page it processes."""
+    return fitz.open(pdf_path)
+
+
+@lru_cache(maxsize=1)
+def _open_source_pdf_reader(pdf_path: str):
+    """Opens the source PDF with PyPDF2 once per worker process, the same way as _open_source_document."""
+    return open_pdf_reader(pdf_path)
+
+
+def _bucket_gemini_items_by_page(gemini_chunk_output: dict) -> dict:
+    """
+    Groups the "items" list of a Gemini chunk output by page_number, so that selecting each
+    page's items is a dict lookup instead of a scan over every item in the chunk.
+    """
+    items_by_page = {}
+    if isinstance(gemini_chunk_output, dict) and isinstance(gemini_chunk_output.get("items"), list):
+        for item in gemini_chunk_output["items"]:
+            if isinstance(item, dict):
+                items_by_page.setdefault(item.get("page_number"), []).append(item)
+    return items_by_page
+
+
+def _fitz_layout_for_simple_page(page: fitz.Page, min_text_len: int) -> list | None:
+    """
+    Builds layout items (in the Gemini item shape) from the Fitz text blocks of a plain text page, or
+    returns None if the page needs Gemini: too little text, or any image block (figures, scans).
+    Blocks set noticeably larger than the page's body text, or short all-bold blocks, become headings.
+    """
+    page_dict = page.get_text("dict")
+    text_blocks = []
+    for block in page_dict.get("blocks", []):
+        if block.get("type") == 1: # Image block
+            return None
+        spans = [span for line in block.get("lines", []) for span in line.get("spans", [])]
+        block_text = "\n".join(
+            "".join(span.get("text", "") for span in line.get("spans", [])).strip() for line in block.get("lines", [])
+        ).strip()
+        if block_text:
+            text_blocks.append((block_text, spans))
+    if not text_blocks or sum(len(block_text) for block_text, _ in text_blocks) < min_text_len:
+        return None
+
+    # Body text size: the font size carrying the most characters on the page
+    chars_per_size = {}
+    for _, spans in text_blocks:
+        for span in spans:
+            size = round(span.get("size", 0), 1)
+            chars_per_size[size] = chars_per_size.get(size, 0) + len(span.get("text", ""))
+    body_size = max(chars_per_size, key=chars_per_size.get) or 1
+
+    page_items = []
+    for block_text, spans in text_blocks:
+        block_size = max((span.get("size", 0) for span in spans), default=0)
+        all_bold = bool(spans) and all(span.get("flags", 0) & 16 for span in spans if span.get("text", "").strip())
+        if block_size >= body_size * 1.5:
+            tag = "Heading-h1"
+        elif block_size >= body_size * 1.2:
+            tag = "Heading-h2"
+        elif all_bold and len(block_text) < 200:
+            tag = "Heading-h3"
+        else:
+            tag = "Paragraph"
+        page_items.append({"correlation-id": None, "tag": tag, "content": block_text, "clause-type": None, "layout_source": "fitz"})
+    return page_items
+
+
+def _contiguous_page_batches(page_indices: list, batch_size: int) -> list:
+    """Splits ascending 0-based page indices into runs of consecutive pages, each at most batch_size long."""
+    batches = []
+    for page_idx in page_indices:
+        if batches and batches[-1][-1] == page_idx - 1 and len(batches[-1]) < batch_size:
+            batches[-1].append(page_idx)
+        else:
+            batches.append([page_idx])
+    return batches
+
+
+def _extract_page_data_from_gemini_chunk_output(gemini_chunk_output: dict, target_actual_page_num: int, items_by_page: dict | None = None) -> list:
     """
     Extracts the list of content items for a specific page from the 
     potentially complex structure returned by _call_gemini_for_layout.
+    items_by_page is the chunk's output from _bucket_gemini_items_by_page; pass it when selecting
+    several pages from the same chunk so the items are grouped only once.
+    Items are returned by reference, not copied: each page's data is pickled into its own
+    finalization worker, which is the only place the items are modified.
     """
     if not isinstance(gemini_chunk_output, dict):
         return [{"error": f"Gemini output for chunk was not a dict for page {target_actual_page_num}"}]
@@ -43,15 +161,14 @@ def _extract_page_data_from_gemini_chunk_output(gemini_chunk_output: dict, targe
     # Case 1: Output is a dictionary with "PageX" keys
     page_key = f"Page{target_actual_page_num}"
     if page_key in gemini_chunk_output and isinstance(gemini_chunk_output[page_key], list):
-        return copy.deepcopy(gemini_chunk_output[page_key])
+        return gemini_chunk_output[page_key]
     
     # Case 2: Output is a dictionary with an "items" list (Gemini parsed a list response)
     # and items have "page_number"
     if "items" in gemini_chunk_output and isinstance(gemini_chunk_output["items"], list):
-        page_items = []
-        for item in gemini_chunk_output["items"]:
-            if isinstance(item, dict) and item.get("page_number") == target_actual_page_num:
-                page_items.append(copy.deepcopy(item))
+        if items_by_page is None:
+            items_by_page = _bucket_gemini_items_by_page(gemini_chunk_output)
+        page_items = items_by_page.get(target_actual_page_num)
         if page_items: # Found items specifically for this page
             return page_items
         # If items exist but none match target_actual_page_num, this might indicate an issue or
@@ -63,11 +180,11 @@ def _extract_page_data_from_gemini_chunk_output(gemini_chunk_output: dict, targe
     if gemini_chunk_output.get("page_number") == target_actual_page_num and "items" not in gemini_chunk_output and not any(k.startswith("Page") for k in gemini_chunk_output.keys()):
          # This implies the entire dict might be for this page, or it's a single item.
          # We expect a list of items for a page.
-        return [copy.deepcopy(gemini_chunk_output)]
+        return [gemini_chunk_output]
 
     # Case 4: If it's an error structure from Gemini call
     if "error" in gemini_chunk_output:
-        return [copy.deepcopy(gemini_chunk_output)] # Propagate the error structure
+        return [gemini_chunk_output] # Propagate the error structure
 
     # Fallback or if page not found in a structured way (should be rare if _call_gemini_for_layout works as expected)
     # This might mean the chunk didn't yield specific data for this page number,
@@ -76,6 +193,98 @@ def _extract_page_data_from_gemini_chunk_output(gemini_chunk_output: dict, targe
     return [{"error": f"Could not isolate page {target_actual_page_num} data from Gemini chunk"}]
 
 
+@lru_cache(maxsize=8192)
+def _norm(text: str) -> str:
+    """Memoized text_utils._normalize_text; link texts and item contents repeat across a document's pages."""
+    return text_utils._normalize_text(text)
+
+
+def _build_hyperlink_automaton(hyperlinks: list) -> tuple:
+    """
+    Builds an Aho-Corasick automaton over the normalized text of a page's hyperlinks, so each
+    GenAI item can be matched against all of them in a single pass. Each key maps to the indices
+    of the hyperlinks sharing that text. Returns (automaton, length of the shortest key), or
+    (None, 0) if no hyperlink has usable text.
+    """
+    automaton = ahocorasick.Automaton()
+    min_key_len = 0
+    for idx, hyperlink in enumerate(hyperlinks):
+        hyperlink_text = hyperlink.get("text")
+        if hyperlink_text and isinstance(hyperlink_text, str):
+            normalized_hyperlink_text = _norm(hyperlink_text)
+            if normalized_hyperlink_text:
+                indices = automaton.get(normalized_hyperlink_text, None)
+                if indices is None:
+                    automaton.add_word(normalized_hyperlink_text, [idx])
+                    if not min_key_len or len(normalized_hyperlink_text) < min_key_len:
+                        min_key_len = len(normalized_hyperlink_text)
+                else:
+                    indices.append(idx)
+    if len(automaton) == 0:
+        return None, 0
+    automaton.make_automaton()
+    return automaton, min_key_len
+
+
+def _verify_and_link_page_content(
+    content_to_verify_and_finalize: list,
+    text_for_content_verification: str,
+    hyperlinks_from_fitz_content: list,
+    page_metrics: dict,
+    actual_page_num: int,
+    fuzzy_match_thresh: int,
+    min_content_len_for_fuzzy: int
+) -> list:
+    """
+    Fuzzy-verifies a page's GenAI items against its direct text, attaches the Fitz hyperlinks found in
+    each item and normalizes the item keys. Works in place on the (non-error) item list and returns it.
+    """
+    # --- Content Verification ---
+    if isinstance(content_to_verify_and_finalize, list) and content_to_verify_and_finalize:
+        text_utils._verify_item_content_in_direct_text_fuzzy(
+            page_data_dict=content_to_verify_and_finalize, direct_text=text_for_content_verification,
+            page_num=actual_page_num, fuzzy_threshold=fuzzy_match_thresh, min_content_len_for_fuzzy=min_content_len_for_fuzzy)
+        page_metrics["content_verification_status"] = "fuzzy_attempted" # Or more granular based on outcome #
+    elif isinstance(content_to_verify_and_finalize, list) and not content_to_verify_and_finalize:
+        page_metrics["content_verification_status"] = "skipped_empty_genai_content" #
+    else:
+        page_metrics["content_verification_status"] = "skipped_genai_content_not_a_list_or_unexpected_type" #
+
+
+    # --- Hyperlink Matching ---
+    if isinstance(content_to_verify_and_finalize, list) and content_to_verify_and_finalize and hyperlinks_from_fitz_content:
+        hyperlink_automaton, min_hyperlink_text_len = _build_hyperlink_automaton(hyperlinks_from_fitz_content) # These are for the current page
+        if hyperlink_automaton is not None:
+            # Output form of each link, built once per page rather than once per item it matches
+            hyperlinks_without_rect = [{k: v for k, v in hyperlink.items() if k != 'rect'} for hyperlink in hyperlinks_from_fitz_content]
+            for genai_item in content_to_verify_and_finalize:
+                if isinstance(genai_item, dict) and "content" in genai_item:
+                    item_content_value = genai_item.get("content")
+                    if item_content_value and isinstance(item_content_value, str):
+                        normalized_item_content = _norm(item_content_value)
+                        if len(normalized_item_content) < min_hyperlink_text_len:
+                            continue # Too short to contain any of the page's link texts
+                        matched_indices = set()
+                        for _, hyperlink_indices in hyperlink_automaton.iter(normalized_item_content):
+                            matched_indices.update(hyperlink_indices)
+                        if matched_indices:
+                            # Keep the page's hyperlink order, as the per-link scan did.
+                            genai_item["hyperlinks"] = [hyperlinks_without_rect[idx] for idx in sorted(matched_indices)]
+    
+    # Post-process: Remove page_number from individual items (should be done in _call_gemini_for_layout or _extract_page...)
+    # but double check here. Also ensure correct hyperlink key name.
+    if isinstance(content_to_verify_and_finalize, list):
+        for genai_item in content_to_verify_and_finalize:
+            if isinstance(genai_item, dict):
+                if "matched_hyperlinks" in genai_item and "hyperlinks" not in genai_item :
+                    genai_item["hyperlinks"] = genai_item.pop("matched_hyperlinks")
+                elif "matched_hyperlinks" in genai_item and "hyperlinks" in genai_item and genai_item["hyperlinks"] != genai_item["matched_hyperlinks"]:
+                     del genai_item["matched_hyperlinks"]
+                if "page_number" in genai_item: # This should ideally not be here if _extract_page... gives clean page items
+                    del genai_item["page_number"]
+    return content_to_verify_and_finalize
+
+
 # New function to handle processing for a single page after Gemini data is available
 def _finalize_single_page_processing(
     actual_page_num: int,
@@ -107,6 +316,12 @@ def _finalize_single_page_processing(
 
     page_metrics["fallback_text_method_used"], page_metrics["fallback_text_status"], page_metrics["fallback_text_char_count"] = "none", "not_attempted", 0 #
     page_metrics["verification_text_source"], page_metrics["content_verification_status"] = "none", "not_attempted" #
+
+    # A page whose Gemini call failed carries a single {"error": ...} placeholder instead of content items.
+    is_gemini_error_page = (
+        isinstance(genai_content_for_this_page, list) and len(genai_content_for_this_page) == 1
+        and isinstance(genai_content_for_this_page[0], dict) and "error" in genai_content_for_this_page[0]
+    )
     
     chosen_fallback_text_for_page = ""
 
@@ -115,15 +330,19 @@ def _finalize_single_page_processing(
     page_crawl_json_filepath = os.path.join(genai_output_dir_path, page_crawl_json_filename)
     page_fitz_content_to_save = {"fitz_extracted_text": fitz_page_text_content, "extracted_hyperlinks": hyperlinks_from_fitz_content}
     try:
-        with open(page_crawl_json_filepath, "w", encoding="utf-8") as crawl_file: json.dump(page_fitz_content_to_save, crawl_file, indent=2, ensure_ascii=False)
+        with open(page_crawl_json_filepath, "wb") as crawl_file: crawl_file.write(orjson.dumps(page_fitz_content_to_save, option=orjson.OPT_INDENT_2))
     except Exception as e_crawl_save: print(f"⚠️ Error writing Fitz crawl data to {page_crawl_json_filepath}: {e_crawl_save}"); page_metrics["error_saving_crawl_json"] = str(e_crawl_save)
 
-    # --- Fallback Text Logic (using pre-extracted PyPDF2 and OCR text) ---
-    pypdf2_sufficient_for_fallback = False
+    # --- Fallback Text Logic (using pre-extracted Fitz, PyPDF2 and OCR text) ---
+    direct_text_sufficient_for_fallback = False
+    # PyPDF2 is skipped when Fitz already produced enough direct text, so that text is the fallback
+    if page_metrics.get("pypdf2_status") == "skipped_fitz_sufficient" and len(fitz_page_text_content) > min_direct_text_len:
+        chosen_fallback_text_for_page = fitz_page_text_content
+        page_metrics["fallback_text_method_used"], page_metrics["fallback_text_status"], direct_text_sufficient_for_fallback = "fitz", "success_sufficient", True
     # Assuming pypdf2_text_for_page is not None and its status is known
-    if pypdf2_text_for_page and len(pypdf2_text_for_page) > min_direct_text_len:
+    elif pypdf2_text_for_page and len(pypdf2_text_for_page) > min_direct_text_len:
         chosen_fallback_text_for_page = pypdf2_text_for_page
-        page_metrics["fallback_text_method_used"], page_metrics["fallback_text_status"], pypdf2_sufficient_for_fallback = "direct_pypdf2", "success_sufficient", True
+        page_metrics["fallback_text_method_used"], page_metrics["fallback_text_status"], direct_text_sufficient_for_fallback = "direct_pypdf2", "success_sufficient", True
     elif pypdf2_text_for_page:
         chosen_fallback_text_for_page = pypdf2_text_for_page
         page_metrics["fallback_text_method_used"], page_metrics["fallback_text_status"] = "direct_pypdf2", "success_insufficient_length"
@@ -131,7 +350,7 @@ def _finalize_single_page_processing(
         page_metrics["fallback_text_method_used"], page_metrics["fallback_text_status"] = "direct_pypdf2", page_metrics.get("pypdf2_status", "unknown_extraction_issue")
 
 
-    if not pypdf2_sufficient_for_fallback:
+    if not direct_text_sufficient_for_fallback:
         # Assuming ocr_text_for_page is not None and its status is known
         if ocr_text_for_page and len(ocr_text_for_page) > min_direct_text_len:
             chosen_fallback_text_for_page = ocr_text_for_page # OCR takes precedence if PyPDF2 insufficient
@@ -161,69 +380,40 @@ def _finalize_single_page_processing(
         page_metrics["verification_text_source"] = "none_available" #
 
     # --- Save Original GenAI output for this page ---
-    # The genai_content_for_this_page is already a deep copy.
+    # The genai_content_for_this_page is owned by this worker (it arrived pickled).
     # Ensure it's a list as expected by downstream consumers of this file.
     final_genai_content_for_this_page_file = genai_content_for_this_page if isinstance(genai_content_for_this_page, list) else [genai_content_for_this_page]
     
     original_genai_filepath = os.path.join(genai_output_dir_path, original_genai_filename)
+    original_genai_bytes = None
     try:
-        with open(original_genai_filepath, "w", encoding="utf-8") as f_orig_genai: json.dump(final_genai_content_for_this_page_file, f_orig_genai, indent=2, ensure_ascii=False)
+        original_genai_bytes = orjson.dumps(final_genai_content_for_this_page_file, option=orjson.OPT_INDENT_2)
+        with open(original_genai_filepath, "wb") as f_orig_genai: f_orig_genai.write(original_genai_bytes)
     except Exception as e_save_orig_genai: print(f"⚠️ Error saving original Gemini data to {original_genai_filepath}: {e_save_orig_genai}"); page_metrics["error_saving_original_genai_json"] = str(e_save_orig_genai)
 
-    # --- Content Verification (on a deep copy of the GenAI content) ---
-    # Make another deepcopy for modifications during verification and hyperlink matching
-    content_to_verify_and_finalize = copy.deepcopy(final_genai_content_for_this_page_file)
-
-    if isinstance(content_to_verify_and_finalize, list) and content_to_verify_and_finalize:
-        # Skip verification if the content is just an error placeholder
-        if not (len(content_to_verify_and_finalize) == 1 and isinstance(content_to_verify_and_finalize[0], dict) and "error" in content_to_verify_and_finalize[0]):
-            text_utils._verify_item_content_in_direct_text_fuzzy(
-                page_data_dict=content_to_verify_and_finalize, direct_text=text_for_content_verification,
-                page_num=actual_page_num, fuzzy_threshold=fuzzy_match_thresh, min_content_len_for_fuzzy=min_content_len_for_fuzzy)
-        page_metrics["content_verification_status"] = "fuzzy_attempted" # Or more granular based on outcome #
-    elif isinstance(content_to_verify_and_finalize, list) and not content_to_verify_and_finalize:
-        page_metrics["content_verification_status"] = "skipped_empty_genai_content" #
+    if is_gemini_error_page:
+        # Error fast path: there is nothing to verify or link, and the placeholder goes to the final
+        # content file unchanged, so the bytes serialized for the original are reused below.
+        content_to_verify_and_finalize = final_genai_content_for_this_page_file
+        page_metrics["content_verification_status"] = "skipped_gemini_error" #
     else:
-        page_metrics["content_verification_status"] = "skipped_genai_content_not_a_list_or_unexpected_type" #
-
-
-    # --- Hyperlink Matching ---
-    if isinstance(content_to_verify_and_finalize, list) and content_to_verify_and_finalize and hyperlinks_from_fitz_content:
-        # Skip if the content is just an error placeholder
-        if not (len(content_to_verify_and_finalize) == 1 and isinstance(content_to_verify_and_finalize[0], dict) and "error" in content_to_verify_and_finalize[0]):
-            for genai_item in content_to_verify_and_finalize:
-                if isinstance(genai_item, dict) and "content" in genai_item:
-                    item_content_value = genai_item.get("content")
-                    if item_content_value and isinstance(item_content_value, str):
-                        normalized_item_content = text_utils._normalize_text(item_content_value)
-                        item_matched_hyperlinks = []
-                        for hyperlink in hyperlinks_from_fitz_content: # These are for the current page
-                            hyperlink_text = hyperlink.get("text")
-                            if hyperlink_text and isinstance(hyperlink_text, str):
-                                normalized_hyperlink_text = text_utils._normalize_text(hyperlink_text)
-                                if normalized_hyperlink_text and normalized_hyperlink_text in normalized_item_content:
-                                    matched_link_info = {k: v for k, v in hyperlink.items() if k != 'rect'}
-                                    item_matched_hyperlinks.append(matched_link_info)
-                        if item_matched_hyperlinks:
-                            genai_item["hyperlinks"] = item_matched_hyperlinks
-    
-    # Post-process: Remove page_number from individual items (should be done in _call_gemini_for_layout or _extract_page...)
-    # but double check here. Also ensure correct hyperlink key name.
-    if isinstance(content_to_verify_and_finalize, list):
-        for genai_item in content_to_verify_and_finalize:
-            if isinstance(genai_item, dict):
-                if "matched_hyperlinks" in genai_item and "hyperlinks" not in genai_item :
-                    genai_item["hyperlinks"] = genai_item.pop("matched_hyperlinks")
-                elif "matched_hyperlinks" in genai_item and "hyperlinks" in genai_item and genai_item["hyperlinks"] != genai_item["matched_hyperlinks"]:
-                     del genai_item["matched_hyperlinks"]
-                if "page_number" in genai_item: # This should ideally not be here if _extract_page... gives clean page items
-                    del genai_item["page_number"]
+        # The original content has already been written out above and is not read again, so verification
+        # and hyperlink matching modify it in place instead of working on a deep copy.
+        content_to_verify_and_finalize = _verify_and_link_page_content(
+            final_genai_content_for_this_page_file, text_for_content_verification, hyperlinks_from_fitz_content,
+            page_metrics, actual_page_num, fuzzy_match_thresh, min_content_len_for_fuzzy)
 
 
     # --- Save Final Content ---
     final_content_filepath = os.path.join(genai_output_dir_path, final_content_filename)
+    final_content_for_book = None # Only handed back once it is known to serialize, same as the file
     try:
-        with open(final_content_filepath, "w", encoding="utf-8") as f_final_genai: json.dump(content_to_verify_and_finalize, f_final_genai, indent=2, ensure_ascii=False)
+        if is_gemini_error_page and original_genai_bytes is not None:
+            final_content_bytes = original_genai_bytes
+        else:
+            final_content_bytes = orjson.dumps(content_to_verify_and_finalize, option=orjson.OPT_INDENT_2)
+        final_content_for_book = content_to_verify_and_finalize
+        with open(final_content_filepath, "wb") as f_final_genai: f_final_genai.write(final_content_bytes)
     except Exception as e_save_final_genai: print(f"⚠️ Error saving final Gemini data to {final_content_filepath}: {e_save_final_genai}"); page_metrics["error_saving_final_genai_json"] = str(e_save_final_genai)
 
     page_data_for_results_json = {
@@ -248,371 +438,502 @@ def _finalize_single_page_processing(
 
 
     page_metrics["time_sec_total_page_finalization"] = time.time() - page_processing_start_time_specific #
-    return page_data_for_results_json, page_metrics
+    return page_data_for_results_json, page_metrics, final_content_for_book
 
 
-def process_pdf(pdf_path: str, output_dir: str, temp_page_dir: str) -> list:
-    os.makedirs(temp_page_dir, exist_ok=True)
-    os.makedirs(output_dir, exist_ok=True)
-    genai_output_dir = os.path.join(output_dir, "genai_outputs")
-    os.makedirs(genai_output_dir, exist_ok=True)
+def _run_gemini_window(
+    pdf_chunk_bytes: bytes | None, # The batch's pages as a standalone PDF
+    window_page_indices: list,
+    pages_to_store_from_this_window_actual_nums: list
+) -> tuple:
+    """
+    Sends one batch of pages to Gemini and selects the output of each page this batch is responsible for.
+    Runs on a driver thread. Returns ({page_num: gemini page data}, {page_num: gemini call metrics}).
+    """
+    start_actual_page_num_in_window = window_page_indices[0] + 1
+    num_pages_in_window = len(window_page_indices)
+    gemini_call_specific_metrics = {} # Initialize for each chunk call
+    window_page_data = {}
+    window_page_metrics = {}
 
-    # CHUNK_SIZE here means the window size for Gemini (e.g., 3 pages)
-    CHUNK_SIZE_STR = os.environ.get('PDF_CHUNK_SIZE', '3') # Default to 3 for sliding window
     try:
-        GEMINI_WINDOW_SIZE = int(CHUNK_SIZE_STR)
-        if GEMINI_WINDOW_SIZE <= 0: GEMINI_WINDOW_SIZE = 3; print(f"⚠️ Invalid PDF_CHUNK_SIZE '{CHUNK_SIZE_STR}'. Defaulting to 3.")
-    except ValueError: GEMINI_WINDOW_SIZE = 3; print(f"⚠️ PDF_CHUNK_SIZE '{CHUNK_SIZE_STR}' not valid int. Defaulting to 3.")
-    print(f"📄 Processing PDF: {pdf_path}. Gemini window size: {GEMINI_WINDOW_SIZE} pages.")
-
-    all_page_responses_for_results_json = []
-    all_page_metrics_final_list = [] 
-    poppler_bin_path = os.environ.get("POPPLER_PATH")
+        chunk_gemini_json_output = {}
+
+        if pdf_chunk_bytes:
+            chunk_gemini_json_output = _call_gemini_for_layout(
+                pdf_chunk_bytes,
+                start_actual_page_num_in_window,
+                num_pages_in_window,
+                gemini_call_specific_metrics # This dict will be updated by the function
+            )
+        else:
+            print(f"⚠️ Gemini batch PDF is empty for batch starting at page {start_actual_page_num_in_window}")
+            # gemini_call_specific_metrics will be empty or only partially filled by _call_gemini_for_layout if error occurs early
+            gemini_call_specific_metrics.setdefault("gemini_api_status", "ErrorBeforeAPICall")
+            gemini_call_specific_metrics.setdefault("gemini_error_message", "Gemini batch PDF is empty.")
+            gemini_call_specific_metrics.setdefault("time_sec_gemini_layout", 0.0) # Ensure time is set
+
+            for actual_page_num_err in pages_to_store_from_this_window_actual_nums:
+                window_page_data[actual_page_num_err] = [{"error": "gemini_batch_pdf_empty"}]
+
+        # NEW: Store Gemini call metrics for pages whose data is selected from this chunk
+        for page_num_to_get_metrics in pages_to_store_from_this_window_actual_nums:
+            if gemini_call_specific_metrics: # Check if it's not empty
+                window_page_metrics[page_num_to_get_metrics] = dict(gemini_call_specific_metrics) # Flat scalars, a shallow copy suffices
+            else: # Fallback if somehow empty after the call
+                window_page_metrics[page_num_to_get_metrics] = {
+                    "gemini_api_status": "MetricsObjectEmpty",
+                    "gemini_error_message": "gemini_call_specific_metrics was empty after _call_gemini_for_layout.",
+                    "time_sec_gemini_layout": 0.0
+                }
+        
+        # Extract and store the relevant page(s) data from the Gemini output
+        chunk_items_by_page = _bucket_gemini_items_by_page(chunk_gemini_json_output)
+        stored_page_nums = []
+        for actual_page_to_store in pages_to_store_from_this_window_actual_nums:
+            if actual_page_to_store not in window_page_data: # Check if not already set to an error
+                window_page_data[actual_page_to_store] = _extract_page_data_from_gemini_chunk_output(
+                    chunk_gemini_json_output, actual_page_to_store, chunk_items_by_page
+                )
+                stored_page_nums.append(actual_page_to_store)
+        # One line per window rather than per page keeps stdout out of the per-page path.
+        if stored_page_nums:
+            print(f"    ✅ Stored Gemini data for Page(s) {', '.join(map(str, stored_page_nums))}")
+
+    except Exception as e_gemini_window:
+        print(f"❌ Error during Gemini processing for window starting at original page {start_actual_page_num_in_window}: {e_gemini_window}")
+        # Populate gemini_call_specific_metrics with error info if not already done by _call_gemini_for_layout
+        gemini_call_specific_metrics.setdefault("gemini_api_status", "ExceptionInWindowProcessing")
+        gemini_call_specific_metrics.setdefault("gemini_error_message", str(e_gemini_window))
+        gemini_call_specific_metrics.setdefault("time_sec_gemini_layout", gemini_call_specific_metrics.get("time_sec_gemini_layout", 0.0)) # Preserve if set
+
+        # Store error for all pages that were meant to be captured by this failed window's Gemini call
+        for actual_page_num_fail in pages_to_store_from_this_window_actual_nums:
+            window_page_data.setdefault(actual_page_num_fail, [{"error": f"Gemini window processing failed: {e_gemini_window}"}])
+            window_page_metrics.setdefault(actual_page_num_fail, dict(gemini_call_specific_metrics))
+
+    return window_page_data, window_page_metrics
+
+
+def _extract_single_page_texts(
+    pdf_path: str,
+    page_idx: int, # 0-based index into the source PDF
+    min_direct_text_len: int, # Direct text longer than this is used as the fallback text
+    min_fitz_text_len: int    # Fitz text at least this long is used for verification
+) -> dict:
+    """
+    Local half of Stage 2 for a single page: Fitz, PyPDF2 and OCR extraction. It needs nothing from
+    Stage 1, so it runs in a worker process while the Gemini window calls are still in flight.
+    PyPDF2 is only run when Fitz did not already produce enough direct text, and OCR only when
+    neither produced enough text for finalization to use. A page without a text layer skips PyPDF2,
+    and one without images either skips OCR too.
+    """
+    actual_page_num = page_idx + 1
+    page_individual_start_time = time.time() # For this specific page's processing in Stage 2
 
-    MIN_DIRECT_PYPDF2_TEXT_LENGTH_THRESHOLD = int(os.environ.get("MIN_PYPDF2_LEN", "20"))
-    MIN_FITZ_TEXT_LENGTH_THRESHOLD = int(os.environ.get("MIN_FITZ_LEN", "20"))
-    FUZZY_MATCH_THRESHOLD = int(os.environ.get("FUZZY_THRESHOLD", "88"))
-    MIN_CONTENT_LEN_FOR_FUZZY = int(os.environ.get("MIN_CONTENT_FUZZY_LEN", "4"))
+    page_metrics = _initialize_page_metrics(actual_page_num) #
 
-    pdf_document_original = None
+    pypdf2_text_for_page, ocr_text_for_page = "", ""
+    fitz_page_text_content, hyperlinks_from_fitz = "", []
+    extraction_error = None
+    
     try:
-        pdf_document_original = fitz.open(pdf_path)
-    except Exception as e:
-        print(f"❌ Failed to open PDF {pdf_path}: {e}"); return []
-    num_pages_total_original = len(pdf_document_original)
-    print(f"Total pages in PDF: {num_pages_total_original}")
+        source_document = _open_source_document(pdf_path)
+        source_page = source_document[page_idx]
+        # Fitz, PyPDF2 and OCR all read the page of their open source document directly; the page is
+        # never copied into a standalone PDF.
+        extraction_path_taken = ["fitz"] # Extractors actually run for this page, recorded in page_metrics
+
+        # Fitz Extraction (on the source document's page)
+        fitz_extraction_start_time = time.time()
+        try:
+            raw_fitz_text, raw_fitz_links = extract_text_and_links_from_fitz_page(source_page, pdf_path) #
+            fitz_page_text_content = raw_fitz_text.strip() if raw_fitz_text else ""
+            hyperlinks_from_fitz = raw_fitz_links if raw_fitz_links else []
+            page_metrics["hyperlink_extraction_status"] = "success_fitz" #
+            page_metrics["hyperlinks_found_count"] = len(hyperlinks_from_fitz) #
+            # The following keys are not in _initialize_page_metrics but were in original handler1.py
+            # Consider adding them to _initialize_page_metrics if they are essential for the final report
+            page_metrics["fitz_extraction_status"] = "success" 
+            page_metrics["fitz_text_char_count"] = len(fitz_page_text_content)
+            page_metrics["fitz_link_count"] = len(hyperlinks_from_fitz) # Redundant with hyperlinks_found_count
+        except Exception as e_fitz:
+            print(f"   ⚠️ Fitz extraction error for page {actual_page_num}: {e_fitz}")
+            page_metrics["hyperlink_extraction_status"] = f"failed_fitz: {e_fitz}" #
+            page_metrics["fitz_extraction_status"] = f"fitz_extraction_failed: {e_fitz}"
+        page_metrics["time_sec_hyperlink_extraction"] = time.time() - fitz_extraction_start_time #
+        # A page Fitz read successfully without finding any text has no text layer for PyPDF2 either;
+        # with no raster images it has nothing to OCR either, so it is treated as empty.
+        fitz_found_no_text = page_metrics.get("fitz_extraction_status") == "success" and not fitz_page_text_content
+        page_has_images = bool(source_page.get_images())
+
+
+        # PyPDF2 Extraction (on the source document's page). PyPDF2 parses in pure Python and can take seconds on
+        # some pages; when MuPDF (Fitz) has already produced enough direct text, PyPDF2 is skipped and its text
+        # stays empty. Finalization then uses the Fitz text as the fallback.
+        fitz_direct_text_sufficient = page_metrics.get("fitz_extraction_status") == "success" and len(fitz_page_text_content) > min_direct_text_len
+        pypdf2_extraction_start_time = time.time()
+        if fitz_direct_text_sufficient:
+            page_metrics["direct_text_char_count"] = len(fitz_page_text_content) #
+            page_metrics["direct_text_extraction_status"] = "success_fitz" #
+            page_metrics["pypdf2_status"] = "skipped_fitz_sufficient"
+        elif fitz_found_no_text:
+            page_metrics["direct_text_extraction_status"] = page_metrics["pypdf2_status"] = "skipped_fitz_no_text"
+        else:
+            extraction_path_taken.append("pypdf2")
+            try:
+                pypdf2_text_for_page = extract_text_from_pdf_reader_page(_open_source_pdf_reader(pdf_path), page_idx).strip() #
+                # pypdf2_char_count is a key from original handler1.py, not in _initialize_page_metrics; it aliases the same count
+                page_metrics["direct_text_char_count"] = page_metrics["pypdf2_char_count"] = len(pypdf2_text_for_page) #
+                page_metrics["direct_text_extraction_status"] = "success_pypdf2" if pypdf2_text_for_page else "empty_pypdf2" #
+                page_metrics["pypdf2_status"] = "success" if pypdf2_text_for_page else "empty_result" # Also from handler1.py
+            except Exception as e_pypdf2:
+                print(f"   ⚠️ PyPDF2 extraction error for page {actual_page_num}: {e_pypdf2}")
+                page_metrics["direct_text_extraction_status"] = f"failed_pypdf2: {e_pypdf2}" #
+                page_metrics["pypdf2_status"] = f"pypdf2_extraction_failed: {e_pypdf2}"
+        # Add time for pypdf2 if needed: page_metrics["time_sec_pypdf2_extraction"] = time.time() - pypdf2_extraction_start_time
+
+
+        # OCR Extraction (page rendered by Fitz), skipped when the text layer already suffices
+        ocr_extraction_start_time = time.time()
+        if len(pypdf2_text_for_page) > min_direct_text_len:
+            page_metrics["ocr_text_extraction_status"] = page_metrics["ocr_status"] = "skipped_pypdf2_sufficient"
+        elif fitz_direct_text_sufficient or (page_metrics.get("fitz_extraction_status") == "success" and len(fitz_page_text_content) >= min_fitz_text_len):
+            page_metrics["ocr_text_extraction_status"] = page_metrics["ocr_status"] = "skipped_fitz_sufficient"
+        elif (pypdf2_text_for_page or fitz_page_text_content) and not page_has_images:
+            # Some embedded text and no raster images: OCR could only re-read the same text layer.
+            page_metrics["ocr_text_extraction_status"] = page_metrics["ocr_status"] = "skipped_no_raster_images"
+        elif fitz_found_no_text and not page_has_images:
+            page_metrics["ocr_text_extraction_status"] = page_metrics["ocr_status"] = "skipped_empty_page"
+            extraction_path_taken = ["fitz", "empty_page"]
+        else:
+            extraction_path_taken.append("ocr")
+            try:
+                ocr_text_for_page = extract_text_from_ocr_fitz_page(source_page).strip() #
+                # ocr_char_count is a key from original handler1.py, not in _initialize_page_metrics; it aliases the same count
+                page_metrics["ocr_text_char_count"] = page_metrics["ocr_char_count"] = len(ocr_text_for_page) #
+                page_metrics["ocr_text_extraction_status"] = "success_ocr" if ocr_text_for_page else "empty_ocr" #
+                page_metrics["ocr_status"] = "success" if ocr_text_for_page else "empty_result" # Also from handler1.py
+            except Exception as e_ocr:
+                print(f"   ⚠️ OCR extraction error for page {actual_page_num}: {e_ocr}")
+                page_metrics["ocr_text_extraction_status"] = f"failed_ocr: {e_ocr}" #
+                page_metrics["ocr_status"] = f"ocr_extraction_failed: {e_ocr}"
+        # Add time for ocr if needed: page_metrics["time_sec_ocr_extraction"] = time.time() - ocr_extraction_start_time
+        page_metrics["extraction_path_taken"] = "+".join(extraction_path_taken)
 
-    # --- Stage 1: Gemini Processing with Sliding Window ---
-    gemini_data_per_page = {}  # Stores final selected Gemini output for each actual page number
-    
-    # NEW: Dictionary to store chunk-level Gemini metrics, mapped to actual page numbers
-    chunk_gemini_metrics_map = {}
-    
-    processed_gemini_pages_set = set() # Tracks actual page numbers whose Gemini data has been selected and stored
 
-    print(f"\n🤖 Starting Gemini Processing with sliding window (size {GEMINI_WINDOW_SIZE})...")
-    for i in range(num_pages_total_original): # i is the 0-based index of the *start* of the window
-        
-        window_page_indices = list(range(i, min(i + GEMINI_WINDOW_SIZE, num_pages_total_original)))
-        
-        if not window_page_indices:
-            continue
+    except Exception as e_single_page_prep:
+        print(f"   ❌ Error preparing or extracting text for page {actual_page_num}: {e_single_page_prep}")
+        extraction_error = f"single_page_text_extraction_failed: {e_single_page_prep}"
 
-        pages_to_store_from_this_window_actual_nums = []
-        if i == 0: 
-            pages_to_store_from_this_window_actual_nums = [p_idx + 1 for p_idx in window_page_indices]
-        else: 
-            newest_page_idx_in_window = window_page_indices[-1]
-            pages_to_store_from_this_window_actual_nums = [newest_page_idx_in_window + 1]
-        
-        start_actual_page_num_in_window = window_page_indices[0] + 1
-        num_pages_in_window = len(window_page_indices)
-        
-        print(f"⚙️  Gemini Window: Original Page(s) {[p_idx + 1 for p_idx in window_page_indices]} (Actual: {start_actual_page_num_in_window} to {window_page_indices[-1] + 1})")
-        
-        temp_gemini_window_pdf_path = os.path.join(temp_page_dir, f"temp_gemini_window_p{start_actual_page_num_in_window}_to_p{window_page_indices[-1]+1}.pdf")
-        
-        gemini_call_specific_metrics = {} # Initialize for each chunk call
-        
+    return {
+        "page_number": actual_page_num,
+        "pypdf2_text": pypdf2_text_for_page,
+        "ocr_text": ocr_text_for_page,
+        "fitz_text": fitz_page_text_content,
+        "hyperlinks": hyperlinks_from_fitz,
+        "page_metrics": page_metrics,
+        "extraction_error": extraction_error,
+        "time_sec_extraction": time.time() - page_individual_start_time,
+    }
+
+
+def _finalize_extracted_page(
+    extracted_page: dict, # Result of _extract_single_page_texts
+    genai_content_for_page: list | None, # Gemini output selected for this page in Stage 1
+    chunk_gemini_metrics: dict | None, # Metrics of the Gemini call that produced it
+    genai_output_dir: str,
+    thresholds: dict
+) -> tuple:
+    """
+    Second half of Stage 2 for a single page, once both its extracted text and its Gemini output
+    are available: verification, hyperlink matching and output files.
+    Returns (page_response_data, page_metrics, final_content), final_content being what was written to
+    page_{N}_final_content.json (or None), so the book output does not have to read it back.
+    """
+    finalization_start_time = time.time()
+    actual_page_num = extracted_page["page_number"]
+    page_metrics = extracted_page["page_metrics"]
+    pypdf2_text_for_page = extracted_page["pypdf2_text"]
+    ocr_text_for_page = extracted_page["ocr_text"]
+    fitz_page_text_content = extracted_page["fitz_text"]
+    hyperlinks_from_fitz = extracted_page["hyperlinks"]
+
+    # NEW: Retrieve and merge Gemini call metrics from Stage 1
+    if chunk_gemini_metrics:
+        page_metrics["gemini_api_status"] = chunk_gemini_metrics.get("gemini_api_status") #
+        page_metrics["gemini_response_length"] = chunk_gemini_metrics.get("gemini_response_length", 0) #
+        page_metrics["gemini_error_message"] = chunk_gemini_metrics.get("gemini_error_message", "") #
+        page_metrics["gemini_input_tokens"] = chunk_gemini_metrics.get("gemini_input_tokens", 0) #
+        page_metrics["gemini_output_tokens"] = chunk_gemini_metrics.get("gemini_output_tokens", 0) #
+        page_metrics["gemini_cost_usd"] = chunk_gemini_metrics.get("gemini_cost_usd", 0.0) #
+        page_metrics["time_sec_gemini_layout"] = chunk_gemini_metrics.get("time_sec_gemini_layout", 0.0) #
+    else:
+        print(f"⚠️ Warning: No chunk-level Gemini metrics found for page {actual_page_num}. Using defaults.")
+        # Ensure gemini_error_message reflects this if it's not already set by _initialize_page_metrics
+        current_err_msg = page_metrics.get("gemini_error_message", "")
+        separator = " | " if current_err_msg else ""
+        page_metrics["gemini_error_message"] = f"{current_err_msg}{separator}No chunk-level Gemini API metrics found for this page."
+
+
+    if extracted_page["extraction_error"]:
+        page_metrics["error"] = extracted_page["extraction_error"] # This "error" key is not in _initialize_page_metrics
+        final_content_filename = f"page_{actual_page_num}_final_content.json"
+        original_genai_filename = f"page_{actual_page_num}_genai.json"
+        error_content_for_file = [{"error": page_metrics["error"]}] # Using the ad-hoc "error" key
         try:
-            _create_temp_chunk_pdf(pdf_document_original, window_page_indices[0], num_pages_in_window, temp_gemini_window_pdf_path)
-            
-            pdf_chunk_base64 = None
-            if os.path.exists(temp_gemini_window_pdf_path):
-                 pdf_chunk_base64 = encode_pdf_to_base64(temp_gemini_window_pdf_path)
-            
-            chunk_gemini_json_output = {}
-
-            if pdf_chunk_base64:
-                chunk_gemini_json_output = _call_gemini_for_layout(
-                    pdf_chunk_base64,
-                    start_actual_page_num_in_window,
-                    num_pages_in_window,
-                    gemini_call_specific_metrics # This dict will be updated by the function
-                )
-            else:
-                print(f"⚠️ Temp Gemini window PDF not found or failed to encode: {temp_gemini_window_pdf_path}")
-                # gemini_call_specific_metrics will be empty or only partially filled by _call_gemini_for_layout if error occurs early
-                gemini_call_specific_metrics.setdefault("gemini_api_status", "ErrorBeforeAPICall")
-                gemini_call_specific_metrics.setdefault("gemini_error_message", "Temp Gemini window PDF missing or failed to encode.")
-                gemini_call_specific_metrics.setdefault("time_sec_gemini_layout", 0.0) # Ensure time is set
-
-                for page_idx_in_error_window in window_page_indices:
-                    actual_page_num_err = page_idx_in_error_window + 1
-                    if actual_page_num_err in pages_to_store_from_this_window_actual_nums and actual_page_num_err not in processed_gemini_pages_set:
-                        gemini_data_per_page[actual_page_num_err] = [{"error": "temp_gemini_window_pdf_missing"}]
-                        processed_gemini_pages_set.add(actual_page_num_err)
-                # Continue to next iteration of Gemini window handled by outer loop structure
-
-            # NEW: Store Gemini call metrics for pages whose data is selected from this chunk
-            for page_num_to_get_metrics in pages_to_store_from_this_window_actual_nums:
-                if page_num_to_get_metrics not in chunk_gemini_metrics_map: # Store only the first time
-                    if gemini_call_specific_metrics: # Check if it's not empty
-                        chunk_gemini_metrics_map[page_num_to_get_metrics] = copy.deepcopy(gemini_call_specific_metrics)
-                    else: # Fallback if somehow empty after the call
-                        chunk_gemini_metrics_map[page_num_to_get_metrics] = {
-                            "gemini_api_status": "MetricsObjectEmpty",
-                            "gemini_error_message": "gemini_call_specific_metrics was empty after _call_gemini_for_layout.",
-                            "time_sec_gemini_layout": 0.0
-                        }
-            
-            # Extract and store the relevant page(s) data from the Gemini output
-            for actual_page_to_store in pages_to_store_from_this_window_actual_nums:
-                if actual_page_to_store not in processed_gemini_pages_set: # Check if not already processed
-                    page_specific_gemini_data = _extract_page_data_from_gemini_chunk_output(
-                        chunk_gemini_json_output, actual_page_to_store
-                    )
-                    gemini_data_per_page[actual_page_to_store] = page_specific_gemini_data
-                    processed_gemini_pages_set.add(actual_page_to_store)
-                    print(f"    ✅ Stored Gemini data for Page {actual_page_to_store}")
-
-
-        except Exception as e_gemini_window:
-            print(f"❌ Error during Gemini processing for window starting at original page {i+1}: {e_gemini_window}")
-            # Populate gemini_call_specific_metrics with error info if not already done by _call_gemini_for_layout
-            gemini_call_specific_metrics.setdefault("gemini_api_status", "ExceptionInWindowProcessing")
-            gemini_call_specific_metrics.setdefault("gemini_error_message", str(e_gemini_window))
-            gemini_call_specific_metrics.setdefault("time_sec_gemini_layout", gemini_call_specific_metrics.get("time_sec_gemini_layout", 0.0)) # Preserve if set
-
-            for page_idx_in_failed_window in window_page_indices:
-                actual_page_num_fail = page_idx_in_failed_window + 1
-                # Store error for all pages that were meant to be captured by this failed window's Gemini call
-                if actual_page_num_fail in pages_to_store_from_this_window_actual_nums:
-                    if actual_page_num_fail not in processed_gemini_pages_set:
-                         gemini_data_per_page[actual_page_num_fail] = [{"error": f"Gemini window processing failed: {e_gemini_window}"}]
-                         processed_gemini_pages_set.add(actual_page_num_fail)
-                    # Also store the error metrics for this page in chunk_gemini_metrics_map
-                    if actual_page_num_fail not in chunk_gemini_metrics_map:
-                         chunk_gemini_metrics_map[actual_page_num_fail] = copy.deepcopy(gemini_call_specific_metrics)
-
-        finally:
-            if os.path.exists(temp_gemini_window_pdf_path):
-                try: os.remove(temp_gemini_window_pdf_path)
-                except Exception as e_delete: print(f"⚠️ Failed to delete temp Gemini window PDF {temp_gemini_window_pdf_path}: {e_delete}")
+            with open(os.path.join(genai_output_dir, final_content_filename), "wb") as f_err: f_err.write(orjson.dumps(error_content_for_file, option=orjson.OPT_INDENT_2))
+            with open(os.path.join(genai_output_dir, original_genai_filename), "wb") as f_err: f_err.write(orjson.dumps(error_content_for_file, option=orjson.OPT_INDENT_2))
+        except Exception as e_save_err: print(f"   ⚠️ Also failed to save error file for page {actual_page_num}: {e_save_err}")
         
-        if len(processed_gemini_pages_set) == num_pages_total_original:
-            print("   All pages have had their Gemini data selected.")
-            break
+        page_metrics["time_sec_total_page_processing"] = extracted_page["time_sec_extraction"] + time.time() - finalization_start_time #
+        return {
+            "page_number": actual_page_num, "error": page_metrics["error"],
+            "gemini_original_output_file": original_genai_filename,
+            "gemini_final_content_file": final_content_filename
+        }, page_metrics, error_content_for_file
+
+    # Already this worker's own copy (it arrived pickled), so it is used as-is rather than deep-copied.
+    retrieved_genai_content = genai_content_for_page if genai_content_for_page is not None else [{"error": f"No Gemini content was selected/available for page {actual_page_num}"}]
     
-    print("🤖 Gemini processing phase complete.")
-
-    # --- Stage 2: Per-Page Fitz, OCR, Verification, and Finalization ---
-    print(f"\n⚙️  Starting per-page Fitz, OCR, and finalization for {num_pages_total_original} pages...")
-    page_processing_overall_start_time = time.time() # For timing the entire Stage 2
+    # This status indicates if parsed GenAI data was retrieved for the page from Stage 1's output.
+    # It's different from page_metrics["gemini_api_status"] which is about the API call itself.
+    page_metrics["gemini_content_retrieval_status"] = "success" if not ("error" in retrieved_genai_content[0] if retrieved_genai_content and isinstance(retrieved_genai_content[0],dict) else False) else "error_or_missing" #
+    if "error" in retrieved_genai_content[0] if retrieved_genai_content and isinstance(retrieved_genai_content[0],dict) else False:
+        # If gemini_error_message is already set (e.g. from chunk metrics), append this. Otherwise, set it.
+        current_err_msg = page_metrics.get("gemini_error_message", "")
+        retrieval_err_msg = retrieved_genai_content[0]["error"]
+        separator = " | " if current_err_msg and retrieval_err_msg else ""
+        page_metrics["gemini_error_message"] = f"{current_err_msg}{separator}{retrieval_err_msg}"
 
-    for page_idx in range(num_pages_total_original): # 0-based index
-        actual_page_num = page_idx + 1
-        page_individual_start_time = time.time() # For this specific page's processing in Stage 2
 
-        page_metrics = _initialize_page_metrics(actual_page_num) #
+    try:
+        page_response_data, updated_page_metrics, final_page_content = _finalize_single_page_processing(
+            actual_page_num,
+            retrieved_genai_content,
+            pypdf2_text_for_page,
+            ocr_text_for_page,
+            fitz_page_text_content,
+            hyperlinks_from_fitz,
+            page_metrics, 
+            genai_output_dir,
+            thresholds["fuzzy_match"],
+            thresholds["min_direct_pypdf2_text_length"],
+            thresholds["min_fitz_text_length"],
+            thresholds["min_content_len_for_fuzzy"]
+        )
+        # page_metrics (now updated_page_metrics) already contains timings from _finalize_single_page_processing
+        updated_page_metrics["time_sec_total_page_processing"] = extracted_page["time_sec_extraction"] + time.time() - finalization_start_time #
+        return page_response_data, updated_page_metrics, final_page_content
+    except Exception as e_finalize:
+        print(f"   ❌ Error finalizing page {actual_page_num}: {e_finalize}")
+        # Ensure the 'error' key exists in page_metrics or add it.
+        # _initialize_page_metrics does not have a generic 'error' key, but 'gemini_error_message'.
+        # Let's add this to 'gemini_error_message' or a general error field if defined in _initialize_page_metrics.
+        current_err_msg = page_metrics.get("gemini_error_message", "")
+        finalize_err_msg = f"page_finalization_failed: {e_finalize}"
+        separator = " | " if current_err_msg and finalize_err_msg else ""
+        page_metrics["gemini_error_message"] = f"{current_err_msg}{separator}{finalize_err_msg}"
         
-        # NEW: Retrieve and merge Gemini call metrics from Stage 1
-        retrieved_chunk_gemini_metrics = chunk_gemini_metrics_map.get(actual_page_num)
-        if retrieved_chunk_gemini_metrics:
-            page_metrics["gemini_api_status"] = retrieved_chunk_gemini_metrics.get("gemini_api_status") #
-            page_metrics["gemini_response_length"] = retrieved_chunk_gemini_metrics.get("gemini_response_length", 0) #
-            page_metrics["gemini_error_message"] = retrieved_chunk_gemini_metrics.get("gemini_error_message", "") #
-            page_metrics["gemini_input_tokens"] = retrieved_chunk_gemini_metrics.get("gemini_input_tokens", 0) #
-            page_metrics["gemini_output_tokens"] = retrieved_chunk_gemini_metrics.get("gemini_output_tokens", 0) #
-            page_metrics["gemini_cost_usd"] = retrieved_chunk_gemini_metrics.get("gemini_cost_usd", 0.0) #
-            page_metrics["time_sec_gemini_layout"] = retrieved_chunk_gemini_metrics.get("time_sec_gemini_layout", 0.0) #
-        else:
-            print(f"⚠️ Warning: No chunk-level Gemini metrics found for page {actual_page_num}. Using defaults.")
-            # Ensure gemini_error_message reflects this if it's not already set by _initialize_page_metrics
-            current_err_msg = page_metrics.get("gemini_error_message", "")
-            separator = " | " if current_err_msg else ""
-            page_metrics["gemini_error_message"] = f"{current_err_msg}{separator}No chunk-level Gemini API metrics found for this page."
+        # page_metrics["error"] = f"page_finalization_failed: {e_finalize}" # If using an ad-hoc error key
 
+        final_content_filename_err = f"page_{actual_page_num}_final_content.json"
+        original_genai_filename_err = f"page_{actual_page_num}_genai.json"
+        # Use the error from page_metrics for consistency if it's structured there, e.g. page_metrics["gemini_error_message"]
+        error_content_for_file_fin = [{"error": page_metrics.get("gemini_error_message",finalize_err_msg)}]
+        try:
+            with open(os.path.join(genai_output_dir, final_content_filename_err), "wb") as f_err: f_err.write(orjson.dumps(error_content_for_file_fin, option=orjson.OPT_INDENT_2))
+            if not os.path.exists(os.path.join(genai_output_dir, original_genai_filename_err)): 
+                with open(os.path.join(genai_output_dir, original_genai_filename_err), "wb") as f_err_o: f_err_o.write(orjson.dumps(retrieved_genai_content if retrieved_genai_content else error_content_for_file_fin, option=orjson.OPT_INDENT_2))
+        except Exception as e_save_err_fin: print(f"   ⚠️ Also failed to save error file during finalization for page {actual_page_num}: {e_save_err_fin}")
 
-        print(f"   Processing Page {actual_page_num}...")
+        page_metrics["time_sec_total_page_processing"] = extracted_page["time_sec_extraction"] + time.time() - finalization_start_time #
+        return {
+            "page_number": actual_page_num, "error": page_metrics.get("gemini_error_message", finalize_err_msg),
+            "gemini_original_output_file": original_genai_filename_err,
+            "gemini_final_content_file": final_content_filename_err
+        }, page_metrics, error_content_for_file_fin
 
-        temp_single_page_pdf_path = os.path.join(temp_page_dir, f"temp_single_p{actual_page_num}.pdf")
-        temp_pdf_creation_start_time = time.time() # For creating the single page PDF
-        
-        pypdf2_text_for_page, ocr_text_for_page = "", ""
-        fitz_page_text_content, hyperlinks_from_fitz = "", []
-        
-        try:
-            _create_temp_chunk_pdf(pdf_document_original, page_idx, 1, temp_single_page_pdf_path)
-            page_metrics["time_sec_temp_pdf_creation"] = time.time() - temp_pdf_creation_start_time #
 
-            # Fitz Extraction (on the single page)
-            fitz_extraction_start_time = time.time()
-            try:
-                fitz_data_list = extract_text_and_links_from_chunk_fitz(temp_single_page_pdf_path) #
-                if fitz_data_list: 
-                    raw_fitz_text, raw_fitz_links = fitz_data_list[0]
-                    fitz_page_text_content = raw_fitz_text.strip() if raw_fitz_text else ""
-                    hyperlinks_from_fitz = raw_fitz_links if raw_fitz_links else []
-                    page_metrics["hyperlink_extraction_status"] = "success_fitz" #
-                    page_metrics["hyperlinks_found_count"] = len(hyperlinks_from_fitz) #
-                    # The following keys are not in _initialize_page_metrics but were in original handler1.py
-                    # Consider adding them to _initialize_page_metrics if they are essential for the final report
-                    page_metrics["fitz_extraction_status"] = "success" 
-                    page_metrics["fitz_text_char_count"] = len(fitz_page_text_content)
-                    page_metrics["fitz_link_count"] = len(hyperlinks_from_fitz) # Redundant with hyperlinks_found_count
-                else:
-                    page_metrics["hyperlink_extraction_status"] = "empty_result_fitz" #
-                    page_metrics["fitz_extraction_status"] = "empty_result_from_fitz_extraction"
-            except Exception as e_fitz:
-                print(f"   ⚠️ Fitz extraction error for page {actual_page_num}: {e_fitz}")
-                page_metrics["hyperlink_extraction_status"] = f"failed_fitz: {e_fitz}" #
-                page_metrics["fitz_extraction_status"] = f"fitz_extraction_failed: {e_fitz}"
-            page_metrics["time_sec_hyperlink_extraction"] = time.time() - fitz_extraction_start_time #
+def process_pdf(pdf_path: str, output_dir: str, temp_page_dir: str) -> list:
+    # Page and batch PDFs are built as in-memory bytes, so nothing is written to (or needs cleaning from)
+    # temp_page_dir any more; the argument is kept so existing callers do not break.
+    os.makedirs(output_dir, exist_ok=True)
+    genai_output_dir = os.path.join(output_dir, "genai_outputs")
+    os.makedirs(genai_output_dir, exist_ok=True)
+    # Gemini responses are cached by batch content (plus model and prompt), so re-runs and retries over
+    # the same PDF reuse them instead of calling the API again. Only responses that finished normally and
+    # parsed into page items are stored (see _call_gemini_for_layout); failed ones are retried.
+    layout_response_cache.attach_directory(os.path.join(output_dir, ".llm_cache"), size_limit=LLM_CACHE_SIZE_LIMIT)
 
+    # Pages sent to Gemini per call, in non-overlapping batches (PDF_CHUNK_SIZE is still honoured as a fallback)
+    CHUNK_SIZE_STR = os.environ.get('GEMINI_BATCH_SIZE', os.environ.get('PDF_CHUNK_SIZE', str(DEFAULT_GEMINI_BATCH_SIZE)))
+    try:
+        GEMINI_BATCH_SIZE = int(CHUNK_SIZE_STR)
+        if GEMINI_BATCH_SIZE <= 0: GEMINI_BATCH_SIZE = DEFAULT_GEMINI_BATCH_SIZE; print(f"⚠️ Invalid GEMINI_BATCH_SIZE '{CHUNK_SIZE_STR}'. Defaulting to {DEFAULT_GEMINI_BATCH_SIZE}.")
+    except ValueError: GEMINI_BATCH_SIZE = DEFAULT_GEMINI_BATCH_SIZE; print(f"⚠️ GEMINI_BATCH_SIZE '{CHUNK_SIZE_STR}' not valid int. Defaulting to {DEFAULT_GEMINI_BATCH_SIZE}.")
+    GEMINI_BATCH_SIZE = min(GEMINI_BATCH_SIZE, MAX_GEMINI_BATCH_SIZE)
+    OVERLAP_STR = os.environ.get('GEMINI_BATCH_OVERLAP', str(DEFAULT_GEMINI_BATCH_OVERLAP))
+    try:
+        GEMINI_BATCH_OVERLAP = int(OVERLAP_STR)
+        if GEMINI_BATCH_OVERLAP < 0: GEMINI_BATCH_OVERLAP = DEFAULT_GEMINI_BATCH_OVERLAP; print(f"⚠️ Invalid GEMINI_BATCH_OVERLAP '{OVERLAP_STR}'. Defaulting to {DEFAULT_GEMINI_BATCH_OVERLAP}.")
+    except ValueError: GEMINI_BATCH_OVERLAP = DEFAULT_GEMINI_BATCH_OVERLAP; print(f"⚠️ GEMINI_BATCH_OVERLAP '{OVERLAP_STR}' not valid int. Defaulting to {DEFAULT_GEMINI_BATCH_OVERLAP}.")
+    # Context pages plus the batch must stay within Gemini's page limit
+    GEMINI_BATCH_OVERLAP = min(GEMINI_BATCH_OVERLAP, MAX_GEMINI_BATCH_SIZE - GEMINI_BATCH_SIZE)
+    print(f"📄 Processing PDF: {pdf_path}. Gemini batch size: {GEMINI_BATCH_SIZE} pages (+{GEMINI_BATCH_OVERLAP} context).")
 
-            # PyPDF2 Extraction (on the single page)
-            pypdf2_extraction_start_time = time.time()
-            try:
-                pypdf2_texts_list = extract_text_from_pdf_chunk_pypdf2(temp_single_page_pdf_path) #
-                if pypdf2_texts_list:
-                    pypdf2_text_for_page = pypdf2_texts_list[0].strip() if pypdf2_texts_list[0] else ""
-                page_metrics["direct_text_char_count"] = len(pypdf2_text_for_page) #
-                page_metrics["direct_text_extraction_status"] = "success_pypdf2" if pypdf2_text_for_page else "empty_pypdf2" #
-                # Keys from original handler1.py, not in _initialize_page_metrics
-                page_metrics["pypdf2_char_count"] = len(pypdf2_text_for_page) # Redundant with direct_text_char_count
-                page_metrics["pypdf2_status"] = "success" if pypdf2_text_for_page else "empty_result"
-            except Exception as e_pypdf2:
-                print(f"   ⚠️ PyPDF2 extraction error for page {actual_page_num}: {e_pypdf2}")
-                page_metrics["direct_text_extraction_status"] = f"failed_pypdf2: {e_pypdf2}" #
-                page_metrics["pypdf2_status"] = f"pypdf2_extraction_failed: {e_pypdf2}"
-            # Add time for pypdf2 if needed: page_metrics["time_sec_pypdf2_extraction"] = time.time() - pypdf2_extraction_start_time
+    all_page_responses_for_results_json = []
+    all_page_metrics_final_list = [] 
+    final_content_per_page = {} # page number -> final content as written by the finalization workers
 
+    page_thresholds = {
+        "min_direct_pypdf2_text_length": int(os.environ.get("MIN_PYPDF2_LEN", "20")),
+        "min_fitz_text_length": int(os.environ.get("MIN_FITZ_LEN", "20")),
+        "fuzzy_match": int(os.environ.get("FUZZY_THRESHOLD", "88")),
+        "min_content_len_for_fuzzy": int(os.environ.get("MIN_CONTENT_FUZZY_LEN", "4")),
+    }
 
-            # OCR Extraction (on the single page)
-            ocr_extraction_start_time = time.time()
-            try:
-                ocr_texts_list = extract_text_from_chunk_ocr(temp_single_page_pdf_path, poppler_path=poppler_bin_path) #
-                if ocr_texts_list:
-                    ocr_text_for_page = ocr_texts_list[0].strip() if ocr_texts_list[0] else ""
-                page_metrics["ocr_text_char_count"] = len(ocr_text_for_page) #
-                page_metrics["ocr_text_extraction_status"] = "success_ocr" if ocr_text_for_page else "empty_ocr" #
-                # Keys from original handler1.py, not in _initialize_page_metrics
-                page_metrics["ocr_char_count"] = len(ocr_text_for_page) # Redundant
-                page_metrics["ocr_status"] = "success" if ocr_text_for_page else "empty_result"
-            except Exception as e_ocr:
-                print(f"   ⚠️ OCR extraction error for page {actual_page_num}: {e_ocr}")
-                page_metrics["ocr_text_extraction_status"] = f"failed_ocr: {e_ocr}" #
-                page_metrics["ocr_status"] = f"ocr_extraction_failed: {e_ocr}"
-            # Add time for ocr if needed: page_metrics["time_sec_ocr_extraction"] = time.time() - ocr_extraction_start_time
+    fitz_layout_shortcut = os.environ.get("FITZ_LAYOUT_SHORTCUT", "").lower() in ("1", "true", "yes")
+    try: fitz_layout_min_text_factor = int(os.environ.get("FITZ_LAYOUT_MIN_TEXT_FACTOR", str(DEFAULT_FITZ_LAYOUT_MIN_TEXT_FACTOR)))
+    except ValueError: fitz_layout_min_text_factor = DEFAULT_FITZ_LAYOUT_MIN_TEXT_FACTOR; print(f"⚠️ FITZ_LAYOUT_MIN_TEXT_FACTOR not valid int. Defaulting to {DEFAULT_FITZ_LAYOUT_MIN_TEXT_FACTOR}.")
 
+    pdf_document_original = None
+    try:
+        pdf_document_original = fitz.open(pdf_path)
+    except Exception as e:
+        print(f"❌ Failed to open PDF {pdf_path}: {e}"); return []
+    num_pages_total_original = len(pdf_document_original)
+    print(f"Total pages in PDF: {num_pages_total_original}")
 
-        except Exception as e_single_page_prep:
-            print(f"   ❌ Error preparing or extracting text for page {actual_page_num}: {e_single_page_prep}")
-            page_metrics["error"] = f"single_page_text_extraction_failed: {e_single_page_prep}" # This "error" key is not in _initialize_page_metrics
-            final_content_filename = f"page_{actual_page_num}_final_content.json"
-            original_genai_filename = f"page_{actual_page_num}_genai.json"
-            error_content_for_file = [{"error": page_metrics["error"]}] # Using the ad-hoc "error" key
-            try:
-                with open(os.path.join(genai_output_dir, final_content_filename), "w", encoding="utf-8") as f_err: json.dump(error_content_for_file, f_err, indent=2)
-                with open(os.path.join(genai_output_dir, original_genai_filename), "w", encoding="utf-8") as f_err: json.dump(error_content_for_file, f_err, indent=2)
-            except Exception as e_save_err: print(f"   ⚠️ Also failed to save error file for page {actual_page_num}: {e_save_err}")
-            
-            all_page_responses_for_results_json.append({
-                "page_number": actual_page_num, "error": page_metrics["error"],
-                "gemini_original_output_file": original_genai_filename,
-                "gemini_final_content_file": final_content_filename
-            })
-            page_metrics["time_sec_total_page_processing"] = time.time() - page_individual_start_time #
-            all_page_metrics_final_list.append(page_metrics)
-            if os.path.exists(temp_single_page_pdf_path): os.remove(temp_single_page_pdf_path)
-            continue 
+    # Stage 1 (Gemini windows, network-bound) and the local half of Stage 2 (Fitz/PyPDF2/OCR, CPU-bound)
+    # are independent, so they overlap: every page's text extraction is queued on the worker processes
+    # first, then the Gemini windows are sent from driver threads while those workers run.
+    page_indices = range(num_pages_total_original)
+    page_workers = max(1, min(PAGE_WORKERS, num_pages_total_original))
+    page_processing_overall_start_time = time.time() # For timing the entire Stage 2
+    with ProcessPoolExecutor(max_workers=page_workers, initializer=_init_extraction_worker) as page_executor, \
+            ThreadPoolExecutor(max_workers=GEMINI_WORKERS) as gemini_executor:
+        print(f"\n⚙️  Queuing per-page Fitz, PyPDF2 and OCR extraction for {num_pages_total_original} pages ({page_workers} workers)...")
+        extraction_futures = [
+            page_executor.submit(
+                _extract_single_page_texts, pdf_path, page_idx,
+                page_thresholds["min_direct_pypdf2_text_length"], page_thresholds["min_fitz_text_length"]
+            )
+            for page_idx in page_indices
+        ]
 
-        finally:
-            if os.path.exists(temp_single_page_pdf_path):
-                try: os.remove(temp_single_page_pdf_path)
-                except Exception as e_del_single: print(f"   ⚠️ Failed to delete temp single page PDF {temp_single_page_pdf_path}: {e_del_single}")
+        # --- Stage 1: Gemini Processing in Page Batches ---
+        gemini_data_per_page = {}  # Stores final selected Gemini output for each actual page number
         
-        retrieved_genai_content = copy.deepcopy(gemini_data_per_page.get(actual_page_num, [{"error": f"No Gemini content was selected/available for page {actual_page_num}"}]))
+        # NEW: Dictionary to store chunk-level Gemini metrics, mapped to actual page numbers
+        chunk_gemini_metrics_map = {}
         
-        # This status indicates if parsed GenAI data was retrieved for the page from Stage 1's output.
-        # It's different from page_metrics["gemini_api_status"] which is about the API call itself.
-        page_metrics["gemini_content_retrieval_status"] = "success" if not ("error" in retrieved_genai_content[0] if retrieved_genai_content and isinstance(retrieved_genai_content[0],dict) else False) else "error_or_missing" #
-        if "error" in retrieved_genai_content[0] if retrieved_genai_content and isinstance(retrieved_genai_content[0],dict) else False:
-            # If gemini_error_message is already set (e.g. from chunk metrics), append this. Otherwise, set it.
-            current_err_msg = page_metrics.get("gemini_error_message", "")
-            retrieval_err_msg = retrieved_genai_content[0]["error"]
-            separator = " | " if current_err_msg and retrieval_err_msg else ""
-            page_metrics["gemini_error_message"] = f"{current_err_msg}{separator}{retrieval_err_msg}"
+        gemini_window_futures = {} # Actual page number -> future of the Gemini batch call that covers it
+
+        gemini_page_indices = list(page_indices)
+        if fitz_layout_shortcut:
+            fitz_layout_min_text_len = fitz_layout_min_text_factor * page_thresholds["min_fitz_text_length"]
+            gemini_page_indices = []
+            for page_idx in page_indices:
+                fitz_layout_items = None
+                try:
+                    fitz_layout_items = _fitz_layout_for_simple_page(pdf_document_original[page_idx], fitz_layout_min_text_len)
+                except Exception as e_fitz_layout:
+                    print(f"   ⚠️ Fitz layout check failed for page {page_idx + 1}, sending it to Gemini: {e_fitz_layout}")
+                if fitz_layout_items is None:
+                    gemini_page_indices.append(page_idx)
+                else:
+                    gemini_data_per_page[page_idx + 1] = fitz_layout_items
+                    chunk_gemini_metrics_map[page_idx + 1] = {"gemini_api_status": "SkippedFitzLayout", "time_sec_gemini_layout": 0.0}
+            print(f"⏭️  Fitz layout shortcut: {num_pages_total_original - len(gemini_page_indices)} of {num_pages_total_original} pages skip Gemini.")
 
+        print(f"\n🤖 Starting Gemini Processing in batches of {GEMINI_BATCH_SIZE} pages ({GEMINI_WORKERS} calls in flight)...")
+        # Each batch is a run of consecutive pages; without the Fitz shortcut these are simply the fixed-size batches.
+        for batch_page_indices in _contiguous_page_batches(gemini_page_indices, GEMINI_BATCH_SIZE):
+            
+            # Only the batch's own pages are stored; the overlap pages in front of them are context for Gemini.
+            pages_to_store_from_this_window_actual_nums = [p_idx + 1 for p_idx in batch_page_indices]
+            context_start_idx = max(0, batch_page_indices[0] - GEMINI_BATCH_OVERLAP)
+            window_page_indices = list(range(context_start_idx, batch_page_indices[0])) + batch_page_indices
+            
+            start_actual_page_num_in_window = window_page_indices[0] + 1
+            num_pages_in_window = len(window_page_indices)
+            
+            print(f"⚙️  Gemini Batch: Original Page(s) {start_actual_page_num_in_window} to {window_page_indices[-1] + 1}")
+            
+            # The batch PDF is built in memory here on the driver (fitz is not thread-safe); only the API call goes to a thread.
+            try:
+                pdf_chunk_bytes = _extract_page_range_bytes(pdf_document_original, window_page_indices[0], num_pages_in_window)
 
-        try:
-            page_response_data, updated_page_metrics = _finalize_single_page_processing(
-                actual_page_num,
-                retrieved_genai_content,
-                pypdf2_text_for_page,
-                ocr_text_for_page,
-                fitz_page_text_content,
-                hyperlinks_from_fitz,
-                page_metrics, 
+                window_future = gemini_executor.submit(
+                    _run_gemini_window, pdf_chunk_bytes, window_page_indices, pages_to_store_from_this_window_actual_nums
+                )
+                for actual_page_to_store in pages_to_store_from_this_window_actual_nums:
+                    gemini_window_futures[actual_page_to_store] = window_future
+
+            except Exception as e_gemini_window:
+                print(f"❌ Error during Gemini processing for batch starting at original page {start_actual_page_num_in_window}: {e_gemini_window}")
+                gemini_call_specific_metrics = {
+                    "gemini_api_status": "ExceptionInWindowProcessing",
+                    "gemini_error_message": str(e_gemini_window),
+                    "time_sec_gemini_layout": 0.0
+                }
+                # Store error for all pages that were meant to be captured by this failed batch's Gemini call
+                for actual_page_num_fail in pages_to_store_from_this_window_actual_nums:
+                    gemini_data_per_page[actual_page_num_fail] = [{"error": f"Gemini window processing failed: {e_gemini_window}"}]
+                    chunk_gemini_metrics_map[actual_page_num_fail] = dict(gemini_call_specific_metrics)
+
+        # --- Stage 2: Per-Page Verification and Finalization ---
+        # A page is finalized (on the worker processes) as soon as both its Gemini window and its text extraction are done.
+        finalize_futures = []
+        for page_idx in page_indices:
+            actual_page_num = page_idx + 1
+            window_future = gemini_window_futures.get(actual_page_num)
+            if window_future is not None:
+                window_page_data, window_page_metrics = window_future.result()
+                gemini_data_per_page.update(window_page_data)
+                chunk_gemini_metrics_map.update(window_page_metrics)
+            finalize_futures.append(page_executor.submit(
+                _finalize_extracted_page,
+                extraction_futures[page_idx].result(),
+                gemini_data_per_page.get(actual_page_num),
+                chunk_gemini_metrics_map.get(actual_page_num),
                 genai_output_dir,
-                FUZZY_MATCH_THRESHOLD,
-                MIN_DIRECT_PYPDF2_TEXT_LENGTH_THRESHOLD,
-                MIN_FITZ_TEXT_LENGTH_THRESHOLD,
-                MIN_CONTENT_LEN_FOR_FUZZY
-            )
-            all_page_responses_for_results_json.append(page_response_data)
-            # page_metrics (now updated_page_metrics) already contains timings from _finalize_single_page_processing
-            updated_page_metrics["time_sec_total_page_processing"] = time.time() - page_individual_start_time #
-            all_page_metrics_final_list.append(updated_page_metrics)
-        except Exception as e_finalize:
-            print(f"   ❌ Error finalizing page {actual_page_num}: {e_finalize}")
-            # Ensure the 'error' key exists in page_metrics or add it.
-            # _initialize_page_metrics does not have a generic 'error' key, but 'gemini_error_message'.
-            # Let's add this to 'gemini_error_message' or a general error field if defined in _initialize_page_metrics.
-            current_err_msg = page_metrics.get("gemini_error_message", "")
-            finalize_err_msg = f"page_finalization_failed: {e_finalize}"
-            separator = " | " if current_err_msg and finalize_err_msg else ""
-            page_metrics["gemini_error_message"] = f"{current_err_msg}{separator}{finalize_err_msg}"
-            
-            # page_metrics["error"] = f"page_finalization_failed: {e_finalize}" # If using an ad-hoc error key
+                page_thresholds
+            ))
+        print("🤖 Gemini processing phase complete.")
 
-            final_content_filename_err = f"page_{actual_page_num}_final_content.json"
-            original_genai_filename_err = f"page_{actual_page_num}_genai.json"
-            # Use the error from page_metrics for consistency if it's structured there, e.g. page_metrics["gemini_error_message"]
-            error_content_for_file_fin = [{"error": page_metrics.get("gemini_error_message",finalize_err_msg)}]
-            try:
-                with open(os.path.join(genai_output_dir, final_content_filename_err), "w", encoding="utf-8") as f_err: json.dump(error_content_for_file_fin, f_err, indent=2)
-                if not os.path.exists(os.path.join(genai_output_dir, original_genai_filename_err)): 
-                    with open(os.path.join(genai_output_dir, original_genai_filename_err), "w", encoding="utf-8") as f_err_o: json.dump(retrieved_genai_content if retrieved_genai_content else error_content_for_file_fin, f_err_o, indent=2)
-            except Exception as e_save_err_fin: print(f"   ⚠️ Also failed to save error file during finalization for page {actual_page_num}: {e_save_err_fin}")
-
-            all_page_responses_for_results_json.append({
-                "page_number": actual_page_num, "error": page_metrics.get("gemini_error_message", finalize_err_msg),
-                "gemini_original_output_file": original_genai_filename_err,
-                "gemini_final_content_file": final_content_filename_err
-            })
-            page_metrics["time_sec_total_page_processing"] = time.time() - page_individual_start_time #
+        for finalize_future in finalize_futures:
+            page_response_data, page_metrics, final_page_content = finalize_future.result()
+            all_page_responses_for_results_json.append(page_response_data)
             all_page_metrics_final_list.append(page_metrics)
-
+            if final_page_content is not None:
+                final_content_per_page[page_response_data["page_number"]] = final_page_content
 
     if pdf_document_original: pdf_document_original.close()
 
-    print(f"\n📊 Total time for Stage 2 (Per-Page Fitz, OCR, Finalization): {time.time() - page_processing_overall_start_time:.2f} seconds.")
+    print(f"\n📊 Total time for Stage 1 and Stage 2 (Gemini, Per-Page Fitz, OCR, Finalization): {time.time() - page_processing_overall_start_time:.2f} seconds.")
 
     _save_results(all_page_responses_for_results_json, all_page_metrics_final_list, output_dir) #
-    _create_book_output(all_page_responses_for_results_json, genai_output_dir, output_dir)
-
-    book_output_json_path = os.path.join(output_dir, "book_output.json")
-    if os.path.exists(book_output_json_path):
-        try:
-            with open(book_output_json_path, "r", encoding="utf-8") as f_book_json:
-                book_data_for_html = json.load(f_book_json)
-            convert_book_json_to_html(book_data_for_html, output_dir, "book_output.html")
-        except Exception as e_html_conversion:
-            print(f"❌ Error converting book_output.json to HTML: {e_html_conversion}")
-    else:
-        print(f"⚠️ Could not find book_output.json at {book_output_json_path} for HTML conversion.")
+    # The HTML is built from the book data returned in memory rather than re-reading book_output.json.
+    book_data_for_html = _create_book_output(all_page_responses_for_results_json, genai_output_dir, output_dir, final_content_per_page)
+    try:
+        convert_book_json_to_html(book_data_for_html, output_dir, "book_output.html")
+    except Exception as e_html_conversion:
+        print(f"❌ Error converting book_output.json to HTML: {e_html_conversion}")
 
     return all_page_metrics_final_list
 
 
-def _create_book_output(all_page_data_for_results: list, genai_output_dir: str, main_output_dir: str):
+def _create_book_output(all_page_data_for_results: list, genai_output_dir: str, main_output_dir: str, final_content_per_page: dict | None = None) -> dict:
     """
     Creates book_output.json by aggregating and transforming page_{N}_final_content.json files.
+    Pages whose final content is already in final_content_per_page (page number -> items, as returned
+    by the finalization workers) are taken from there; the files are only read for the others.
     The structure will be a dictionary with page numbers as keys.
     The 'rect' node will be removed from 'hyperlinks' (formerly 'matched_hyperlinks').
     The 'page_number' node will be removed from individual items.
+    Returns the book data as written, for the HTML conversion.
     """
     book_data = {}
     print(f"\n📚 Creating consolidated book_output.json in {main_output_dir}")
@@ -628,36 +949,45 @@ def _create_book_output(all_page_data_for_results: list, genai_output_dir: str,
             continue
 
         final_content_filepath = os.path.join(genai_output_dir, final_content_filename)
+        in_memory_page_items = final_content_per_page.get(page_number) if final_content_per_page else None
         
         page_content_list_for_book = []
         try:
-            if os.path.exists(final_content_filepath):
-                with open(final_content_filepath, "r", encoding="utf-8") as f_final:
-                    page_items_from_file = json.load(f_final)
-                
-                processed_page_items = copy.deepcopy(page_items_from_file)
-
-                if isinstance(processed_page_items, list):
-                    for item in processed_page_items:
-                        if isinstance(item, dict):
-                            if "hyperlinks" in item and isinstance(item["hyperlinks"], list):
-                                transformed_hyperlinks = []
-                                for hyperlink_details in item["hyperlinks"]:
-                                    if isinstance(hyperlink_details, dict):
-                                        link_without_rect = {k: v for k, v in hyperlink_details.items() if k != 'rect'}
-                                        transformed_hyperlinks.append(link_without_rect)
-                                item["hyperlinks"] = transformed_hyperlinks
-                            if "page_number" in item:
-                                del item["page_number"]
-                    page_content_list_for_book = processed_page_items
-                else:
-                    print(f"⚠️ Content of {final_content_filepath} for page {page_number} is not a list. Storing as is.")
-                    page_content_list_for_book = processed_page_items 
+            if in_memory_page_items is not None:
+                page_items_from_file = in_memory_page_items
+            else: # Opened directly; a missing file surfaces as FileNotFoundError below
+                with open(final_content_filepath, "rb") as f_final:
+                    page_items_from_file = orjson.loads(f_final.read())
+
+            # Either freshly loaded or the workers' pickled copy (whose matched hyperlinks are
+            # already separate dicts without 'rect'), so safe to modify in place
+            processed_page_items = page_items_from_file
+
+            if isinstance(processed_page_items, list):
+                # One pass per item: 'rect' is popped from each hyperlink as it is visited, and the list is
+                # only rebuilt in the rare case that it holds something other than hyperlink dicts.
+                for item in processed_page_items:
+                    if not isinstance(item, dict):
+                        continue
+                    item.pop("page_number", None)
+                    item_hyperlinks = item.get("hyperlinks")
+                    if isinstance(item_hyperlinks, list):
+                        has_non_dict_hyperlink = False
+                        for hyperlink_details in item_hyperlinks:
+                            if isinstance(hyperlink_details, dict):
+                                hyperlink_details.pop("rect", None)
+                            else:
+                                has_non_dict_hyperlink = True
+                        if has_non_dict_hyperlink:
+                            item["hyperlinks"] = [hyperlink_details for hyperlink_details in item_hyperlinks if isinstance(hyperlink_details, dict)]
+                page_content_list_for_book = processed_page_items
             else:
-                print(f"⚠️ File not found: {final_content_filepath} for page {page_number}. Storing error placeholder.")
-                page_content_list_for_book = [{"error": f"File {final_content_filename} not found"}]
-        
-        except json.JSONDecodeError as je:
+                print(f"⚠️ Content of {final_content_filepath} for page {page_number} is not a list. Storing as is.")
+                page_content_list_for_book = processed_page_items 
+        except FileNotFoundError:
+            print(f"⚠️ File not found: {final_content_filepath} for page {page_number}. Storing error placeholder.")
+            page_content_list_for_book = [{"error": f"File {final_content_filename} not found"}]
+        except orjson.JSONDecodeError as je:
             print(f"⚠️ Error decoding JSON from {final_content_filepath} for page {page_number}: {je}. Storing error placeholder.")
             page_content_list_for_book = [{"error": f"JSONDecodeError in {final_content_filename}: {str(je)}"}]
         except Exception as e:
@@ -668,11 +998,12 @@ def _create_book_output(all_page_data_for_results: list, genai_output_dir: str,
 
     book_output_filepath = os.path.join(main_output_dir, "book_output.json")
     try:
-        with open(book_output_filepath, "w", encoding="utf-8") as f_book:
-            json.dump(book_data, f_book, indent=2, ensure_ascii=False)
+        with open(book_output_filepath, "wb") as f_book:
+            f_book.write(orjson.dumps(book_data, option=orjson.OPT_INDENT_2))
         print(f"✅ Successfully created {book_output_filepath}")
     except Exception as e_save_book:
         print(f"❌ Error saving consolidated book_output.json: {e_save_book}")
+    return book_data
 
 
 if __name__ == "__main__":
@@ -684,8 +1015,8 @@ if __name__ == "__main__":
     except ImportError: print("⚠️ PyPDF2 library not found. Direct PyPDF2 text extraction will fail.")
     try: from pdf2image import convert_from_path # type: ignore
     except ImportError: print("⚠️ pdf2image library not found. OCR extraction will fail.")
-    try: from thefuzz import fuzz # type: ignore
-    except ImportError: print("⚠️ thefuzz library not found. Fuzzy verification will fail. pip install thefuzz python-Levenshtein")
+    try: from rapidfuzz import fuzz # type: ignore
+    except ImportError: print("⚠️ rapidfuzz library not found. Fuzzy verification will fail. pip install rapidfuzz")
  
     base_dir = Path(__file__).resolve().parent
     project_root_path = base_dir.parents[3]
@@ -697,11 +1028,9 @@ if __name__ == "__main__":
     temp_pdf_page_dir_path = output_dir_path / "temp_pdf_chunks" 
     
     os.makedirs(output_dir_path, exist_ok=True)
-    os.makedirs(temp_pdf_page_dir_path, exist_ok=True)
 
     print(f"Input PDF path: {pdf_path}")
     print(f"Output directory: {output_dir_path}")
-    print(f"Temporary PDF chunk directory: {temp_pdf_page_dir_path}")
 
     if not pdf_path.exists():
         print(f"❌ ERROR: PDF file not found at {pdf_path}")
@@ -1,10 +1,32 @@
-
 #import json
 import os
 import pandas as pd
 
 #from utils.file_converters import convert_json_to_csv_and_excel, convert_json_to_html
 
+def _write_page_summary_excel(page_metrics: list, summary_excel_path: str) -> None:
+    """
+    Writes the page metrics to Excel row by row with xlsxwriter in constant_memory mode, so each
+    row is flushed to disk as it is written instead of the whole workbook being held in memory.
+    Columns are the metric keys in order of first appearance, as pd.DataFrame(page_metrics) gives them.
+    """
+    import xlsxwriter
+    columns = list(dict.fromkeys(key for metrics in page_metrics for key in metrics))
+    workbook = xlsxwriter.Workbook(summary_excel_path, {"constant_memory": True})
+    try:
+        worksheet = workbook.add_worksheet()
+        worksheet.write_row(0, 0, columns)
+        for row_idx, metrics in enumerate(page_metrics, start=1):
+            for col_idx, key in enumerate(columns):
+                value = metrics.get(key)
+                if value is None or value != value: # Missing and NaN values are left blank, as with to_excel
+                    continue
+                if not isinstance(value, (str, int, float)):
+                    value = str(value)
+                worksheet.write(row_idx, col_idx, value)
+    finally:
+        workbook.close()
+
 def _save_results(all_responses: list, page_metrics: list, output_dir: str) -> None:
     """
     Saves page metrics to Excel/CSV.
@@ -14,17 +36,19 @@ def _save_results(all_responses: list, page_metrics: list, output_dir: str) -> N
     results.json and book_output.json.
     """
     if page_metrics:
-        summary_df = pd.DataFrame(page_metrics)
         summary_excel_path = os.path.join(output_dir, "page_summary_with_verification.xlsx")
         try:
-            summary_df.to_excel(summary_excel_path, index=False)
+            try:
+                _write_page_summary_excel(page_metrics, summary_excel_path)
+            except ImportError:
+                pd.DataFrame(page_metrics).to_excel(summary_excel_path, index=False) # xlsxwriter not installed
             print(f"✅ Page-level summary with verification written to: {summary_excel_path}")
         except Exception as e:
             print(f"❌ Failed to save page summary to Excel: {e}")
             # Fallback to CSV if Excel saving fails
             summary_csv_path = os.path.join(output_dir, "page_summary_with_verification.csv")
             try:
-                summary_df.to_csv(summary_csv_path, index=False, encoding='utf-8-sig')
+                pd.DataFrame(page_metrics).to_csv(summary_csv_path, index=False, encoding='utf-8-sig')
                 print(f"✅ Page-level summary written to CSV as fallback: {summary_csv_path}")
             except Exception as e_csv:
                 print(f"❌ Failed to save page summary to CSV as fallback: {e_csv}")
@@ -1,8 +1,8 @@
 import os
 import argparse
-import json # Added for JSON operations
+import orjson # Fast JSON (de)serialization for large Document AI payloads
 from google.cloud import documentai_v1 as documentai # For type hinting
-from google.protobuf.json_format import MessageToJson # Added to convert Document object to JSON
+from google.protobuf.json_format import MessageToDict # Converts the Document protobuf to JSON-ready Python objects
 from pathlib import Path
 
 from services.documentai_client import process_document_sample
@@ -62,14 +62,14 @@ def save_document_as_json(
         # Construct the output filename
         base_name, _ = os.path.splitext(input_pdf_filename)
         output_filename = f"{base_name}_doc_ai_output.json"
-        output_filepath = os.path.join(output_directory_path, output_filename)
+        output_filepath = Path(output_directory_path) / output_filename
 
-        # Convert Document object to JSON string
-        json_string = MessageToJson(document_object._pb) # Access the underlying protobuf message
+        # Convert the Document object to its JSON mapping once; MessageToJson would build the same dict and
+        # then serialize it with the pure-Python indenting encoder, only for it to be parsed back here.
+        document_dict = MessageToDict(document_object._pb) # Access the underlying protobuf message
 
-        # Write JSON string to file
-        with open(output_filepath, "w", encoding="utf-8") as f:
-            json.dump(json.loads(json_string), f, indent=4) # Pretty print JSON
+        # Write pretty-printed JSON bytes to file (orjson emits UTF-8 directly)
+        output_filepath.write_bytes(orjson.dumps(document_dict, option=orjson.OPT_INDENT_2))
 
         print(f"INFO: Successfully saved Document AI output to: {output_filepath}")
 
@@ -2,15 +2,52 @@ import time
 import json
 import os
 import re
+import orjson
 
-from services.gemini_client import call_gemini_api
+from services.gemini_client import GEMINI_MODEL, build_inline_payload_frame, call_gemini_api
+from utils.content_cache import content_hash, layout_response_cache
 from utils.prompt_loader import load_text_prompt
 from utils.json_utils import _clean_json_string
 
 gemini_layout_prompt_text = load_text_prompt("gemini_layout_prompt.txt")
+# The layout prompt is the same for every page, so its request parts are built once.
+GEMINI_LAYOUT_PROMPT_PARTS = [{"text": gemini_layout_prompt_text}]
+GEMINI_LAYOUT_PROMPT_IS_VALID = bool(gemini_layout_prompt_text and gemini_layout_prompt_text.strip())
+# JSON mode: the response text is the JSON document itself, with no Markdown fences or prose around it.
+# The shape (PageN keys) is still defined by the prompt.
+GEMINI_LAYOUT_GENERATION_CONFIG = {"responseMimeType": "application/json"}
+# The request body around each chunk's PDF data is the same for every call, so it is serialized once.
+GEMINI_LAYOUT_PAYLOAD_FRAME = build_inline_payload_frame(
+    "application/pdf", GEMINI_LAYOUT_PROMPT_PARTS, GEMINI_LAYOUT_GENERATION_CONFIG
+)
+GEMINI_LAYOUT_PROMPT_HASH = content_hash(
+    gemini_layout_prompt_text.encode("utf-8"),
+    json.dumps(GEMINI_LAYOUT_GENERATION_CONFIG, sort_keys=True).encode("utf-8")
+) if gemini_layout_prompt_text else ""
+# Folded into response cache keys. Bumped when caching started to require a validated response, so
+# entries stored unchecked by earlier runs are never replayed.
+GEMINI_LAYOUT_CACHE_VERSION = b"validated-v1"
+
+# Keys of a dict-shaped response that name a page: "Page1", "page_2", "pg 3" or a bare number.
+_PAGE_KEY_RE = re.compile(r"(?:page|pg)?[_ ]*(\d+)")
+
+def _page_offset_from_parsed_key(key_str: str, max_offset_exclusive: int) -> int | None:
+    """
+    Returns the 0-based page offset within the chunk named by a response key, or None if the key does
+    not name a page of the chunk. Bare numbers are taken as offsets and "PageN"-style keys as 1-based.
+    """
+    if key_str.isdecimal(): # The common bare-number case needs no regex
+        offset = int(key_str)
+    else:
+        key_lower = key_str.lower()
+        match_text_num = _PAGE_KEY_RE.fullmatch(key_lower)
+        if not match_text_num or not ("page" in key_lower or "pg" in key_lower):
+            return None
+        offset = int(match_text_num.group(1)) - 1
+    return offset if 0 <= offset < max_offset_exclusive else None
 
 def _call_gemini_for_layout(
-    pdf_chunk_base64: str,
+    pdf_chunk_data: str | bytes, # Base64 string or the raw PDF bytes
     start_page_actual: int,
     num_pages_in_chunk: int,
     # genai_output_dir: str, # No longer needed for saving here
@@ -33,15 +70,29 @@ def _call_gemini_for_layout(
     parsed_data_to_return = None # This will be what the function returns
 
     try:
-        if not gemini_layout_prompt_text or not gemini_layout_prompt_text.strip():
+        if not GEMINI_LAYOUT_PROMPT_IS_VALID:
             raise ValueError("Gemini layout prompt text from gemini_layout_prompt.txt is empty or invalid.")
         
-        gemini_api_parts = [{"text": gemini_layout_prompt_text}]
-        gemini_api_call_response = call_gemini_api(
-            image_base64=pdf_chunk_base64,
-            prompt_parts=gemini_api_parts,
-            mime_type="application/pdf"
+        # Raw responses are cached by (payload, model, prompt), so duplicate pages and re-runs
+        # over the same PDF (retries, development loops) skip the API call entirely. A response is
+        # only cached once it has finished normally and parsed into page items (see below), so blocked,
+        # truncated or unparsable responses are retried on the next run instead of replayed.
+        cache_key = content_hash(
+            pdf_chunk_data if isinstance(pdf_chunk_data, bytes) else pdf_chunk_data.encode("ascii"),
+            GEMINI_MODEL.encode("utf-8"),
+            GEMINI_LAYOUT_PROMPT_HASH.encode("ascii"),
+            GEMINI_LAYOUT_CACHE_VERSION
         )
+        gemini_api_call_response = layout_response_cache.get(cache_key)
+        response_reused = gemini_api_call_response is not None
+        if not response_reused:
+            gemini_api_call_response = call_gemini_api(
+                image_base64=pdf_chunk_data,
+                prompt_parts=GEMINI_LAYOUT_PROMPT_PARTS,
+                mime_type="application/pdf",
+                generation_config=GEMINI_LAYOUT_GENERATION_CONFIG,
+                payload_frame=GEMINI_LAYOUT_PAYLOAD_FRAME
+            )
         # Ensure time_sec_gemini_layout is recorded even if subsequent parsing fails
         metrics["time_sec_gemini_layout"] = time.time() - gemini_layout_start_time 
         gemini_raw_text = gemini_api_call_response.get("text", "")
@@ -50,17 +101,27 @@ def _call_gemini_for_layout(
             "gemini_api_status": 200, # Assuming success if no exception from call_gemini_api
             "gemini_input_tokens": gemini_api_call_response.get("input_tokens", 0),
             "gemini_output_tokens": gemini_api_call_response.get("output_tokens", 0),
-            "gemini_cost_usd": gemini_api_call_response.get("cost", 0.0)
+            "gemini_cost_usd": 0.0 if response_reused else gemini_api_call_response.get("cost", 0.0),
+            "gemini_response_reused": response_reused
         })
 
-        cleaned_gemini_json_str = _clean_json_string(gemini_raw_text)
+        # In JSON mode the text parses as-is, once. Cleaning (fence stripping plus a brace scan that
+        # validates with its own parse) is only the fallback for a response that is not bare JSON.
+        parsed_data = None
+        try:
+            parsed_data = orjson.loads(gemini_raw_text) if gemini_raw_text else None
+            cleaned_gemini_json_str = gemini_raw_text if parsed_data is not None else None
+        except orjson.JSONDecodeError:
+            cleaned_gemini_json_str = _clean_json_string(gemini_raw_text)
         metrics["gemini_response_length"] = len(cleaned_gemini_json_str or "")
         
         processed_items_list = [] # For aggregating items if the response is a list or needs restructuring
+        response_has_page_items = False # Set by the branches below that produce usable page items
 
         if cleaned_gemini_json_str:
             try:
-                parsed_data = json.loads(cleaned_gemini_json_str)
+                if parsed_data is None:
+                    parsed_data = orjson.loads(cleaned_gemini_json_str)
 
                 if isinstance(parsed_data, list):
                     for node in parsed_data:
@@ -81,30 +142,17 @@ def _call_gemini_for_layout(
                         "processed_chunk_page_range": [start_page_actual, start_page_actual + num_pages_in_chunk - 1],
                         "_source_data_type": "list"
                     }
+                    response_has_page_items = bool(processed_items_list)
                     print(f"✅ Parsed Gemini list response for chunk pages {start_page_actual}-{start_page_actual + num_pages_in_chunk - 1}.")
 
                 elif isinstance(parsed_data, dict):
                     
-                    def get_page_offset_from_parsed_key(key_str: str, max_offset_exclusive: int) -> int | None:
-                        key_lower = key_str.lower()
-                        match_text_num = re.fullmatch(r"(?:page|pg)?[_ ]*(\d+)", key_lower)
-                        if match_text_num:
-                            num_in_key = int(match_text_num.group(1))
-                            offset = -1
-                            if key_str.isdigit(): 
-                                offset = num_in_key
-                            elif "page" in key_lower or "pg" in key_lower : 
-                                offset = num_in_key - 1 
-                            if 0 <= offset < max_offset_exclusive:
-                                return offset
-                        return None
-
                     page_structured_items_for_return = {} 
                     unassigned_dict_keys_values = {} 
                     found_structured_page_data_in_dict = False
 
                     for key, value_list in parsed_data.items():
-                        page_offset = get_page_offset_from_parsed_key(key, num_pages_in_chunk)
+                        page_offset = _page_offset_from_parsed_key(key, num_pages_in_chunk)
                         if page_offset is not None and isinstance(value_list, list):
                             found_structured_page_data_in_dict = True
                             actual_page_num_for_nodes = start_page_actual + page_offset
@@ -118,6 +166,7 @@ def _call_gemini_for_layout(
                             unassigned_dict_keys_values[key] = value_list
                     
                     if found_structured_page_data_in_dict:
+                        response_has_page_items = any(page_structured_items_for_return.values())
                         # The main structure is the dict with PageX keys
                         parsed_data_to_return = {**page_structured_items_for_return, **unassigned_dict_keys_values}
                         # Add metadata for clarity if needed by consuming function
@@ -154,6 +203,7 @@ def _call_gemini_for_layout(
 
 
                         if num_pages_in_chunk == 1:
+                            response_has_page_items = bool(items_in_dict) if isinstance(items_in_dict, list) else True
                             print(f"✅ Parsed Gemini dict response for single page {start_page_actual}.")
                         else: # Multi-page chunk but received a single, non-page-structured dict
                             error_msg = "Gemini returned a single dictionary for a multi-page chunk without recognized page structure."
@@ -196,6 +246,9 @@ def _call_gemini_for_layout(
                 "processed_chunk_page_range": [start_page_actual, start_page_actual + num_pages_in_chunk - 1]
             }
 
+        if response_has_page_items and not response_reused and gemini_api_call_response.get("finish_reason") == "STOP":
+            layout_response_cache.set(cache_key, gemini_api_call_response)
+
         # File saving block removed
         # try:
         #     with open(output_file_path, "w", encoding="utf-8") as f:
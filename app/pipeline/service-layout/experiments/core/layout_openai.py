@@ -3,15 +3,23 @@ import json
 import os
 import re # <-- Added import for regular expressions
 
-from services.openai_client import call_openai_with_pdf
+import orjson
+
 from utils.prompt_loader import load_text_prompt
 from utils.json_utils import _clean_json_string
+from utils.content_cache import content_hash, layout_response_cache
 
 openai_prompt_text = load_text_prompt("openai_layout_prompt.txt")
+OPENAI_LAYOUT_PROMPT_HASH = content_hash(openai_prompt_text.encode("utf-8")) if openai_prompt_text else ""
+# Folded into response cache keys. Bumped when caching started to require a validated response, so
+# entries stored unchecked by earlier runs are never replayed.
+OPENAI_LAYOUT_CACHE_VERSION = b"validated-v1"
 
 
-def _call_openai_for_layout(temp_pdf_page_path: str, page_num_actual: int, genai_output_dir: str, metrics: dict) -> dict:
-    """Calls OpenAI API for layout extraction and updates metrics."""
+def _call_openai_for_layout(pdf_page_source: str | bytes, page_num_actual: int, genai_output_dir: str, metrics: dict) -> dict:
+    """Calls OpenAI API for layout extraction and updates metrics. pdf_page_source is a PDF path or the page's PDF bytes."""
+    # Imported here so the OpenAI SDK is only loaded by processes that actually call it.
+    from services.openai_client import OPENAI_MODEL, call_openai_with_pdf
     global openai_prompt_text
     openai_json_result_for_return = {} # This will be the dictionary returned by the function
     openai_raw_text = ""
@@ -20,10 +28,25 @@ def _call_openai_for_layout(temp_pdf_page_path: str, page_num_actual: int, genai
     output_file_path = os.path.join(genai_output_dir, f"page_{page_num_actual}_openai.json") # More accurate name
 
     try:
-        openai_api_call_response = call_openai_with_pdf(
-            pdf_path=temp_pdf_page_path,
-            prompt=openai_prompt_text
-        )
+        # Raw responses are cached by (page bytes, model, prompt), so duplicate pages and re-runs skip
+        # the upload and API call. Only in-memory bytes are cached; a path says nothing about the file's content.
+        # A response is only cached once it has finished normally and parsed into layout items (see below),
+        # so truncated, empty or unparsable responses are retried on the next run instead of replayed.
+        cache_key = None
+        if isinstance(pdf_page_source, (bytes, bytearray)):
+            cache_key = content_hash(
+                pdf_page_source,
+                OPENAI_MODEL.encode("utf-8"),
+                OPENAI_LAYOUT_PROMPT_HASH.encode("ascii"),
+                OPENAI_LAYOUT_CACHE_VERSION
+            )
+        openai_api_call_response = layout_response_cache.get(cache_key) if cache_key else None
+        response_reused = openai_api_call_response is not None
+        if not response_reused:
+            openai_api_call_response = call_openai_with_pdf(
+                pdf_path=pdf_page_source,
+                prompt=openai_prompt_text
+            )
         metrics["time_sec_openai_layout"] = time.time() - openai_layout_start_time
         openai_raw_text = openai_api_call_response.get("text", "") 
         
@@ -35,17 +58,19 @@ def _call_openai_for_layout(temp_pdf_page_path: str, page_num_actual: int, genai
             "openai_api_status": 200,
             "openai_input_tokens": openai_api_call_response.get("input_tokens", 0),
             "openai_output_tokens": openai_api_call_response.get("output_tokens", 0),
-            "openai_cost_usd": openai_api_call_response.get("cost", 0.0)
+            "openai_cost_usd": 0.0 if response_reused else openai_api_call_response.get("cost", 0.0),
+            "openai_response_reused": response_reused
         })
 
         cleaned_openai_json_str = _clean_json_string(openai_raw_text)
         metrics["openai_response_length"] = len(cleaned_openai_json_str or "")
 
         parsed_data_for_file = None # To store data before serializing to file
+        response_has_layout_items = False # Set by the branches below that produce usable layout items
 
         if cleaned_openai_json_str:
             try:
-                parsed_data = json.loads(cleaned_openai_json_str) # This can be a list or dict
+                parsed_data = orjson.loads(cleaned_openai_json_str) # This can be a list or dict
                 parsed_data_for_file = parsed_data # Will be used for saving to file
 
                 if isinstance(parsed_data, list):
@@ -56,6 +81,7 @@ def _call_openai_for_layout(temp_pdf_page_path: str, page_num_actual: int, genai
                         "page_number": page_num_actual,
                         "_root_type": "list" # Optional: flag indicating the original root type
                     }
+                    response_has_layout_items = bool(parsed_data)
                     print(f"✅ Received and parsed OpenAI response for page {page_num_actual}")
                 elif isinstance(parsed_data, dict):
                     # Valid case: OpenAI returned a dictionary.
@@ -64,6 +90,7 @@ def _call_openai_for_layout(temp_pdf_page_path: str, page_num_actual: int, genai
                         openai_json_result_for_return["page_number"] = page_num_actual
                     
                     if "error" not in openai_json_result_for_return: # Check if the dict itself isn't an error message
+                        response_has_layout_items = any(key != "page_number" for key in openai_json_result_for_return)
                         print(f"✅ Received and parsed OpenAI response (dictionary) for page {page_num_actual}")
                     else:
                         # The parsed dict already contains an error key (e.g. from _clean_json_string if it returns error dicts)
@@ -106,16 +133,19 @@ def _call_openai_for_layout(temp_pdf_page_path: str, page_num_actual: int, genai
             }
             parsed_data_for_file = openai_json_result_for_return # Save error to file
 
+        if cache_key and response_has_layout_items and not response_reused and openai_api_call_response.get("finish_reason") == "stop":
+            layout_response_cache.set(cache_key, openai_api_call_response)
+
         # Save the processed data (parsed JSON object/list or error string/dict) to the JSON file
         try:
-            with open(output_file_path, "w", encoding="utf-8") as f:
+            with open(output_file_path, "wb") as f:
                 if isinstance(parsed_data_for_file, (dict, list)):
-                    json.dump(parsed_data_for_file, f, indent=2, ensure_ascii=False)
+                    f.write(orjson.dumps(parsed_data_for_file, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
                 elif isinstance(parsed_data_for_file, str): # e.g. problematic cleaned string
-                    f.write(parsed_data_for_file)
+                    f.write(parsed_data_for_file.encode("utf-8"))
                 else: # Fallback if parsed_data_for_file is None or other unexpected type
-                    json.dump({"error": "No valid data to save after cleaning/parsing attempts.", 
-                            "raw_output_preview": openai_raw_text[:200]}, f, indent=2, ensure_ascii=False)
+                    f.write(orjson.dumps({"error": "No valid data to save after cleaning/parsing attempts.", 
+                            "raw_output_preview": openai_raw_text[:200]}, option=orjson.OPT_INDENT_2))
         except Exception as e_save:
             print(f"⚠️ Error saving processed OpenAI data to file {output_file_path}: {e_save}")
             # openai_json_result_for_return might already be an error dict, or update it
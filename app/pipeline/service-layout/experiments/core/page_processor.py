@@ -2,9 +2,10 @@ import time
 import json
 import os
 
+import orjson
+
 from services.gemini_client import call_gemini_api
 from utils.json_utils import _clean_json_string, attach_page_number_tag
-from services.openai_client import call_openai_with_json, call_openai_with_pdf
 from utils.prompt_loader import load_text_prompt
 
 
@@ -13,12 +14,12 @@ consolidation_prompt_text = load_text_prompt("consolidation_prompt.txt")
 sanitize_prompt_text = load_text_prompt("sanitize_prompt.txt")
 output_verification_prompt_text = load_text_prompt("output_verification_prompt.txt")
 
-def consolidate_responses(pdf_page_base64: str, gemini_json_input: dict, openai_json_input: dict, prompt_text: str) -> dict:
+def consolidate_responses(pdf_page_data: str | bytes, gemini_json_input: dict, openai_json_input: dict, prompt_text: str) -> dict:
     """
     Consolidates responses from Gemini and OpenAI using Gemini API.
 
     Args:
-        pdf_page_base64: Base64 string of the PDF page (single page only).
+        pdf_page_data: Base64 string or raw bytes of the PDF page (single page only).
         gemini_json_input: JSON response from Gemini layout model.
         openai_json_input: JSON response from OpenAI layout model.
         prompt_text: Custom prompt text guiding how to consolidate both JSONs.
@@ -40,7 +41,7 @@ def consolidate_responses(pdf_page_base64: str, gemini_json_input: dict, openai_
 
         # Call Gemini API with PDF base64 and constructed prompt
         gemini_response = call_gemini_api(
-            image_base64=pdf_page_base64,
+            image_base64=pdf_page_data,
             prompt_parts=consolidation_api_prompt_parts,
             mime_type="application/pdf"
         )
@@ -52,7 +53,7 @@ def consolidate_responses(pdf_page_base64: str, gemini_json_input: dict, openai_
 
         if cleaned_json_str:
             try:
-                parsed_result = json.loads(cleaned_json_str)
+                parsed_result = orjson.loads(cleaned_json_str)
                 # Ensure parsed_result is a dictionary before adding keys,
                 # though json.loads on a valid JSON object/array string should produce dict/list.
                 if not isinstance(parsed_result, dict):
@@ -120,6 +121,8 @@ def _sanitize_response(
     Performs the sanitization step on the consolidated JSON.
     Returns the processed sanitized data (list or dict, or error dict) and its file path.
     """
+    # Imported here so the OpenAI SDK is only loaded by processes that actually call it.
+    from services.openai_client import call_openai_with_json
     start_time_sanitize = time.time()
     sanitize_api_response = {}
     processed_data = {} # Default to an error dict if things go wrong early
@@ -135,7 +138,7 @@ def _sanitize_response(
 
         if extracted_sanitized_json_string:
             try:
-                parsed_data = json.loads(extracted_sanitized_json_string)
+                parsed_data = orjson.loads(extracted_sanitized_json_string)
 
                 if isinstance(parsed_data, (list, dict)):
                     processed_data = parsed_data
@@ -181,8 +184,8 @@ def _sanitize_response(
     
     # Save the processed_data (which is the parsed list/dict or an error dict)
     try:
-        with open(sanitized_output_path, "w", encoding="utf-8") as f:
-            json.dump(processed_data, f, indent=2, ensure_ascii=False)
+        with open(sanitized_output_path, "wb") as f:
+            f.write(orjson.dumps(processed_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         print(f"✅ Processed sanitized data for page {page_num_actual}")
         #print(f"✅ Processed sanitized data for page {page_num_actual} saved to {sanitized_output_path}.")
     except Exception as e_save:
@@ -197,12 +200,13 @@ def _sanitize_response(
 def _verify_response(
     data_to_verify: dict | list, # This is the processed_sanitized_data
     sanitize_status: str,
-    temp_pdf_page_path: str,
+    pdf_page_source: str | bytes, # PDF path or the page's PDF bytes
     verification_prompt_text_val: str, # Renamed to avoid conflict
     page_num_actual: int,
     metrics: dict
 ) -> str: # Returns verification_status
     """Performs the verification step on the sanitized data."""
+    from services.openai_client import call_openai_with_pdf
     current_verification_status = "verification_not_run"
     start_time_verification = time.time() # Initialize in case of early exit
 
@@ -228,7 +232,7 @@ def _verify_response(
                 f"Sanitized JSON to verify for page {page_num_actual}:\n"
                 f"{json.dumps(prompt_content_for_verification, indent=2)}"
             )
-            verification_api_response = call_openai_with_pdf(temp_pdf_page_path, verification_prompt)
+            verification_api_response = call_openai_with_pdf(pdf_page_source, verification_prompt)
             metrics["time_sec_verification"] = time.time() - start_time_verification
             
             raw_verification_text_output = verification_api_response.get("text", "")
@@ -238,7 +242,7 @@ def _verify_response(
             
             if extracted_verification_json_string:
                 try:
-                    parsed_verification_output = json.loads(extracted_verification_json_string)
+                    parsed_verification_output = orjson.loads(extracted_verification_json_string)
                 except json.JSONDecodeError:
                     print(f"ℹ️ Verification response for page {page_num_actual} had JSON-like string that failed to parse: {extracted_verification_json_string[:100]}...")
             
@@ -279,12 +283,12 @@ def _verify_response(
     return current_verification_status
 
 def _orchestrate_page_processing( # Renamed from _consolidate_sanitize_verify
-    pdf_page_base64: str,
+    pdf_page_data: str | bytes, # Base64 string or the page's PDF bytes
     gemini_json: dict,
     openai_json: dict,
     page_num_actual: int,
     genai_output_dir: str,
-    temp_pdf_page_path: str,
+    pdf_page_source: str | bytes, # PDF path or the page's PDF bytes
     metrics: dict
 ) -> dict:
     """Orchestrates consolidation, sanitization, and verification for a page."""
@@ -295,7 +299,7 @@ def _orchestrate_page_processing( # Renamed from _consolidate_sanitize_verify
         # --- 1. Consolidation Step ---
         start_time_consolidation = time.time()
         consolidated_data = consolidate_responses( # Returns a dict
-            pdf_page_base64, gemini_json, openai_json, consolidation_prompt_text
+            pdf_page_data, gemini_json, openai_json, consolidation_prompt_text
         )
         metrics["time_sec_consolidation"] = time.time() - start_time_consolidation
 
@@ -313,8 +317,8 @@ def _orchestrate_page_processing( # Renamed from _consolidate_sanitize_verify
             "consolidation_cost_usd": consolidated_data.pop("_consolidation_cost_usd", 0.0)
         })
         consolidated_output_path = os.path.join(genai_output_dir, f"page_{page_num_actual}_consolidated.json")
-        with open(consolidated_output_path, "w", encoding="utf-8") as f:
-            json.dump(consolidated_data, f, indent=2, ensure_ascii=False)
+        with open(consolidated_output_path, "wb") as f:
+            f.write(orjson.dumps(consolidated_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         print(f"✅ Consolidated JSON saved for page {page_num_actual}")
 
         if consolidated_data.get("error"):
@@ -335,7 +339,7 @@ def _orchestrate_page_processing( # Renamed from _consolidate_sanitize_verify
         # --- 3. Verification Step ---
         # metrics are updated internally by _verify_response
         verification_status = _verify_response(
-            sanitized_data, metrics.get("sanitize_status"), temp_pdf_page_path, 
+            sanitized_data, metrics.get("sanitize_status"), pdf_page_source, 
             output_verification_prompt_text, page_num_actual, metrics
         )
         
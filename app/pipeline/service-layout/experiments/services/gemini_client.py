@@ -1,5 +1,7 @@
+import base64
 import os
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Optional, Dict, Any, List, Union
 from dotenv import load_dotenv
 import json
@@ -20,6 +22,12 @@ GEMINI_OUTPUT_PRICE_PER_MILLION = float(os.getenv("GEMINI_OUTPUT_PRICE_PER_MILLI
 GEMINI_INPUT_TOKEN_PRICE = GEMINI_INPUT_PRICE_PER_MILLION / 1_000_000
 GEMINI_OUTPUT_TOKEN_PRICE = GEMINI_OUTPUT_PRICE_PER_MILLION / 1_000_000
 
+# One HTTP session per process, shared by every Gemini call (including concurrent ones from the layout
+# handlers' thread pools), so connections and TLS sessions are reused instead of re-established per call.
+GEMINI_HTTP_POOL_SIZE = 32
+_http_session = requests.Session()
+_http_session.mount("https://", HTTPAdapter(pool_maxsize=GEMINI_HTTP_POOL_SIZE))
+
 def _make_gemini_request(
     payload: Dict[str, Any],
     api_key: Optional[str] = None,
@@ -38,7 +46,7 @@ def _make_gemini_request(
     headers = {"Content-Type": "application/json"}
 
     try:
-        response = requests.post(endpoint, headers=headers, json=payload)
+        response = _http_session.post(endpoint, headers=headers, json=payload)
         response.raise_for_status()
         result = response.json()
 
@@ -91,22 +99,20 @@ def _make_gemini_request(
         print(f"❌ An unexpected error occurred: {e}")
         raise RuntimeError(f"❌ Unexpected error processing Gemini response: {e}") from e
 
-def call_gemini_api(
-    image_base64: str,
+# Stand-in for the inline data while the request body frame is serialized.
+_INLINE_DATA_MARKER = "__gemini_inline_data_placeholder__"
+
+def build_inline_payload_frame(
+    mime_type: str,
     prompt_parts: list,
-    api_key: Optional[str] = None,
-    model: Optional[str] = None,
-    mime_type: str = "image/jpeg"
-) -> Dict[str, Any]:
+    generation_config: Optional[Dict[str, Any]] = None
+) -> tuple[bytes, bytes]:
     """
-    Calls Gemini API with image and prompt, returns structured response including text, tokens, and cost.
+    Serializes the generateContent body and returns the bytes before and after the inline base64 data.
+    Callers that send every page with the same prompt (e.g. the layout prompt) build the frame once and
+    pass it to call_gemini_api, and the large base64 string is spliced in as-is rather than
+    re-encoded by the JSON serializer on every call. Base64 needs no JSON escaping.
     """
-    api_key = api_key or GEMINI_API_KEY
-    model = model or GEMINI_MODEL
-    endpoint = f"{GEMINI_BASE_URL}/{model}:generateContent?key={api_key}"
-
-    headers = {"Content-Type": "application/json"}
-
     payload = {
         "contents": [
             {
@@ -114,21 +120,56 @@ def call_gemini_api(
                     {
                         "inlineData": {
                             "mimeType": mime_type,
-                            "data": image_base64
+                            "data": _INLINE_DATA_MARKER
                         }
                     }
                 ] + prompt_parts
             }
         ]
     }
+    if generation_config:
+        payload["generationConfig"] = generation_config
+    head, tail = json.dumps(payload).split(_INLINE_DATA_MARKER, 1)
+    return head.encode("utf-8"), tail.encode("utf-8")
+
+def call_gemini_api(
+    image_base64: Union[str, bytes],
+    prompt_parts: list,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None,
+    mime_type: str = "image/jpeg",
+    generation_config: Optional[Dict[str, Any]] = None,
+    payload_frame: Optional[tuple[bytes, bytes]] = None
+) -> Dict[str, Any]:
+    """
+    Calls Gemini API with image and prompt, returns structured response including text, tokens, and cost.
+    image_base64 may also be the raw file bytes, which are base64-encoded straight into the request body.
+    generation_config is sent as the request's generationConfig, e.g. {"responseMimeType": "application/json"}.
+    payload_frame, if given, is a frame prebuilt by build_inline_payload_frame for the same mime type,
+    prompt and generation config, and is used instead of serializing them again.
+    """
+    api_key = api_key or GEMINI_API_KEY
+    model = model or GEMINI_MODEL
+    endpoint = f"{GEMINI_BASE_URL}/{model}:generateContent?key={api_key}"
+
+    headers = {"Content-Type": "application/json"}
+
+    payload_head, payload_tail = payload_frame or build_inline_payload_frame(mime_type, prompt_parts, generation_config)
+    if isinstance(image_base64, bytes):
+        inline_data = base64.b64encode(image_base64)
+    else:
+        inline_data = image_base64.encode("ascii")
+    body = payload_head + inline_data + payload_tail
 
     try:
-        response = requests.post(endpoint, headers=headers, json=payload)
+        response = _http_session.post(endpoint, headers=headers, data=body)
         response.raise_for_status()
         result = response.json()
 
         # Extract main response text
         text = result.get("candidates", [{}])[0].get("content", {}).get("parts", [{}])[0].get("text", "")
+        # "STOP" for a complete answer; e.g. "MAX_TOKENS" or "SAFETY" when it was cut short or blocked
+        finish_reason = result.get("candidates", [{}])[0].get("finishReason", "")
 
         # Extract token usage metadata (if available)
         usage = result.get("usageMetadata", {})
@@ -143,6 +184,7 @@ def call_gemini_api(
 
         return {
             "text": text,
+            "finish_reason": finish_reason,
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
             "cost": cost
@@ -194,7 +236,7 @@ def call_gemini_with_pdf(
     }
 
     try:
-        response = requests.post(endpoint, headers=headers, json=payload)
+        response = _http_session.post(endpoint, headers=headers, json=payload)
         response.raise_for_status()
         result = response.json()
 
@@ -51,6 +51,7 @@ class OpenAIUsage(TypedDict): # To represent response.usage if it's not None
 class OpenAIFileCallResponse(TypedDict):
     """Specifies the structure of the dictionary returned by this function."""
     text: str
+    finish_reason: str # "stop" for a complete answer; "length" when cut off at max_tokens
     input_tokens: int
     output_tokens: int
     cost: float
@@ -136,9 +137,10 @@ def call_openai_with_json(json_file_path: str, prompt: str, model: Optional[str]
     except Exception as e:
         raise RuntimeError(f"Failed to call OpenAI API with JSON input: {e}")
     
-def call_openai_with_pdf(pdf_path: str, prompt: str, model: Optional[str] = None) -> OpenAIFileCallResponse: # Changed return type
+def call_openai_with_pdf(pdf_path: Union[str, bytes], prompt: str, model: Optional[str] = None) -> OpenAIFileCallResponse: # Changed return type
     """
     Calls the OpenAI Chat Completions API with a prompt and a PDF file.
+    pdf_path may also be the raw bytes of the PDF, which are uploaded directly from memory.
     The PDF is uploaded to OpenAI and referenced by its ID.
     The uploaded file is deleted after the API call.
     """
@@ -147,11 +149,15 @@ def call_openai_with_pdf(pdf_path: str, prompt: str, model: Optional[str] = None
 
     try:
         # Step 1: Upload the PDF file
-        with open(pdf_path, "rb") as pdf_file_obj:
-            #print(f"Uploading PDF: {pdf_path}...")
-            uploaded_file = client.files.create(file=pdf_file_obj, purpose="user_data") #
-            uploaded_file_id = uploaded_file.id #
-            #print(f"PDF uploaded successfully. File ID: {uploaded_file_id}")
+        if isinstance(pdf_path, (bytes, bytearray)):
+            uploaded_file = client.files.create(file=("page.pdf", bytes(pdf_path), "application/pdf"), purpose="user_data")
+            uploaded_file_id = uploaded_file.id
+        else:
+            with open(pdf_path, "rb") as pdf_file_obj:
+                #print(f"Uploading PDF: {pdf_path}...")
+                uploaded_file = client.files.create(file=pdf_file_obj, purpose="user_data") #
+                uploaded_file_id = uploaded_file.id #
+                #print(f"PDF uploaded successfully. File ID: {uploaded_file_id}")
 
         # Step 2: Construct messages for the chat API
         user_content: List[UserContentItem] = [ # Changed type hint
@@ -202,6 +208,7 @@ def call_openai_with_pdf(pdf_path: str, prompt: str, model: Optional[str] = None
         # Construct the return dictionary according to OpenAIFileCallResponse
         result: OpenAIFileCallResponse = {
             "text": text_response,
+            "finish_reason": response.choices[0].finish_reason or "",
             "input_tokens": input_tokens,
             "output_tokens": output_tokens,
             "cost": cost,
@@ -0,0 +1,142 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import orjson
+
+
+def content_hash(*parts: bytes) -> str:
+    """Returns the SHA-256 hex digest of the given byte strings, for use as a cache key."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part)
+    return digest.hexdigest()
+
+
+class ContentCache:
+    """
+    Directory-backed cache mapping content-hash keys to bytes, one file per entry.
+    Entries are written to a temp file and renamed into place, so worker processes
+    can share the same directory without locking. With a size_limit (in bytes), the
+    least recently used entries are removed once the directory exceeds it. Recency is
+    the file's modification time, which a hit refreshes.
+    """
+
+    def __init__(self, directory: str, size_limit: int | None = None):
+        self.directory = directory
+        self.size_limit = size_limit
+        os.makedirs(directory, exist_ok=True)
+        # Bytes in the directory: scanned once here, then counted up on each set, so the directory
+        # is only scanned again when the limit is reached. Entries written by other processes are
+        # not counted until that scan.
+        self._total_size = self._scan()[1] if size_limit is not None else 0
+
+    def get(self, key: str) -> bytes | None:
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+        except FileNotFoundError:
+            return None
+        if self.size_limit is not None:
+            try:
+                os.utime(path) # Marks the entry as recently used for _evict
+            except FileNotFoundError:
+                pass
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, os.path.join(self.directory, key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if self.size_limit is not None:
+            self._total_size += len(value)
+            if self._total_size > self.size_limit:
+                self._evict()
+
+    def _scan(self) -> tuple[list, int]:
+        """Returns the (mtime, size, path) of every entry in the directory and their total size."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".tmp") or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+        return entries, total_size
+
+    def _evict(self) -> None:
+        entries, total_size = self._scan()
+        self._total_size = total_size
+        if total_size <= self.size_limit:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+            if total_size <= self.size_limit:
+                break
+        self._total_size = total_size
+
+
+class ResponseCache:
+    """
+    Bounded in-memory LRU of JSON-serializable API responses, optionally backed by a
+    ContentCache directory so responses survive across runs. Safe to share between threads.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_cache: ContentCache | None = None
+
+    def attach_directory(self, directory: str, size_limit: int | None = None) -> None:
+        """Persists entries under directory from now on, and serves misses from it."""
+        self._disk_cache = ContentCache(directory, size_limit=size_limit)
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None:
+                self._entries.move_to_end(key)
+                return response
+        if self._disk_cache is None:
+            return None
+        cached_bytes = self._disk_cache.get(key)
+        if cached_bytes is None:
+            return None
+        response = orjson.loads(cached_bytes)
+        self._remember(key, response)
+        return response
+
+    def set(self, key: str, response: dict) -> None:
+        self._remember(key, response)
+        if self._disk_cache is not None:
+            self._disk_cache.set(key, orjson.dumps(response))
+
+    def _remember(self, key: str, response: dict) -> None:
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+# Shared by the Gemini and OpenAI layout calls; keys include the model id and prompt, so they never collide.
+layout_response_cache = ResponseCache()
@@ -1,5 +1,5 @@
 import os
-import json
+import orjson
 import pandas as pd
 from typing import Union, List, Dict, Any
 from pdf2image import convert_from_path
@@ -16,8 +16,8 @@ def load_tag_mapping():
             if not os.path.exists(mapping_path):
                 mapping_path = os.path.join(current_dir, "tag_mapping.json")
 
-        with open(mapping_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        with open(mapping_path, "rb") as f:
+            return orjson.loads(f.read())
     except FileNotFoundError:
         print(f"⚠️ Tag mapping file not found at expected path(s). Using default mapping.")
         return {
@@ -38,8 +38,8 @@ def load_include_config():
         config_path = os.path.join(current_dir, "../config/html_include_config.json")
         if not os.path.exists(config_path): # Fallback to current directory
             config_path = os.path.join(current_dir, "html_include_config.json")
-        with open(config_path, "r", encoding="utf-8") as f:
-            return json.load(f).get("include_tags", [])
+        with open(config_path, "rb") as f:
+            return orjson.loads(f.read()).get("include_tags", [])
     except Exception as e:
         print(f"⚠️ Failed to load HTML include config: {e}")
         return []
@@ -432,8 +432,8 @@ def convert_json_to_csv_and_excel(
     base_filename: str = "gemini_output"
 ) -> None:
     if isinstance(json_input, str):
-        with open(json_input, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        with open(json_input, "rb") as f:
+            data = orjson.loads(f.read())
     else:
         data = json_input
     if not data or not isinstance(data, list) or not all(isinstance(item, dict) for item in data):
@@ -476,7 +476,7 @@ def convert_json_to_html_simple(
     output_filename: str = "output_simple.html"
 ) -> None:
     if isinstance(json_input, str):
-        with open(json_input, "r", encoding="utf-8") as f: data = json.load(f)
+        with open(json_input, "rb") as f: data = orjson.loads(f.read())
     else: data = json_input
     html_elements = []
     if isinstance(data, list):
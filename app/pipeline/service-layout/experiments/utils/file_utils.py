@@ -7,4 +7,8 @@ def encode_image_to_base64(image_path: str) -> str:
 
 def encode_pdf_to_base64(pdf_path: str) -> str:
     with open(pdf_path, "rb") as f:
-        return base64.b64encode(f.read()).decode("utf-8")
\ No newline at end of file
+        return encode_pdf_bytes_to_base64(f.read())
+
+def encode_pdf_bytes_to_base64(data: bytes) -> str:
+    """Encodes in-memory PDF bytes to a base64 string, without a round-trip through a file."""
+    return base64.b64encode(data).decode("ascii")
\ No newline at end of file
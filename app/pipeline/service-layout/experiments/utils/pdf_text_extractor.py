@@ -1,21 +1,36 @@
+import io
 import os
-from PyPDF2 import PdfReader
-from pdf2image import convert_from_path
-import pytesseract
 from difflib import SequenceMatcher
+from functools import lru_cache
 import fitz # PyMuPDF 
 
-def extract_text_from_pdf_page(pdf_path: str, page_number: int) -> str:
-    """Attempt to extract text from a given PDF page (machine-readable)."""
-    # page_number here is 0-indexed for PdfReader
-    reader = PdfReader(pdf_path)
+# PyPDF2, pdf2image, pytesseract (which pulls in PIL) and tesserocr are imported inside the functions
+# that use them, so importing this module stays cheap for runs that never need OCR.
+
+def open_pdf_reader(pdf_source):
+    """
+    Opens a PyPDF2 PdfReader on a PDF path or binary stream. Callers extracting several pages
+    of one document keep the reader, so the file is only parsed once.
+    """
+    from PyPDF2 import PdfReader
+    return PdfReader(pdf_source)
+
+def extract_text_from_pdf_reader_page(reader, page_number: int) -> str:
+    """Same as extract_text_from_pdf_page, on an already opened PdfReader (page_number is 0-indexed)."""
     if 0 <= page_number < len(reader.pages):
         text = reader.pages[page_number].extract_text()
         return text or ""
     return ""
 
+def extract_text_from_pdf_page(pdf_path: str, page_number: int) -> str:
+    """Attempt to extract text from a given PDF page (machine-readable)."""
+    # page_number here is 0-indexed for PdfReader
+    return extract_text_from_pdf_reader_page(open_pdf_reader(pdf_path), page_number)
+
 def extract_text_from_ocr(pdf_path: str, page_number: int, poppler_path=None) -> str:
     """Render a single page as image and perform OCR to extract text."""
+    from pdf2image import convert_from_path
+    import pytesseract
     # page_number is 0-indexed input. convert_from_path expects 1-indexed pages.
     # If pdf_path is a single-page PDF, page_number should be 0, so first/last_page = 1.
     images = convert_from_path(
@@ -28,10 +43,94 @@ def extract_text_from_ocr(pdf_path: str, page_number: int, poppler_path=None) ->
     )
     return pytesseract.image_to_string(images[0]) if images else ""
 
+def extract_text_from_pdf_page_bytes(pdf_bytes: bytes, page_number: int) -> str:
+    """Same as extract_text_from_pdf_page, reading the PDF from memory instead of a file."""
+    return extract_text_from_pdf_reader_page(open_pdf_reader(io.BytesIO(pdf_bytes)), page_number)
+
+def extract_text_from_ocr_bytes(pdf_bytes: bytes, page_number: int, poppler_path=None) -> str:
+    """Same as extract_text_from_ocr, rendering the page from in-memory PDF bytes."""
+    from pdf2image import convert_from_bytes
+    import pytesseract
+    images = convert_from_bytes(
+        pdf_bytes,
+        dpi=300,
+        first_page=page_number + 1,
+        last_page=page_number + 1,
+        poppler_path=poppler_path,
+        thread_count=1
+    )
+    return pytesseract.image_to_string(images[0]) if images else ""
+
+@lru_cache(maxsize=1)
+def _tesseract_api():
+    """
+    A tesserocr (libtesseract binding) API kept for the life of the process, so the English language
+    data is loaded once rather than by a new tesseract process for every page. None when tesserocr,
+    which is optional, is not installed.
+    """
+    try:
+        import tesserocr
+    except ImportError:
+        return None
+    return tesserocr.PyTessBaseAPI(lang="eng")
+
+def extract_text_from_ocr_fitz_page(page: fitz.Page, dpi: int = 300) -> str:
+    """
+    Same as extract_text_from_ocr for a page of an already opened fitz document. The page is
+    rasterized in-process by MuPDF, so no single-page PDF is built and no Poppler process is started.
+    OCR runs through the process's persistent tesserocr API when available, pytesseract otherwise.
+    """
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY) # Tesseract binarizes the image anyway
+    tesseract_api = _tesseract_api()
+    if tesseract_api is not None:
+        tesseract_api.SetImageBytes(pixmap.samples, pixmap.width, pixmap.height, 1, pixmap.stride)
+        tesseract_api.SetSourceResolution(dpi)
+        return tesseract_api.GetUTF8Text()
+    from PIL import Image
+    import pytesseract
+    return pytesseract.image_to_string(Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples))
+
 def is_fidelity_preserved(text1: str, text2: str, threshold: float = 0.9) -> bool:
     """Check if text2 is similar enough to text1 using SequenceMatcher."""
     return SequenceMatcher(None, text1.strip(), text2.strip()).ratio() >= threshold
 
+def extract_text_and_links_from_fitz_page(page: fitz.Page, source_label: str = "") -> tuple[str, list[dict]]:
+    """
+    Extracts full page text and URI hyperlinks from an already loaded PyMuPDF page, e.g. a page of
+    the open source document, so no per-page PDF has to be built or re-opened.
+    Returns (page_text, list_of_hyperlinks_on_page).
+    """
+    page_text_content = page.get_text("text") or ""
+    
+    hyperlinks_data_for_page = []
+    links = page.get_links() 
+    for link_dict in links:
+        if link_dict.get('kind') == fitz.LINK_URI:
+            uri = link_dict.get('uri')
+            # CRITICAL: Use 'from' for the rectangle, not 'from_rect' for fitz link dict
+            rect = link_dict.get('from') 
+            
+            link_anchor_text = "N/A"
+            if rect: # Ensure rect is not None before using it
+                try:
+                    link_anchor_text = page.get_text("text", clip=rect).strip()
+                except Exception as clip_e:
+                     print(f"Warning: could not extract text for link clip on page {page.number} of {source_label}: {clip_e}")
+            
+            if uri:
+                hyperlinks_data_for_page.append({
+                    "text": link_anchor_text,
+                    "url": uri,
+                    "rect": [rect.x0, rect.y0, rect.x1, rect.y1] if rect else None
+                })
+    return page_text_content, hyperlinks_data_for_page
+
+def _extract_text_and_links_from_fitz_doc(doc: fitz.Document, page_number: int, source_label: str = "") -> tuple[str, list[dict]]:
+    """Returns (page_text, hyperlinks) for a page of an already opened fitz document."""
+    if 0 <= page_number < doc.page_count:
+        return extract_text_and_links_from_fitz_page(doc.load_page(page_number), source_label)
+    return "", []
+
 def extract_text_and_links_with_fitz(pdf_path: str, page_number: int) -> tuple[str, list[dict]]:
     """
     Extracts full page text and a list of hyperlinks (URL, anchor text, and rectangle)
@@ -39,40 +138,32 @@ def extract_text_and_links_with_fitz(pdf_path: str, page_number: int) -> tuple[s
     page_number is 0-indexed.
     """
     doc = None
-    page_text_content = ""
-    hyperlinks_data = []
     try:
         doc = fitz.open(pdf_path)
-        if 0 <= page_number < doc.page_count:
-            page = doc.load_page(page_number)
-            page_text_content = page.get_text("text") or ""
-            
-            links = page.get_links() # Returns a list of link dicts from fitz
-            for link_dict in links:
-                if link_dict.get('kind') == fitz.LINK_URI: # Check if it's a URI link
-                    uri = link_dict.get('uri')
-                    rect = link_dict.get('from_rect') # The fitz.Rect object of the link
-                    
-                    # Attempt to extract text only from the link's rectangle
-                    link_anchor_text = page.get_text("text", clip=rect).strip() if rect else "N/A"
-                    
-                    if uri:
-                        hyperlinks_data.append({
-                            "text": link_anchor_text,
-                            "url": uri,
-                            "rect": [rect.x0, rect.y0, rect.x1, rect.y1] if rect else None
-                        })
+        return _extract_text_and_links_from_fitz_doc(doc, page_number, pdf_path)
     except Exception as e:
         print(f"Error processing PDF page {page_number} with fitz in {pdf_path}: {e}")
-        # page_text_content and hyperlinks_data will retain their default empty/initial values
+        return "", []
+    finally:
+        if doc:
+            doc.close()
+
+def extract_text_and_links_with_fitz_bytes(pdf_bytes: bytes, page_number: int) -> tuple[str, list[dict]]:
+    """Same as extract_text_and_links_with_fitz, reading the PDF from memory instead of a file."""
+    doc = None
+    try:
+        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        return _extract_text_and_links_from_fitz_doc(doc, page_number, "in-memory PDF")
+    except Exception as e:
+        print(f"Error processing in-memory PDF page {page_number} with fitz: {e}")
+        return "", []
     finally:
         if doc:
             doc.close()
-            
-    return page_text_content, hyperlinks_data
 
 def extract_text_from_pdf_chunk_pypdf2(chunk_pdf_path: str) -> list[str]:
     """Extracts machine-readable text from all pages in a given PDF chunk using PyPDF2."""
+    from PyPDF2 import PdfReader
     texts_for_pages = []
     try:
         with open(chunk_pdf_path, "rb") as f:
@@ -88,6 +179,8 @@ def extract_text_from_pdf_chunk_pypdf2(chunk_pdf_path: str) -> list[str]:
 
 def extract_text_from_chunk_ocr(chunk_pdf_path: str, poppler_path=None) -> list[str]:
     """Renders all pages in a PDF chunk as images and performs OCR on each."""
+    from pdf2image import convert_from_path
+    import pytesseract
     texts_for_pages = []
     try:
         images = convert_from_path(
@@ -109,6 +202,10 @@ def extract_text_from_chunk_ocr(chunk_pdf_path: str, poppler_path=None) -> list[
 
 # is_fidelity_preserved function remains the same as it's a general utility
 
+def _extract_text_and_links_from_chunk_doc(doc: fitz.Document, source_label: str) -> list[tuple[str, list[dict]]]:
+    """Returns (page_text, list_of_hyperlinks_on_page) for every page of an already opened chunk document."""
+    return [extract_text_and_links_from_fitz_page(doc.load_page(page_num), source_label) for page_num in range(doc.page_count)]
+
 def extract_text_and_links_from_chunk_fitz(chunk_pdf_path: str) -> list[tuple[str, list[dict]]]:
     """
     Extracts full page text and hyperlinks from all pages in a PDF chunk using PyMuPDF.
@@ -118,36 +215,25 @@ def extract_text_and_links_from_chunk_fitz(chunk_pdf_path: str) -> list[tuple[st
     all_pages_data = [] # List of (page_text, links_for_page)
     try:
         doc = fitz.open(chunk_pdf_path)
-        for page_num in range(doc.page_count):
-            page = doc.load_page(page_num)
-            page_text_content = page.get_text("text") or ""
-            
-            hyperlinks_data_for_page = []
-            links = page.get_links() 
-            for link_dict in links:
-                if link_dict.get('kind') == fitz.LINK_URI:
-                    uri = link_dict.get('uri')
-                    # CRITICAL: Use 'from' for the rectangle, not 'from_rect' for fitz link dict
-                    rect = link_dict.get('from') 
-                    
-                    link_anchor_text = "N/A"
-                    if rect: # Ensure rect is not None before using it
-                        try:
-                            link_anchor_text = page.get_text("text", clip=rect).strip()
-                        except Exception as clip_e:
-                             print(f"Warning: could not extract text for link clip on page {page_num} of {chunk_pdf_path}: {clip_e}")
-                    
-                    if uri:
-                        hyperlinks_data_for_page.append({
-                            "text": link_anchor_text,
-                            "url": uri,
-                            "rect": [rect.x0, rect.y0, rect.x1, rect.y1] if rect else None
-                        })
-            all_pages_data.append((page_text_content, hyperlinks_data_for_page))
+        all_pages_data = _extract_text_and_links_from_chunk_doc(doc, chunk_pdf_path)
     except Exception as e:
         print(f"Error processing PDF chunk {chunk_pdf_path} with fitz: {e}")
         # all_pages_data might be empty or partially filled.
     finally:
         if doc:
             doc.close()
+    return all_pages_data
+
+def extract_text_and_links_from_chunk_fitz_bytes(chunk_pdf_bytes: bytes) -> list[tuple[str, list[dict]]]:
+    """Same as extract_text_and_links_from_chunk_fitz, reading the chunk PDF from memory instead of a file."""
+    doc = None
+    all_pages_data = []
+    try:
+        doc = fitz.open(stream=chunk_pdf_bytes, filetype="pdf")
+        all_pages_data = _extract_text_and_links_from_chunk_doc(doc, "in-memory chunk")
+    except Exception as e:
+        print(f"Error processing in-memory PDF chunk with fitz: {e}")
+    finally:
+        if doc:
+            doc.close()
     return all_pages_data
\ No newline at end of file
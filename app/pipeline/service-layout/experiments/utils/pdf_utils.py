@@ -6,6 +6,26 @@ def _create_temp_page_pdf(pdf_document: fitz.Document, page_index: int, temp_pdf
     single_page_doc.insert_pdf(pdf_document, from_page=page_index, to_page=page_index)
     single_page_doc.save(temp_pdf_page_path)
     single_page_doc.close()
+
+
+def _extract_single_page_bytes(pdf_document: fitz.Document, page_index: int) -> bytes:
+    """
+    Returns a single page of pdf_document as the bytes of a standalone PDF, without touching disk.
+    No fresh /ID is generated, so the same page always yields the same bytes (and content hash).
+    """
+    return _extract_page_range_bytes(pdf_document, page_index, 1)
+
+
+def _extract_page_range_bytes(pdf_document: fitz.Document, start_page_index: int, num_pages: int) -> bytes:
+    """In-memory counterpart of _create_temp_chunk_pdf: the chunk's pages as the bytes of a standalone PDF."""
+    chunk_doc = fitz.open()
+    try:
+        end_page_index = min(start_page_index + num_pages, len(pdf_document))
+        if start_page_index < end_page_index:
+            chunk_doc.insert_pdf(pdf_document, from_page=start_page_index, to_page=end_page_index - 1)
+        return chunk_doc.tobytes(no_new_id=True)
+    finally:
+        chunk_doc.close()
     
     
 def _create_temp_chunk_pdf(original_pdf_doc: fitz.Document, 
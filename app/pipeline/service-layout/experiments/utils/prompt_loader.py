@@ -1,5 +1,5 @@
 from pathlib import Path
-import json
+import orjson
 
 def load_text_prompt(filename: str) -> str:
     current_dir = Path(__file__).resolve().parent
@@ -15,5 +15,5 @@ def load_json_prompt(filename: str) -> dict:
     project_root = current_dir.parent
     prompt_path = project_root / "prompts" / filename
 
-    with open(prompt_path, "r", encoding="utf-8") as f:
-        return json.load(f)
+    with open(prompt_path, "rb") as f:
+        return orjson.loads(f.read())
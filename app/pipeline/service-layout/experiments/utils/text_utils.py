@@ -1,7 +1,10 @@
-import re
-from thefuzz import fuzz # For fuzzy matching
+from rapidfuzz import fuzz, process # For fuzzy matching
 import string
 
+# Built once: a translation table that maps each punctuation character to None (to remove it)
+# string.punctuation typically includes: !"#$%&'()*+,-./:;<=>?@[\]^_`{|}~
+_PUNCTUATION_TRANSLATOR = str.maketrans('', '', string.punctuation)
+
 def _normalize_text(text: str) -> str:
     """
     Converts text to lowercase, removes all punctuations (including backslashes), 
@@ -10,17 +13,12 @@ def _normalize_text(text: str) -> str:
     if not isinstance(text, str):
         return ""
     
-    text = text.lower()
-    
-    # Create a translation table that maps each punctuation character to None (to remove it)
-    # string.punctuation typically includes: !"#$%&'()*+,-./:;<=>?@[\]^_`{|}~
-    translator = str.maketrans('', '', string.punctuation)
-    text = text.translate(translator)
+    text = text.lower().translate(_PUNCTUATION_TRANSLATOR)
     
-    # Replace multiple whitespace characters (including newlines, tabs) with a single space
-    text = re.sub(r'\s+', ' ', text)
-    
-    return text.strip()
+    # Collapse runs of whitespace (including newlines, tabs) to a single space and trim the ends.
+    # str.split() treats exactly the characters \s matches as whitespace, so this equals
+    # re.sub(r'\s+', ' ', text).strip() in one C-level pass, without the regex engine.
+    return ' '.join(text.split())
 
 
 def _verify_item_content_in_direct_text(page_data_dict: dict, direct_text: str, page_num: int) -> dict:
@@ -78,13 +76,15 @@ def _verify_item_content_in_direct_text_fuzzy(
     direct_text: str, 
     page_num: int, 
     fuzzy_threshold: int = 88, # Default fuzzy matching threshold (e.g., 88%)
-    min_content_len_for_fuzzy: int = 4 # Min length of item content to apply fuzzy match robustly
+    min_content_len_for_fuzzy: int = 4, # Min length of item content to apply fuzzy match robustly
+    normalized_direct_text: str | None = None # _normalize_text(direct_text), if the caller already has it
 ) -> dict:
     """
     Verifies 'content' of items in page_data_dict against direct_text using fuzzy matching.
     Updates 'verification-flag' in each item.
     """
-    normalized_direct_text = _normalize_text(direct_text)
+    if normalized_direct_text is None:
+        normalized_direct_text = _normalize_text(direct_text)
     items_key = None
 
     if "page_elements" in page_data_dict and isinstance(page_data_dict["page_elements"], list):
@@ -108,31 +108,46 @@ def _verify_item_content_in_direct_text_fuzzy(
                 item["verification-flag"] = "Skipped (No Direct Text)"
         return page_data_dict
 
+    # Items scored together in one batch after the loop, grouped by normalized content so that repeated
+    # contents (running headers, footers, boilerplate) are scored once per page
+    fuzzy_items_by_query = {}
     for item_idx, item in enumerate(items_to_verify):
         if isinstance(item, dict) and "content" in item:
             item_content_value = item.get("content")
-            original_flag = item.get("verification-flag", "Not Verified") 
 
             if item_content_value and isinstance(item_content_value, str):
                 normalized_item_content = _normalize_text(item_content_value)
                 if normalized_item_content:
-                    match_score = 0
                     if len(normalized_item_content) < min_content_len_for_fuzzy:
                         # For very short strings, exact match is more reliable than fuzzy
                         if normalized_item_content in normalized_direct_text:
-                            match_score = 100 
-                        item["verification-flag"] = f"Verified (Exact Match)" if match_score == 100 else f"Failed (Exact Mismatch - Short)"
-                    else:
-                        # Use partial_ratio for fuzzy substring matching
-                        match_score = fuzz.partial_ratio(normalized_item_content, normalized_direct_text)
-                        if match_score >= fuzzy_threshold:
-                            item["verification-flag"] = f"Verified (Match {match_score}%)"
+                            item["verification-flag"] = f"Verified (Exact Match)"
                         else:
-                            item["verification-flag"] = f"Failed (Match {match_score}%)"
+                            item["verification-flag"] = f"Failed (Exact Mismatch - Short)"
+                    elif normalized_item_content in normalized_direct_text:
+                        # Verbatim substring: partial_ratio would score 100, so skip the edit-distance work
+                        item["verification-flag"] = "Verified (Match 100%)"
+                    else:
+                        fuzzy_items_by_query.setdefault(normalized_item_content, []).append(item)
                 else:
                     item["verification-flag"] = "Not Verified (Empty Normalized Item Content)"
             else:
                 item["verification-flag"] = "Failed (Invalid Or Empty Content Field)"
         # else: item might not be a dict or have 'content', its flag remains as is
+
+    if fuzzy_items_by_query:
+        # partial_ratio for fuzzy substring matching; cdist scores every distinct item content against
+        # the page text in one C++ call instead of one Python call per item. Single-threaded: pages are
+        # already verified in parallel by the handlers' page process pools.
+        fuzzy_queries = list(fuzzy_items_by_query)
+        scores = process.cdist(fuzzy_queries, [normalized_direct_text], scorer=fuzz.partial_ratio, workers=1)
+        for fuzzy_query, score_row in zip(fuzzy_queries, scores):
+            match_score = int(round(float(score_row[0])))
+            if match_score >= fuzzy_threshold:
+                verification_flag = f"Verified (Match {match_score}%)"
+            else:
+                verification_flag = f"Failed (Match {match_score}%)"
+            for item in fuzzy_items_by_query[fuzzy_query]:
+                item["verification-flag"] = verification_flag
     
     return page_data_dict
\ No newline at end of file
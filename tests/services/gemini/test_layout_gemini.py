@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("dotenv")
+
+# The layout service's modules import each other from its experiments directory.
+LAYOUT_EXPERIMENTS_DIR = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../../app/pipeline/service-layout/experiments"
+))
+sys.path.insert(0, LAYOUT_EXPERIMENTS_DIR)
+
+from core import layout_gemini
+from utils.content_cache import ResponseCache
+
+
+@pytest.fixture
+def response_cache(monkeypatch):
+    cache = ResponseCache()
+    monkeypatch.setattr(layout_gemini, "layout_response_cache", cache)
+    return cache
+
+
+def _call_layout_with_response(monkeypatch, text, finish_reason):
+    api_calls = []
+
+    def fake_call_gemini_api(**kwargs):
+        api_calls.append(kwargs)
+        return {"text": text, "finish_reason": finish_reason, "input_tokens": 1, "output_tokens": 1, "cost": 0.0}
+
+    monkeypatch.setattr(layout_gemini, "call_gemini_api", fake_call_gemini_api)
+    layout_gemini._call_gemini_for_layout(b"%PDF-page", 1, 1, {})
+    return api_calls
+
+
+def test_complete_parsed_response_is_cached(monkeypatch, response_cache):
+    _call_layout_with_response(monkeypatch, '{"Page1": [{"type": "paragraph", "content": "Text"}]}', "STOP")
+
+    # A second call for the same page is served from the cache
+    assert _call_layout_with_response(monkeypatch, "", "STOP") == []
+
+
+@pytest.mark.parametrize("text, finish_reason", [
+    ('{"Page1": [{"type": "paragraph", "content": "Text"}]}', "MAX_TOKENS"), # Cut short
+    ('{"Page1": [{"type": "paragraph", "content": "Te', "MAX_TOKENS"), # Truncated JSON
+    ('{"Page1": [{"type": "paragraph", "content": "Text"}]}', "SAFETY"), # Blocked
+    ("not json at all", "STOP"), # Unparsable
+    ('{"Page1": []}', "STOP"), # No page items
+    ("", "STOP"), # Empty
+])
+def test_incomplete_or_unusable_response_is_not_cached(monkeypatch, response_cache, text, finish_reason):
+    _call_layout_with_response(monkeypatch, text, finish_reason)
+
+    assert response_cache._entries == {}
+    # The next call for the same page goes to the API again
+    assert len(_call_layout_with_response(monkeypatch, text, finish_reason)) == 1
@@ -0,0 +1,101 @@
+import importlib.util
+import os
+
+# The layout service's modules live under a hyphenated directory, so the module is loaded from its path.
+CONTENT_CACHE_PATH = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), "../../app/pipeline/service-layout/experiments/utils/content_cache.py"
+))
+_spec = importlib.util.spec_from_file_location("content_cache", CONTENT_CACHE_PATH)
+content_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(content_cache)
+
+
+def test_content_hash_depends_on_every_part():
+    assert content_cache.content_hash(b"a", b"b") == content_cache.content_hash(b"a", b"b")
+    assert content_cache.content_hash(b"a", b"b") != content_cache.content_hash(b"a", b"c")
+
+
+def test_content_cache_round_trip(tmp_path):
+    cache = content_cache.ContentCache(str(tmp_path))
+    assert cache.get("missing") is None
+
+    cache.set("key", b"value")
+
+    assert cache.get("key") == b"value"
+    # A second instance on the same directory sees the entry, and no temp files are left behind.
+    assert content_cache.ContentCache(str(tmp_path)).get("key") == b"value"
+    assert sorted(os.listdir(tmp_path)) == ["key"]
+
+
+def test_content_cache_size_limit_evicts_oldest_entries(tmp_path):
+    cache = content_cache.ContentCache(str(tmp_path), size_limit=25)
+    cache.set("oldest", b"x" * 10)
+    cache.set("older", b"x" * 10)
+    os.utime(tmp_path / "oldest", (1_000, 1_000))
+    os.utime(tmp_path / "older", (2_000, 2_000))
+
+    cache.set("newest", b"x" * 10) # 30 bytes in total, over the 25 byte limit
+
+    assert cache.get("oldest") is None
+    assert cache.get("older") == b"x" * 10
+    assert cache.get("newest") == b"x" * 10
+
+
+def test_content_cache_hit_makes_entry_recently_used(tmp_path):
+    cache = content_cache.ContentCache(str(tmp_path), size_limit=25)
+    cache.set("oldest", b"x" * 10)
+    cache.set("older", b"x" * 10)
+    os.utime(tmp_path / "oldest", (1_000, 1_000))
+    os.utime(tmp_path / "older", (2_000, 2_000))
+
+    assert cache.get("oldest") == b"x" * 10 # The hit makes "older" the least recently used entry
+    cache.set("newest", b"x" * 10)
+
+    assert cache.get("older") is None
+    assert cache.get("oldest") == b"x" * 10
+    assert cache.get("newest") == b"x" * 10
+
+
+def test_content_cache_counts_existing_entries_and_scans_only_over_the_limit(tmp_path, monkeypatch):
+    content_cache.ContentCache(str(tmp_path)).set("existing", b"x" * 20)
+    cache = content_cache.ContentCache(str(tmp_path), size_limit=25)
+    scans = []
+    original_scan = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or original_scan())
+
+    cache.set("small", b"x" * 5) # 25 bytes, at the limit
+
+    assert scans == []
+    assert cache.get("existing") == b"x" * 20
+
+    os.utime(tmp_path / "existing", (1_000, 1_000))
+    cache.set("over", b"x" * 5) # 30 bytes: the existing entry, counted at creation, is evicted
+
+    assert scans == [1]
+    assert cache.get("existing") is None
+    assert cache.get("small") == b"x" * 5
+
+
+def test_response_cache_is_bounded_lru():
+    cache = content_cache.ResponseCache(max_entries=2)
+    cache.set("a", {"text": "a"})
+    cache.set("b", {"text": "b"})
+    assert cache.get("a") == {"text": "a"} # "a" becomes the most recently used entry
+
+    cache.set("c", {"text": "c"})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"text": "a"}
+    assert cache.get("c") == {"text": "c"}
+
+
+def test_response_cache_persists_to_attached_directory(tmp_path):
+    writer = content_cache.ResponseCache()
+    writer.attach_directory(str(tmp_path))
+    writer.set("key", {"text": "[]", "input_tokens": 3})
+
+    reader = content_cache.ResponseCache()
+    assert reader.get("key") is None # Memory only until a directory is attached
+    reader.attach_directory(str(tmp_path))
+
+    assert reader.get("key") == {"text": "[]", "input_tokens": 3}